@@ -0,0 +1,81 @@
+"""
+bench_batch.py
+
+多页批量处理基准测试 (含spawn启动方式检查)
+
+在配置文件的图片目录下生成若干张带答题框的模拟A4页面 (与main.py的多页模式使用同一目录),
+用本地OpenAI兼容模拟服务代替OCR和答题服务, 以指定的进程启动方式运行BatchPageProcessor:
+- 输出吞吐量 (页/分钟)
+- 检查处理结束后页面图片仍然完整: spawn方式下子进程会重新导入配置模块, 不能清空主进程正在处理的目录
+
+用法:
+    python -m benchmarks.bench_batch --pages 6 --start-method spawn --font C:\\Windows\\Fonts\\simfang.ttf
+
+Author: Zhu Jiahao
+Date: 2025-08-12
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import cv2
+import numpy as np
+from benchmarks.fake_llm_server import FakeLLMServer
+from src.api.deepseek_api import DeepSeekClient
+from src.api.image_api import OpenCVImageClient
+from src.api.qwen_api import QwenClient
+from src.core.batch import BatchPageProcessor, list_page_images
+from src.utils.config import __config__
+
+# A4纸竖放, 每毫米10像素
+PAGE_SIZE = (2970, 2100)
+
+
+def make_page(path: str) -> None:
+    """ 白色A4页面, 下半部分有一个黑色边框的答题框
+    """
+    page = np.full((*PAGE_SIZE, 3), 255, np.uint8)
+    cv2.rectangle(page, (200, 1500), (1900, 2600), (0, 0, 0), 12)
+    cv2.putText(page, "1. Translate the sentence.", (200, 400), cv2.FONT_HERSHEY_SIMPLEX, 3, (0, 0, 0), 6)
+    cv2.imwrite(path, page)
+
+
+def run(args) -> int:
+    pages_dir = os.path.join(__config__.get_path_config().get("input", {}).get("images", "./data/input/images"),
+                             "bench_pages")
+    os.makedirs(pages_dir, exist_ok=True)
+    for i in range(args.pages):
+        make_page(os.path.join(pages_dir, f"{i + 1}.jpg"))
+
+    server = FakeLLMServer(ttft=args.ttft, token_delay=args.token_delay).start()
+    qwen = QwenClient("sk-local", server.base_url, "qwen-vl", "qwen-text")
+    deepseek = DeepSeekClient("sk-local", server.base_url, "deepseek-chat")
+    processor = BatchPageProcessor(OpenCVImageClient(None, args.font), qwen.ocr_image, deepseek.answer_text,
+                                   args.workers, args.concurrency, start_method=args.start_method)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            stats = processor.run(pages_dir, tmp, os.path.join(tmp, "task.json"))
+    finally:
+        server.stop()
+
+    remaining = len(list_page_images(pages_dir)) if os.path.isdir(pages_dir) else 0
+    print(f"启动方式: {args.start_method or '默认'}, 完成 {stats['pages']}/{args.pages} 页, "
+          f"吞吐量 {stats['pages_per_minute']:.1f} 页/分钟")
+    print(f"处理后页面图片: {remaining}/{args.pages}")
+    if remaining != args.pages:
+        print("页面目录在处理过程中被清空")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多页批量处理基准测试")
+    parser.add_argument("--pages", type=int, default=6, help="页数")
+    parser.add_argument("--start-method", default="spawn", help="进程启动方式, 空字符串表示平台默认值")
+    parser.add_argument("--workers", type=int, default=2, help="预处理进程数")
+    parser.add_argument("--concurrency", type=int, default=4, help="同时进行的OCR/答题请求数上限")
+    parser.add_argument("--font", default=r"C:\Windows\Fonts\simfang.ttf", help="排版字体路径")
+    parser.add_argument("--ttft", type=float, default=0.2, help="模拟服务首个token延迟 (s)")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="模拟服务流式分片间隔 (s)")
+    sys.exit(run(parser.parse_args()))
@@ -0,0 +1,77 @@
+"""
+bench_fanout.py
+
+逐题并发作答基准测试
+
+使用一页包含多道题的模拟试卷, 在本地OpenAI兼容模拟服务上对比:
+- 整页: 整页文本作为一个提示词作答 (原流程)
+- 逐题: text_split切分后本地解析 (parse_split_units), 每道题独立并发作答 (answer_questions)
+模拟服务按回复长度逐字流式输出, 因此整页作答的耗时随题目数增长, 逐题作答的耗时接近最慢的一道题。
+注意text_split需要原样输出整页文本, 其耗时随试卷长度增长; 分开输出切分和作答两部分的耗时。
+
+用法:
+    python -m benchmarks.bench_fanout --questions 8 --concurrency 4
+
+Author: Zhu Jiahao
+Date: 2025-08-09
+"""
+
+import argparse
+import time
+from benchmarks.fake_llm_server import FakeLLMServer
+from src.api.deepseek_api import DeepSeekClient
+from src.api.qwen_api import QwenClient
+from src.core.answer import parse_split_units, unit_questions
+
+ANSWER = "若甲说真话则乙丙都说谎，与乙的证词矛盾；若乙说真话则甲丙说谎，丙的不在场证明不成立。故乙说了真话，凶手是丙。"
+
+
+def make_sheet(n: int) -> str:
+    """ text_split格式的模拟试卷: 一个单元, n道推理题
+    """
+    questions = "\n\n".join(f"【第{i + 1}题】甲乙丙三人中只有一人说了真话，请推理谁是凶手。(案例{i + 1})"
+                            for i in range(n))
+    return f"==== Unit1 ====\n一、推理题\n阅读下面的案情，回答问题。\n{questions}\n"
+
+
+def run(args) -> None:
+    sheet = make_sheet(args.questions)
+    responses = [
+        {"match": "文本切割", "content": sheet},
+        {"match": "【第1题】", "content": ANSWER * args.questions},
+        {"match": "侦探", "content": ANSWER},
+    ]
+    server = FakeLLMServer(responses, ttft=args.ttft, token_delay=args.token_delay).start()
+    transport_config = {"max_concurrency": args.concurrency}
+    qwen = QwenClient("sk-local", server.base_url, "qwen-vl", "qwen-text", transport_config=transport_config)
+    deepseek = DeepSeekClient("sk-local", server.base_url, "deepseek-chat", transport_config=transport_config)
+
+    try:
+        start = time.perf_counter()
+        whole = deepseek.answer_questions([sheet], ["reasoning"])
+        whole_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        questions = unit_questions(parse_split_units(qwen.text_split(sheet)))
+        split_s = time.perf_counter() - start
+        answers = deepseek.answer_questions(questions, ["reasoning"] * len(questions), args.concurrency)
+        fanout_s = time.perf_counter() - start
+        answer_s = fanout_s - split_s
+    finally:
+        server.stop()
+
+    print(f"题目数: {len(questions)}, 并发上限: {args.concurrency}")
+    print(f"整页: {whole_s:.2f}s ({len(whole[0])} 字)")
+    print(f"逐题: {fanout_s:.2f}s = 切分 {split_s:.2f}s + 作答 {answer_s:.2f}s")
+    print(f"作答阶段加速 {whole_s / answer_s:.2f}x, 含切分加速 {whole_s / fanout_s:.2f}x")
+    for i, answer in enumerate(answers):
+        print(f"{i + 1}. {answer[:40]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="逐题并发作答基准测试")
+    parser.add_argument("--questions", type=int, default=8, help="题目数")
+    parser.add_argument("--concurrency", type=int, default=4, help="同时作答的题目数上限")
+    parser.add_argument("--ttft", type=float, default=0.3, help="模拟服务首个token延迟 (s)")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="模拟服务流式分片间隔 (s)")
+    run(parser.parse_args())
@@ -0,0 +1,84 @@
+"""
+bench_grabber.py
+
+后台取帧基准测试
+
+用图片序列代替摄像头 (ImageSequenceSource), 模拟按下空格前画面在晃动: 序列中只有一帧清晰,
+其余帧做了不同程度的运动模糊。输出取帧线程的帧率, UI线程每次取预览的耗时, 以及sharpest()
+是否选中了清晰帧。
+
+用法:
+    python -m benchmarks.bench_grabber --frames 8 --fps 30
+    python -m benchmarks.bench_grabber --images data/input/raw_frames
+
+Author: Zhu Jiahao
+Date: 2025-08-03
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import cv2
+import numpy as np
+from benchmarks.bench_enhance import synthetic_frame
+from src.core.grabber import FrameGrabber, ImageSequenceSource, sharpness
+
+
+def motion_blur(frame: np.ndarray, length: int) -> np.ndarray:
+    kernel = np.zeros((length, length), dtype=np.float32)
+    kernel[length // 2, :] = 1.0 / length
+    return cv2.filter2D(frame, -1, kernel)
+
+
+def write_sequence(directory: str, count: int, sharp_index: int):
+    base = synthetic_frame(3840, 2160)
+    files = []
+    for i in range(count):
+        frame = base if i == sharp_index else motion_blur(base, 5 + 4 * abs(i - sharp_index))
+        path = os.path.join(directory, f"{i:03d}.png")
+        cv2.imwrite(path, frame)
+        files.append(path)
+    return files
+
+
+def run(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.images:
+            source = ImageSequenceSource.from_directory(args.images, args.fps)
+            sharp_index = None
+        else:
+            sharp_index = args.frames // 2
+            source = ImageSequenceSource(write_sequence(tmp, args.frames, sharp_index), args.fps)
+
+        expected = [sharpness(cv2.imread(f)) for f in source.files]
+        grabber = FrameGrabber(source, buffer_size=len(source.files), preview_scale=0.25)
+
+        start = time.perf_counter()
+        preview_times = []
+        with grabber:
+            grabber.wait_for_frame()
+            while grabber.alive:
+                t = time.perf_counter()
+                grabber.preview()
+                preview_times.append((time.perf_counter() - t) * 1000)
+                time.sleep(1 / 60)
+            elapsed = time.perf_counter() - start
+
+            t = time.perf_counter()
+            best = grabber.sharpest()
+            pick_ms = (time.perf_counter() - t) * 1000
+
+    picked = int(np.argmax(expected))
+    print(f"读取 {grabber.frames_read} 帧, 取帧帧率 {grabber.frames_read / elapsed:.1f} fps")
+    print(f"预览: 平均 {np.mean(preview_times):.3f} ms / 次 ({len(preview_times)} 次)")
+    print(f"选取最清晰帧: {pick_ms:.1f} ms, 清晰度 {sharpness(best):.1f}, 最高清晰度帧序号 {picked}"
+          + (f", 清晰帧序号 {sharp_index}" if sharp_index is not None else ""))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="后台取帧基准测试")
+    parser.add_argument("--images", help="摄像头原始画面目录 (.jpg/.png), 默认生成模拟画面")
+    parser.add_argument("--frames", type=int, default=8, help="模拟画面数量")
+    parser.add_argument("--fps", type=float, default=30, help="图片序列的输出帧率, 0表示不限速")
+    run(parser.parse_args())
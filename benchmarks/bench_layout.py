@@ -0,0 +1,91 @@
+"""
+bench_layout.py
+
+字号自适应基准测试
+
+对比两种字号搜索方式在同一答题框和答案上的耗时与结果:
+- linear: 原实现, 从最大字号逐个递减, 每个字号用textbbox逐字测量行前缀来换行
+- binary: 缓存字符宽度 + 二分查找 (src.core.layout.fit_font_size), 分别统计首次 (冷) 和再次 (热) 调用
+
+用法:
+    python -m benchmarks.bench_layout --chars 300 --font C:\\Windows\\Fonts\\simfang.ttf
+
+Author: Zhu Jiahao
+Date: 2025-07-31
+"""
+
+import argparse
+import time
+from PIL import Image, ImageDraw, ImageFont
+from src.core.layout import fit_font_size, get_glyph_metrics
+
+SAMPLE_TEXT = "学而时习之，不亦说乎？有朋自远方来，不亦乐乎？人不知而不愠，不亦君子乎？"
+
+# A4纸竖放, 每毫米10像素
+PX_PER_MM = 10.0
+
+
+def linear_search(text: str, font_path: str, min_size: int, max_size: int, max_width: float, max_height: float):
+    """ 原实现的字号搜索: 逐个字号尝试, 按行前缀测量宽度换行
+    """
+    draw = ImageDraw.Draw(Image.new("L", (1, 1)))
+    for size in range(max_size, min_size - 1, -1):
+        font = ImageFont.truetype(font_path, size)
+        lines, current = [], ""
+        for ch in text:
+            bbox = draw.textbbox((0, 0), current + ch, font=font)
+            if bbox[2] - bbox[0] > max_width:
+                lines.append(current)
+                current = ch
+            else:
+                current += ch
+        if current:
+            lines.append(current)
+        line_height = font.getbbox("汉")[3] - font.getbbox("汉")[1]
+        if line_height * len(lines) <= max_height:
+            return size, lines
+    return min_size, lines
+
+
+def run(args) -> None:
+    text = (SAMPLE_TEXT * (args.chars // len(SAMPLE_TEXT) + 1))[:args.chars]
+    max_width = args.box_width_mm * PX_PER_MM * 0.8
+    max_height = args.box_height_mm * PX_PER_MM * 0.95
+    min_size = int(args.min_font_mm * PX_PER_MM)
+    max_size = int(args.max_font_mm * PX_PER_MM)
+
+    start = time.perf_counter()
+    linear_size, linear_lines = linear_search(text, args.font, min_size, max_size, max_width, max_height)
+    linear_ms = (time.perf_counter() - start) * 1000
+
+    get_glyph_metrics.cache_clear()
+    start = time.perf_counter()
+    metrics, lines, fitted = fit_font_size(text, args.font, min_size, max_size, max_width, max_height)
+    cold_ms = (time.perf_counter() - start) * 1000
+
+    warm = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        fit_font_size(text, args.font, min_size, max_size, max_width, max_height)
+        warm.append((time.perf_counter() - start) * 1000)
+
+    print(f"答案 {len(text)} 字, 答题框 {args.box_width_mm}x{args.box_height_mm}mm, "
+          f"字号范围 {min_size}~{max_size}px")
+    print(f"{'method':<12}{'size(px)':>10}{'lines':>8}{'time(ms)':>12}")
+    print(f"{'linear':<12}{linear_size:>10}{len(linear_lines):>8}{linear_ms:>12.1f}")
+    print(f"{'binary/cold':<12}{metrics.font.size:>10}{len(lines):>8}{cold_ms:>12.1f}")
+    print(f"{'binary/warm':<12}{metrics.font.size:>10}{len(lines):>8}{sum(warm) / len(warm):>12.2f}")
+    if not fitted:
+        print("最小字号也无法放入答题框")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="字号自适应基准测试")
+    parser.add_argument("--font", required=True, help="排版字体路径")
+    parser.add_argument("--chars", type=int, default=300, help="答案字数")
+    parser.add_argument("--box-width-mm", type=float, default=170.0, help="答题框宽度 (mm)")
+    parser.add_argument("--box-height-mm", type=float, default=120.0, help="答题框高度 (mm)")
+    parser.add_argument("--min-font-mm", type=float, default=4.0, help="最小字号 (mm)")
+    parser.add_argument("--max-font-mm", type=float, default=10.0, help="最大字号 (mm)")
+    parser.add_argument("--repeat", type=int, default=20, help="热调用重复次数")
+    run(parser.parse_args())
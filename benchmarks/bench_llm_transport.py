@@ -0,0 +1,71 @@
+"""
+bench_llm_transport.py
+
+大模型传输层基准测试
+
+在本地OpenAI兼容模拟服务 (benchmarks.fake_llm_server) 上运行, 不需要网络:
+- 串行: 逐个发送请求 (同步接口chat)
+- 并发: 一次提交全部请求 (异步接口achat), 并发数受max_concurrency限制
+模拟服务可以按比例返回503错误 (--fail-rate), 用于检查重试。输出两种方式的总耗时和LLMTransport的统计。
+
+用法:
+    python -m benchmarks.bench_llm_transport --requests 16 --concurrency 4 --fail-rate 0.2
+
+Author: Zhu Jiahao
+Date: 2025-08-07
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from benchmarks.fake_llm_server import FakeLLMServer
+from src.api.llm_transport import LLMError, LLMTransport
+
+
+def run(args) -> None:
+    server = FakeLLMServer(ttft=args.ttft, token_delay=args.token_delay, fail_rate=args.fail_rate).start()
+    transport = LLMTransport("sk-local", server.base_url, max_concurrency=args.concurrency,
+                             max_retries=args.retries, backoff_base=0.05, backoff_max=0.5, deadline=args.deadline)
+    messages = lambda i: [{"role": "user", "content": f"第{i}个问题"}]
+
+    try:
+        failed = 0
+        start = time.perf_counter()
+        for i in range(args.requests):
+            try:
+                transport.chat("serial", messages(i))
+            except LLMError:
+                failed += 1
+        serial_s = time.perf_counter() - start
+        print(f"串行: {args.requests} 个请求, 耗时 {serial_s:.2f}s, 失败 {failed}")
+
+        async def fan_out():
+            tasks = [transport.achat("concurrent", messages(i)) for i in range(args.requests)]
+            try:
+                return await asyncio.gather(*tasks, return_exceptions=True)
+            finally:
+                await transport.aclose()
+
+        start = time.perf_counter()
+        results = asyncio.run(fan_out())
+        concurrent_s = time.perf_counter() - start
+        failed = sum(isinstance(r, Exception) for r in results)
+        print(f"并发: {args.requests} 个请求, 耗时 {concurrent_s:.2f}s, 失败 {failed}, "
+              f"加速 {serial_s / concurrent_s:.2f}x")
+        print(f"模拟服务: 收到 {server.requests} 个请求, 注入 {server.failures} 次503错误")
+        print(json.dumps(transport.metrics(), ensure_ascii=False, indent=2))
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="大模型传输层基准测试")
+    parser.add_argument("--requests", type=int, default=16, help="请求数")
+    parser.add_argument("--concurrency", type=int, default=4, help="并发请求数上限")
+    parser.add_argument("--retries", type=int, default=3, help="最大重试次数")
+    parser.add_argument("--fail-rate", type=float, default=0.2, help="模拟服务返回503错误的比例")
+    parser.add_argument("--ttft", type=float, default=0.2, help="首个token延迟 (s)")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="流式分片间隔 (s)")
+    parser.add_argument("--deadline", type=float, default=30.0, help="请求总时限 (s)")
+    run(parser.parse_args())
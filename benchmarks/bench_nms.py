@@ -0,0 +1,77 @@
+"""
+bench_nms.py
+
+合并式NMS基准测试
+
+在10 ~ 10000个框的模拟数据上对比逐对实现 (greedy_merge_nms) 和向量化实现 (batched_merge_nms)
+的耗时, 并统计两者输出完全一致的比例 (应为全部一致)。模拟数据模拟噪声较多的照片: 同一个框被重复检测为
+若干个略有偏移的框, 再加上随机分布的噪声小框。
+
+逐对实现的复杂度为O(n^2)且在Python中逐对计算, 超过--greedy-max个框时跳过。
+
+用法:
+    python -m benchmarks.bench_nms --sizes 10 100 1000 10000 --trials 5
+
+Author: Zhu Jiahao
+Date: 2025-08-01
+"""
+
+import argparse
+import time
+import numpy as np
+from src.core.boxes import batched_merge_nms, greedy_merge_nms
+
+
+def synthetic_boxes(n: int, rng: np.random.Generator, width: int = 2100, height: int = 2970) -> list:
+    """ 生成n个框: 约一半为真实框的重复检测 (每个真实框2~5个), 其余为噪声小框
+    """
+    boxes = []
+    while len(boxes) < n // 2:
+        w, h = int(rng.integers(40, 600)), int(rng.integers(40, 400))
+        x, y = int(rng.integers(0, width - w)), int(rng.integers(0, height - h))
+        for _ in range(int(rng.integers(2, 6))):
+            jitter = rng.integers(-4, 5, size=4)
+            boxes.append((x + int(jitter[0]), y + int(jitter[1]), max(w + int(jitter[2]), 1), max(h + int(jitter[3]), 1), w * h))
+    while len(boxes) < n:
+        w, h = int(rng.integers(20, 80)), int(rng.integers(20, 80))
+        boxes.append((int(rng.integers(0, width - w)), int(rng.integers(0, height - h)), w, h, w * h))
+    return boxes[:n]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def run(args) -> None:
+    rng = np.random.default_rng(args.seed)
+    print(f"{'boxes':>7}{'greedy(ms)':>12}{'batched(ms)':>13}{'speedup':>9}{'merged':>8}{'agree':>8}")
+    for n in args.sizes:
+        greedy_ms, batched_ms, agree, merged = [], [], 0, 0
+        for _ in range(args.trials):
+            boxes = synthetic_boxes(n, rng)
+            batched, ms = timed(batched_merge_nms, boxes, args.iou)
+            batched_ms.append(ms)
+            merged = len(batched)
+            if n <= args.greedy_max:
+                greedy, ms = timed(greedy_merge_nms, boxes, args.iou)
+                greedy_ms.append(ms)
+                agree += greedy == batched
+
+        b = float(np.median(batched_ms))
+        if greedy_ms:
+            g = float(np.median(greedy_ms))
+            print(f"{n:>7}{g:>12.2f}{b:>13.2f}{g / b:>8.1f}x{merged:>8}{f'{agree}/{args.trials}':>8}")
+        else:
+            print(f"{n:>7}{'-':>12}{b:>13.2f}{'-':>9}{merged:>8}{'-':>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="合并式NMS基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000], help="框的数量")
+    parser.add_argument("--trials", type=int, default=5, help="每种数量的重复次数")
+    parser.add_argument("--iou", type=float, default=0.6, help="IoU阈值")
+    parser.add_argument("--greedy-max", type=int, default=3000, help="超过该数量时不运行逐对实现")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    run(parser.parse_args())
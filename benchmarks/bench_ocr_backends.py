@@ -0,0 +1,73 @@
+"""
+bench_ocr_backends.py
+
+OCR后端基准测试
+
+对目录中的每张试卷图片分别使用本地OCR (配置文件ocr.local中的ONNX模型) 和远程OCR识别,
+输出每张图片的耗时, 本地置信度, 以及本地结果与远程结果的字符相似度 (difflib),
+用于选择ocr.policy和ocr.min_confidence。
+不指定--remote时远程OCR使用本地OpenAI兼容模拟服务 (固定延迟, 识别文本无意义), 只比较耗时。
+
+用法:
+    python -m benchmarks.bench_ocr_backends --images data/input/images
+    python -m benchmarks.bench_ocr_backends --images data/input/images --remote
+
+Author: Zhu Jiahao
+Date: 2025-08-11
+"""
+
+import argparse
+import contextlib
+import difflib
+import glob
+import io
+import os
+import time
+from benchmarks.fake_llm_server import FakeLLMServer
+from src.api.local_ocr_api import LocalOCRClient, OCRError
+from src.api.qwen_api import QwenClient
+from src.utils.config import __config__
+
+
+def run(args) -> None:
+    files = sorted(glob.glob(os.path.join(args.images, "*.jpg")) + glob.glob(os.path.join(args.images, "*.png")))
+    ocr_config = __config__.get_ocr_config()
+    try:
+        local = LocalOCRClient(**(ocr_config.get("local") or {}))
+    except OCRError as e:
+        print(f"本地OCR不可用: {e}")
+        return
+
+    server = None
+    if args.remote:
+        qwen_config = __config__.get_api_config("qwen")
+        remote = QwenClient(qwen_config.get("api_key"), qwen_config.get("base_url"),
+                            __config__.get_api_config("qwen_vl").get("model"), qwen_config.get("model"),
+                            upload_config=ocr_config.get("upload"))
+    else:
+        server = FakeLLMServer(ttft=args.ttft, token_delay=args.token_delay).start()
+        remote = QwenClient("sk-local", server.base_url, "qwen-vl", "qwen-text")
+
+    print(f"{'image':<20}{'local(s)':>10}{'confidence':>12}{'remote(s)':>11}{'similarity':>12}")
+    try:
+        for path in files:
+            result = local.recognize(path)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                remote_text = remote.ocr_image(path, None)
+            remote_s = time.perf_counter() - start
+            similarity = difflib.SequenceMatcher(None, result["text"], remote_text).ratio()
+            print(f"{os.path.basename(path):<20}{result['elapsed_s']:10.2f}{result['confidence']:12.2f}"
+                  f"{remote_s:11.2f}{similarity:12.2f}")
+    finally:
+        if server is not None:
+            server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OCR后端基准测试")
+    parser.add_argument("--images", default="data/input/images", help="试卷图片目录")
+    parser.add_argument("--remote", action="store_true", help="使用配置文件中的Qwen-VL作为远程OCR")
+    parser.add_argument("--ttft", type=float, default=1.0, help="模拟服务首个token延迟 (s)")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="模拟服务流式分片间隔 (s)")
+    run(parser.parse_args())
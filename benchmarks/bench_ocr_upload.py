@@ -0,0 +1,89 @@
+"""
+bench_ocr_upload.py
+
+OCR上传图片预处理基准测试
+
+对每张试卷图片, 依次尝试多组上传设置 (图像模式, DPI上限, 编码格式与质量, 是否裁剪到文字区域),
+输出上传字节数 (base64后), 预处理耗时。指定--ocr时, 还会用配置文件中的Qwen-VL对每组设置实际识别一次,
+输出识别耗时, 以及与原图识别结果的字符相似度 (difflib), 用于在上传体积和准确率之间取舍。
+
+用法:
+    python -m benchmarks.bench_ocr_upload --images data/input/images
+    python -m benchmarks.bench_ocr_upload --images data/input/images --ocr
+
+Author: Zhu Jiahao
+Date: 2025-08-06
+"""
+
+import argparse
+import difflib
+import glob
+import os
+import tempfile
+import time
+import cv2
+from src.api.qwen_api import QwenClient
+from src.core.ocr_upload import prepare_ocr_image
+from src.utils.config import __config__
+
+SETTINGS = [
+    ("original", None),
+    ("gray-200dpi-q85", {"mode": "gray", "max_dpi": 200, "format": "jpeg", "quality": 85}),
+    ("gray-150dpi-q80", {"mode": "gray", "max_dpi": 150, "format": "jpeg", "quality": 80}),
+    ("gray-150dpi-webp", {"mode": "gray", "max_dpi": 150, "format": "webp", "quality": 80}),
+    ("binary-150dpi-q75", {"mode": "binary", "max_dpi": 150, "format": "jpeg", "quality": 75}),
+    ("gray-120dpi-crop", {"mode": "gray", "max_dpi": 120, "format": "jpeg", "quality": 80, "crop_to_text": True}),
+]
+
+
+def ocr_once(image_path: str, upload_config):
+    """ 使用指定的上传设置识别一次, 返回 (文本, 上传字节数, 识别耗时s)
+    """
+    qwen_config = __config__.get_api_config("qwen")
+    qwen_vl_config = __config__.get_api_config("qwen_vl")
+    client = QwenClient(qwen_config.get("api_key"), qwen_config.get("base_url"), qwen_vl_config.get("model"),
+                        qwen_config.get("model"), upload_config=upload_config)
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "ocr.txt")
+        client.ocr_image(image_path, log_path)
+        with open(log_path, "r", encoding="utf-8") as f:
+            text = f.read()
+    metrics = client.ocr_metrics[-1]
+    return text, metrics["base64_bytes"], metrics["ocr_s"]
+
+
+def run(args) -> None:
+    files = sorted(glob.glob(os.path.join(args.images, "*.jpg")) + glob.glob(os.path.join(args.images, "*.png")))
+    header = f"{'image':<16}{'setting':<20}{'upload(KB)':>12}{'prepare(ms)':>13}"
+    if args.ocr:
+        header += f"{'ocr(s)':>9}{'similarity':>12}"
+    print(header)
+
+    for path in files:
+        image = cv2.imread(path)
+        reference = None
+        for name, config in SETTINGS:
+            start = time.perf_counter()
+            if config is None:
+                with open(path, "rb") as f:
+                    payload = f.read()
+            else:
+                payload, _, _ = prepare_ocr_image(image, config["mode"], config["max_dpi"], config["format"],
+                                                  config["quality"], config.get("crop_to_text", False))
+            prepare_ms = (time.perf_counter() - start) * 1000
+            upload_kb = (len(payload) + 2) // 3 * 4 / 1024
+            line = f"{os.path.basename(path):<16}{name:<20}{upload_kb:>12.0f}{prepare_ms:>13.1f}"
+
+            if args.ocr:
+                text, _, ocr_s = ocr_once(path, config)
+                reference = text if reference is None else reference
+                similarity = difflib.SequenceMatcher(None, reference, text).ratio()
+                line += f"{ocr_s:>9.2f}{similarity:>12.3f}"
+            print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OCR上传图片预处理基准测试")
+    parser.add_argument("--images", required=True, help="A4试卷图片目录 (.jpg/.png)")
+    parser.add_argument("--ocr", action="store_true", help="实际调用Qwen-VL识别并与原图结果比较")
+    run(parser.parse_args())
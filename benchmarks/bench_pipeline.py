@@ -0,0 +1,203 @@
+"""
+bench_pipeline.py
+
+端到端流程基准测试
+
+使用本地替身运行完整流程 (图像预处理 -> OCR -> 答题 -> 位置映射 -> 书写), 不需要摄像头, 网络和机械臂:
+- 图像: 预先录制的摄像头原始画面 (目录中的 .jpg/.png), 未提供时自动生成模拟试卷画面
+- OCR与答题: 本地OpenAI兼容模拟服务 (benchmarks.fake_llm_server), 回放流式回复
+- 书写: 离线模拟机械臂 (src.core.simulator)
+
+输出每个阶段耗时的p50/p95, 每个字符的串口指令数和预计书写时间, 结果保存为JSON, 便于不同版本之间对比。
+
+用法:
+    python -m benchmarks.bench_pipeline --iterations 10 --output bench_pipeline.json
+
+Author: Zhu Jiahao
+Date: 2025-07-30
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import cv2
+import numpy as np
+from benchmarks.fake_llm_server import FakeLLMServer
+from src.api.image_api import OpenCVImageClient
+from src.api.qwen_api import QwenClient
+from src.api.deepseek_api import DeepSeekClient
+from src.api.writing_api import RobotWritingClient
+from src.utils.config import __config__
+from src.utils.timing import StageTimer
+
+DEFAULT_RESPONSES = [
+    {"match": "试卷", "content": "阅读下面的文言文，将画线句子翻译成现代汉语。\n学而时习之，不亦说乎？有朋自远方来，不亦乐乎？"},
+    {"match": "翻译", "content": "学习并且按时温习，不也很愉快吗？有志同道合的人从远方来，不也很快乐吗？"},
+]
+
+
+def synthetic_frames(count: int = 3) -> list:
+    """ 生成模拟的摄像头原始画面 (3840x2160), 画面中为一张带黑色答题框的试卷
+
+    Args:
+        count (int): 画面数量
+
+    Returns:
+        List[np.ndarray]: BGR画面
+    """
+    rng = np.random.default_rng(0)
+    frames = []
+    for i in range(count):
+        # 竖向试卷, 宽度对应摄像头画面高度
+        sheet = np.full((3840, 2160, 3), 235, dtype=np.uint8)
+        for row in range(900, 2400, 60):
+            cols = rng.integers(150, 2000, size=40)
+            for col in cols:
+                cv2.rectangle(sheet, (int(col), row), (int(col) + 18, row + 30), (40, 40, 40), -1)
+        top = 2600 + 40 * i
+        cv2.rectangle(sheet, (200, top), (1960, top + 700), (10, 10, 10), 6)
+        noise = rng.integers(0, 12, size=sheet.shape, dtype=np.uint8)
+        frames.append(cv2.rotate(cv2.subtract(sheet, noise), cv2.ROTATE_90_COUNTERCLOCKWISE))
+    return frames
+
+
+def load_frames(frames_dir: str) -> list:
+    """ 读取录制的摄像头原始画面
+
+    Args:
+        frames_dir (str): 画面目录
+
+    Returns:
+        List[np.ndarray]: BGR画面
+    """
+    paths = sorted(glob.glob(os.path.join(frames_dir, "*.jpg")) + glob.glob(os.path.join(frames_dir, "*.png")))
+    frames = [cv2.imread(p) for p in paths]
+    return [f for f in frames if f is not None]
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def run(args) -> dict:
+    """ 运行基准测试
+
+    Args:
+        args: 命令行参数
+
+    Returns:
+        dict: 测试结果
+    """
+    robot_config = __config__.get_robot_config()
+    assets_config = __config__.get_assets_config()
+
+    frames = load_frames(args.frames) if args.frames else synthetic_frames()
+    if not frames:
+        raise ValueError(f"没有可用的画面: {args.frames}")
+
+    responses = DEFAULT_RESPONSES
+    if args.responses:
+        with open(args.responses, "r", encoding="utf-8") as f:
+            responses = json.load(f)
+    server = FakeLLMServer(responses, ttft=args.ttft, token_delay=args.token_delay).start()
+
+    workdir = tempfile.mkdtemp(prefix="p340_bench_")
+    image_client = OpenCVImageClient(None, args.font or assets_config.get("layout_font", r"C:\Windows\Fonts\simfang.ttf"))
+    qwen_client = QwenClient(api_key="bench", base_url=server.base_url, vl_model="fake-vl", text_model="fake-text")
+    deepseek_client = DeepSeekClient(api_key="bench", base_url=server.base_url, model="fake-chat")
+    simulator_config = dict(robot_config.get("simulator") or {})
+    simulator_config["time_scale"] = args.time_scale
+    robot_writer = RobotWritingClient(
+        None, None,
+        robot_config.get("z_up"),
+        robot_config.get("z_down"),
+        robot_config.get("speed_move"),
+        robot_config.get("speed_write"),
+        robot_config.get("origin_x"),
+        robot_config.get("origin_y"),
+        args.chinese_font or assets_config.get("chinese_fonts"),
+        robot_config.get("motion"),
+        robot_config.get("simplify_tolerance", 0.0),
+        assets_config.get("hershey_cache"),
+        "sim",
+        simulator_config
+    )
+
+    timer = StageTimer()
+    writing = {"chars": 0, "commands": 0, "queries": 0, "motion_time_s": 0.0}
+    for i in range(args.iterations):
+        image_path = os.path.join(workdir, f"{i}.jpg")
+        ocr_path = os.path.join(workdir, f"{i}_ocr.txt")
+        answer_path = os.path.join(workdir, f"{i}_answer.txt")
+        task_path = os.path.join(workdir, f"{i}_task.json")
+
+        with timer.stage("total"):
+            with timer.stage("capture"):
+                cv2.imwrite(image_path, image_client.preprocess_frame(frames[i % len(frames)]))
+            with timer.stage("ocr"):
+                text = qwen_client.ocr_image(image_path, ocr_path)
+            with timer.stage("answer"):
+                answer = deepseek_client.answer_text(text, answer_path, question_type="translation")
+            with timer.stage("position_mapping"):
+                img, _, _, mm_per_pixel_x, mm_per_pixel_y, px_per_mm_y = image_client.load_image_and_get_scale(image_path)
+                box = image_client.detect_single_black_box(img, os.path.join(workdir, f"{i}_box.png"))
+                image_client.generate_writing_task(img, box, answer, mm_per_pixel_x, mm_per_pixel_y, px_per_mm_y,
+                                                   os.path.join(workdir, f"{i}_preview.png"), task_path)
+            with timer.stage("writing"):
+                before = robot_writer.ua.stats()
+                tasks = robot_writer.load_writing_tasks(task_path)
+                robot_writer.write_tasks(tasks, robot_config.get("optimize_path", True))
+                after = robot_writer.ua.stats()
+
+        writing["chars"] += sum(len(t.get("text", "").replace(" ", "")) for t in tasks)
+        for key in ("commands", "queries", "motion_time_s"):
+            writing[key] += after[key] - before[key]
+
+    server.stop()
+
+    chars = max(writing["chars"], 1)
+    return {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "iterations": args.iterations,
+        "stages": timer.summary(),
+        "writing": {
+            "chars": writing["chars"],
+            "commands_per_char": writing["commands"] / chars,
+            "queries_per_char": writing["queries"] / chars,
+            "serial_calls_per_char": (writing["commands"] + writing["queries"]) / chars,
+            "estimated_writing_s_per_char": writing["motion_time_s"] / chars,
+            "estimated_writing_s_per_iteration": writing["motion_time_s"] / max(args.iterations, 1),
+        },
+        "_table": timer.format_summary(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="端到端流程基准测试")
+    parser.add_argument("--iterations", type=int, default=5, help="运行次数")
+    parser.add_argument("--frames", help="录制的摄像头画面目录, 默认生成模拟画面")
+    parser.add_argument("--responses", help="模拟服务回放的回复文件 (JSON)")
+    parser.add_argument("--ttft", type=float, default=0.3, help="模拟服务首个token延迟 (s)")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="模拟服务流式分片间隔 (s)")
+    parser.add_argument("--time-scale", type=float, default=50.0, help="模拟机械臂的时间加速倍数")
+    parser.add_argument("--font", help="排版字体路径, 默认使用配置文件中的assets.layout_font")
+    parser.add_argument("--chinese-font", help="中文笔画字体路径, 默认使用配置文件中的assets.chinese_fonts")
+    parser.add_argument("--output", default="bench_pipeline.json", help="结果文件路径 (JSON)")
+    args = parser.parse_args()
+
+    result = run(args)
+    print(result.pop("_table"))
+    print(json.dumps(result["writing"], ensure_ascii=False, indent=2))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存至: {args.output}")
@@ -0,0 +1,65 @@
+"""
+bench_preprocess.py
+
+画面预处理基准测试
+
+对比两种预处理顺序 (camera.preprocess.crop_first):
+- 原顺序: 旋转整帧 -> 增强整帧 -> 缩放到A4宽度 -> 裁掉上下边
+- 先裁剪: 只取出保留的区域 -> 旋转 -> 增强 -> 缩放
+输出每帧耗时和两种顺序结果的差异 (最大差值, 平均差值, 差值超过2的像素比例)。
+
+用法:
+    python -m benchmarks.bench_preprocess --repeat 10
+    python -m benchmarks.bench_preprocess --images data/input/raw_frames
+
+Author: Zhu Jiahao
+Date: 2025-08-02
+"""
+
+import argparse
+import glob
+import os
+import time
+import cv2
+import numpy as np
+from benchmarks.bench_enhance import synthetic_frame
+from src.api.image_api import OpenCVImageClient
+
+
+def timed(client: OpenCVImageClient, frame: np.ndarray, repeat: int):
+    result = client.preprocess_frame(frame)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        client.preprocess_frame(frame)
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def run(args) -> None:
+    if args.images:
+        files = sorted(glob.glob(os.path.join(args.images, "*.jpg")) + glob.glob(os.path.join(args.images, "*.png")))
+        frames = [(os.path.basename(f), cv2.imread(f)) for f in files]
+    else:
+        frames = [(f"synthetic-{i}", synthetic_frame(3840, 2160, seed=i)) for i in range(args.frames)]
+
+    legacy = OpenCVImageClient(None, preprocess_config={"crop_first": False})
+    fast = OpenCVImageClient(None, preprocess_config={"crop_first": True})
+
+    print(f"{'frame':<16}{'size':>12}{'legacy(ms)':>12}{'crop_first(ms)':>16}{'max diff':>10}{'mean diff':>11}{'>2 (%)':>9}")
+    for name, frame in frames:
+        ref, ref_ms = timed(legacy, frame, args.repeat)
+        out, out_ms = timed(fast, frame, args.repeat)
+        if ref.shape != out.shape:
+            print(f"{name:<16} 输出尺寸不一致: {ref.shape} vs {out.shape}")
+            continue
+        diff = np.abs(ref.astype(np.int16) - out.astype(np.int16))
+        size = f"{ref.shape[1]}x{ref.shape[0]}"
+        print(f"{name:<16}{size:>12}{ref_ms:>12.1f}{out_ms:>16.1f}{int(diff.max()):>10}"
+              f"{float(diff.mean()):>11.3f}{float((diff > 2).mean() * 100):>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="画面预处理基准测试")
+    parser.add_argument("--images", help="摄像头原始画面目录 (.jpg/.png), 默认生成模拟画面")
+    parser.add_argument("--frames", type=int, default=3, help="模拟画面数量")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数")
+    run(parser.parse_args())
@@ -0,0 +1,104 @@
+"""
+bench_router.py
+
+题型路由基准测试
+
+使用一页包含四种题型的模拟试卷, 在本地OpenAI兼容模拟服务上对比:
+- 串行: 逐题判断题型并作答 (answer_question)
+- 并发: 一次提交全部题目 (answer_questions), 总耗时应接近最慢的一道题
+同时输出每道题的本地规则分类结果, 以及需要模型分类的题目数。
+开始前先检查题目切分 (SPLIT_CASES), 切分结果与预期不一致时以返回码1退出。
+
+用法:
+    python -m benchmarks.bench_router --ttft 0.3 --token-delay 0.02
+
+Author: Zhu Jiahao
+Date: 2025-08-08
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from benchmarks.fake_llm_server import FakeLLMServer
+from src.api.deepseek_api import DeepSeekClient
+from src.core.answer import classify_question_local, split_questions
+
+SHEET = """期中测试
+1. 阅读下面的文言文，将画线句子翻译成现代汉语。
+学而时习之，不亦说乎？有朋自远方来，不亦乐乎？
+2. 计算：12 + 35 = ?  48 ÷ 6 = ?  7 × 8 = ?
+3. 书面表达：Write a short letter to your friend about your summer holiday, about 80 words.
+4. 甲乙丙三人中只有一人说了真话，请推理谁是凶手。
+"""
+
+# 题目切分检查: (整页文本, 预期题目数)
+SPLIT_CASES = [
+    (SHEET, 4),
+    # OCR换行后行首出现小数, 不是新题目的编号
+    ("1. 计算下列各式\n2.5×4=?\n3.2+1=?", 1),
+    ("1．计算圆的面积, π取\n3.14\n2．化简", 2),
+    ("1、填空\n2、判断", 2),
+]
+
+RESPONSES = [
+    {"match": "文言文", "content": "学习并且按时温习，不也很愉快吗？有志同道合的人从远方来，不也很快乐吗？"},
+    {"match": "算数题", "content": "47，8，56"},
+    {"match": "英语作文", "content": "Dear Tom, I had a wonderful summer holiday. " * 6},
+    {"match": "侦探", "content": "甲说了真话，乙丙说谎，因此凶手是丙。"},
+]
+
+
+def check_split() -> bool:
+    """ 检查题目切分是否与预期一致
+    """
+    ok = True
+    for text, expected in SPLIT_CASES:
+        questions = split_questions(text)
+        if len(questions) != expected:
+            print(f"题目切分错误: 预期 {expected} 道题, 得到 {questions}")
+            ok = False
+    return ok
+
+
+def run(args) -> int:
+    if not check_split():
+        return 1
+
+    server = FakeLLMServer(RESPONSES, ttft=args.ttft, token_delay=args.token_delay).start()
+    client = DeepSeekClient("sk-local", server.base_url, "deepseek-chat")
+    questions = split_questions(SHEET)
+
+    print(f"{'#':<4}{'local type':<14}scores")
+    for i, question in enumerate(questions):
+        question_type, scores = classify_question_local(question)
+        print(f"{i + 1:<4}{question_type or '-':<14}{scores}")
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            for i, question in enumerate(questions):
+                question_path = os.path.join(tmp, f"q{i}.txt")
+                with open(question_path, "w", encoding="utf-8") as f:
+                    f.write(question)
+                client.answer_question(question_path, os.path.join(tmp, f"a{i}.txt"))
+            serial_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        answers = client.answer_questions(questions)
+        concurrent_s = time.perf_counter() - start
+    finally:
+        server.stop()
+
+    print(f"串行: {serial_s:.2f}s, 并发: {concurrent_s:.2f}s, 加速 {serial_s / concurrent_s:.2f}x")
+    for i, answer in enumerate(answers):
+        print(f"{i + 1}. {answer[:40]}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="题型路由基准测试")
+    parser.add_argument("--ttft", type=float, default=0.3, help="模拟服务首个token延迟 (s)")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="模拟服务流式分片间隔 (s)")
+    sys.exit(run(parser.parse_args()))
@@ -0,0 +1,97 @@
+"""
+bench_stream_sink.py
+
+流式输出分发基准测试
+
+1. 分发开销: 同一组分片分别用原写法 (每个分片 print(..., flush=True) + 文件写入 + 字符串拼接) 和
+   StreamSink (批量刷新终端 + 缓冲写文件 + 分片收集) 处理, 终端输出重定向到空设备, 比较每个分片的耗时;
+   提供--font时再加上增量排版订阅者 (LayoutSubscriber)
+2. 单次调用统计: 在本地OpenAI兼容模拟服务上调用DeepSeekClient.answer_text, 输出每次调用的首个token延迟和输出速度
+
+用法:
+    python -m benchmarks.bench_stream_sink --chunks 5000 --font C:\\Windows\\Fonts\\simfang.ttf
+
+Author: Zhu Jiahao
+Date: 2025-08-10
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from PIL import ImageFont
+from benchmarks.fake_llm_server import FakeLLMServer
+from src.api.deepseek_api import DeepSeekClient
+from src.core.layout import StreamingLayout
+from src.core.stream_sink import ChunkCollector, ConsoleSubscriber, FileSubscriber, LayoutSubscriber, StreamSink
+
+SAMPLE_TEXT = "学而时习之，不亦说乎？有朋自远方来，不亦乐乎？人不知而不愠，不亦君子乎？"
+
+
+def legacy(chunks, console, path: str) -> str:
+    """ 原写法: 每个分片刷新一次终端, 直接写文件, 拼接字符串
+    """
+    result = ""
+    with open(path, "w", encoding="utf-8") as f:
+        for content in chunks:
+            result += content
+            print(content, end="", flush=True, file=console)
+            f.write(content)
+    print(" ", file=console)
+    return result
+
+
+def with_sink(chunks, console, path: str, layout=None) -> str:
+    collector = ChunkCollector()
+    layout_subscriber = LayoutSubscriber(layout) if layout is not None else None
+    with StreamSink(ConsoleSubscriber(console), FileSubscriber(path), collector, layout_subscriber) as sink:
+        for content in chunks:
+            sink(content)
+    return collector.text()
+
+
+def run(args) -> None:
+    text = (SAMPLE_TEXT * (args.chunks * 2 // len(SAMPLE_TEXT) + 1))[:args.chunks * 2]
+    chunks = [text[i:i + 2] for i in range(0, len(text), 2)]
+
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w", encoding="utf-8") as console:
+        path = os.path.join(tmp, "answer.txt")
+        cases = [("原写法", lambda: legacy(chunks, console, path)),
+                 ("StreamSink", lambda: with_sink(chunks, console, path))]
+        if args.font:
+            font = ImageFont.truetype(args.font, 40)
+            make_layout = lambda: StreamingLayout(font, (100, 100, 1800, 100000), 0.1, 0.1, 10.0)
+            cases.append(("StreamSink + 排版", lambda: with_sink(chunks, console, path, make_layout())))
+
+        for name, fn in cases:
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                assert fn() == text
+            elapsed = (time.perf_counter() - start) / args.repeat
+            print(f"{name:<18}{elapsed * 1000:8.1f} ms, 每个分片 {elapsed / len(chunks) * 1e6:.2f} us")
+
+    server = FakeLLMServer([{"match": "", "content": SAMPLE_TEXT * 2}], ttft=args.ttft,
+                           token_delay=args.token_delay).start()
+    client = DeepSeekClient("sk-local", server.base_url, "deepseek-chat")
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(args.calls):
+                client.answer_text(SAMPLE_TEXT, question_type="translation")
+    finally:
+        server.stop()
+    print(f"{'#':<4}{'ttft_s':>8}{'total_s':>9}{'tokens':>8}{'tokens/s':>10}")
+    for i, m in enumerate(client.answer_metrics):
+        print(f"{i + 1:<4}{m['ttft_s']:8.2f}{m['total_s']:9.2f}{m['tokens']:8d}{m['tokens_per_s']:10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="流式输出分发基准测试")
+    parser.add_argument("--chunks", type=int, default=5000, help="分片数 (每个分片2个字符)")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数")
+    parser.add_argument("--font", default=None, help="排版字体路径, 提供时测试排版订阅者")
+    parser.add_argument("--calls", type=int, default=3, help="模拟服务上的调用次数")
+    parser.add_argument("--ttft", type=float, default=0.3, help="模拟服务首个token延迟 (s)")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="模拟服务流式分片间隔 (s)")
+    run(parser.parse_args())
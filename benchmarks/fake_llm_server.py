@@ -0,0 +1,213 @@
+"""
+fake_llm_server.py
+
+本地OpenAI兼容接口模拟服务, 用于基准测试与离线联调
+
+支持 POST /v1/chat/completions (流式与非流式), 按预先录制的回复进行回放:
+- 回复文件为JSON列表, 每一项为 {"match": "<用户消息中包含的子串>", "chunks": [...]} 或 {"match": ..., "content": "..."}
+- 没有匹配项时使用默认回复
+- 可以配置首个token延迟 (ttft) 与token间隔, 以模拟真实服务的流式速度
+- 可以按比例返回503错误 (fail_rate), 用于测试重试
+
+用法:
+    python -m benchmarks.fake_llm_server --port 8001 --responses responses.json
+
+Author: Zhu Jiahao
+Date: 2025-07-30
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+__all__ = ['FakeLLMServer']
+
+DEFAULT_REPLY = "这是本地模拟服务返回的回答。"
+
+
+class FakeLLMServer:
+    """ OpenAI兼容的本地模拟服务
+    """
+    def __init__(self,
+                responses: Optional[List[dict]] = None,
+                ttft: float = 0.3,
+                token_delay: float = 0.02,
+                chunk_chars: int = 2,
+                host: str = "127.0.0.1",
+                port: int = 0,
+                fail_rate: float = 0.0):
+        """
+        初始化
+
+        Args:
+            responses (List[dict]): 录制的回复列表
+            ttft (float): 首个token延迟 (s)
+            token_delay (float): 相邻两个流式分片的间隔 (s)
+            chunk_chars (int): 未提供chunks时, 每个分片包含的字符数
+            host (str): 监听地址
+            port (int): 监听端口, 0表示自动分配
+            fail_rate (float): 请求直接返回503错误的比例, 0~1
+        """
+        self.responses = responses or []
+        self.ttft = ttft
+        self.token_delay = token_delay
+        self.chunk_chars = max(chunk_chars, 1)
+        self.fail_rate = fail_rate
+        self.requests = 0
+        self.failures = 0
+        self._server = ThreadingHTTPServer((host, port), self.__make_handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeLLMServer":
+        """ 在后台线程中启动服务
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """ 停止服务
+        """
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self) -> None:
+        """ 在当前线程中运行服务
+        """
+        self._server.serve_forever()
+
+    def reply_chunks(self, messages: List[dict]) -> List[str]:
+        """ 根据请求消息选择回复, 并切分为流式分片
+
+        Args:
+            messages (List[dict]): 请求中的消息列表
+
+        Returns:
+            List[str]: 回复分片
+        """
+        text = json.dumps(messages, ensure_ascii=False)
+        for item in self.responses:
+            if item.get("match", "") in text:
+                if "chunks" in item:
+                    return list(item["chunks"])
+                return self.__split(item.get("content", ""))
+        return self.__split(DEFAULT_REPLY)
+
+    def __split(self, content: str) -> List[str]:
+        return [content[i:i + self.chunk_chars] for i in range(0, len(content), self.chunk_chars)]
+
+    def __make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                server.requests += 1
+                if server.fail_rate and random.random() < server.fail_rate:
+                    server.failures += 1
+                    self.send_error(503, "Service Unavailable (injected)")
+                    return
+                chunks = server.reply_chunks(body.get("messages", []))
+                model = body.get("model", "fake-model")
+                completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+                usage = {"prompt_tokens": len(json.dumps(body.get("messages", []), ensure_ascii=False)) // 2,
+                         "completion_tokens": len(chunks)}
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+                time.sleep(server.ttft)
+                if body.get("stream"):
+                    self.__stream(completion_id, model, chunks, usage, body.get("stream_options") or {})
+                else:
+                    time.sleep(server.token_delay * len(chunks))
+                    self.__send_json({
+                        "id": completion_id,
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": "".join(chunks)}}],
+                        "usage": usage,
+                    })
+
+            def __send_json(self, data: dict) -> None:
+                payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def __stream(self, completion_id: str, model: str, chunks: List[str], usage: dict, options: dict) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+
+                def event(delta: dict, finish_reason=None, extra: dict = None) -> None:
+                    data = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                    }
+                    if extra:
+                        data.update(extra)
+                    self.wfile.write(f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+
+                event({"role": "assistant", "content": ""})
+                for i, chunk in enumerate(chunks):
+                    if i:
+                        time.sleep(server.token_delay)
+                    event({"content": chunk})
+                event({}, "stop")
+                if options.get("include_usage"):
+                    self.wfile.write(("data: " + json.dumps({
+                        "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": model, "choices": [], "usage": usage}) + "\n\n").encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地OpenAI兼容接口模拟服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--responses", help="录制的回复文件 (JSON)")
+    parser.add_argument("--ttft", type=float, default=0.3, help="首个token延迟 (s)")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="流式分片间隔 (s)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="返回503错误的请求比例")
+    args = parser.parse_args()
+
+    responses = None
+    if args.responses:
+        with open(args.responses, "r", encoding="utf-8") as f:
+            responses = json.load(f)
+    fake = FakeLLMServer(responses, args.ttft, args.token_delay, host=args.host, port=args.port,
+                         fail_rate=args.fail_rate)
+    print(f"模拟服务已启动: {fake.base_url}")
+    fake.serve_forever()
@@ -14,6 +14,79 @@ from src.api.writing_api import RobotWritingClient
 from src.utils.utils import read_txt_file, format_text_to_json
 from src.utils.config import __config__
 from src.utils.logger import __logger__
+from src.utils.timing import StageTimer
+from src.core.pipeline import StreamingAnswerPipeline
+from src.core.batch import BatchPageProcessor
+from src.core.response_cache import ResponseCache
+from src.core.answer import parse_split_units, split_questions, unit_questions
+from src.api.llm_transport import LLMTransport, LLMError
+from src.api.local_ocr_api import LocalOCRClient, OCRError
+from src.core.ocr_router import OCRRouter
+from src.core.motion import MotionError
+
+def run_writing_tasks(robot_writer: RobotWritingClient, robot_config: dict, task_path: str) -> None:
+    """
+    读取写字任务并控制机械臂书写, 配置了运动程序缓存目录时, 先编译 (或读取缓存) 再回放
+
+    Args:
+        robot_writer (RobotWritingClient): 机械臂书写服务
+        robot_config (dict): 机器人配置
+        task_path (str): 写字任务文件路径
+    """
+    tasks = robot_writer.load_writing_tasks(task_path)
+    optimize = robot_config.get("optimize_path", True)
+    toolpath_cache = robot_config.get("toolpath_cache")
+    if toolpath_cache:
+        program = robot_writer.load_or_compile_tasks(tasks, toolpath_cache, optimize)
+        robot_writer.replay_toolpath(program)
+    else:
+        robot_writer.write_tasks(tasks, optimize)
+
+def remember_task(cache: ResponseCache, task_path: str) -> None:
+    """
+    将本次生成的写字任务存入缓存, 书写失败 (如卡笔) 后可以直接重新书写, 不必重新拍照, 识别和作答
+
+    Args:
+        cache (ResponseCache): 缓存
+        task_path (str): 写字任务文件路径
+    """
+    if cache is not None and os.path.exists(task_path):
+        cache.put(ResponseCache.key("last_task"), read_txt_file(task_path))
+
+def recall_task(cache: ResponseCache, task_path: str) -> bool:
+    """
+    从缓存中取出上一次生成的写字任务, 写入任务文件
+
+    Args:
+        cache (ResponseCache): 缓存
+        task_path (str): 写字任务文件路径
+
+    Returns:
+        bool: 是否存在上一次的任务
+    """
+    tasks = cache.get(ResponseCache.key("last_task")) if cache is not None else None
+    if tasks is None:
+        return False
+    with open(task_path, "w", encoding="utf-8") as f:
+        f.write(tasks)
+    return True
+
+def save_simulated_drawing(robot_writer: RobotWritingClient, drawing_path: str) -> None:
+    """
+    使用模拟机械臂时, 保存书写轨迹图片并输出运动统计
+
+    Args:
+        robot_writer (RobotWritingClient): 机械臂书写服务
+        drawing_path (str): 轨迹图片保存路径
+    """
+    if robot_writer.backend != "sim":
+        return
+    robot_writer.ua.save_drawing(drawing_path)
+    stats = robot_writer.ua.stats()
+    __logger__.get_module_logger("pipeline").info(
+        f"模拟书写完成: {stats['commands']} 条运动指令, {stats['queries']} 次查询, "
+        f"运动时长 {stats['motion_time_s']:.1f}s, 轨迹图已保存至: {drawing_path}"
+    )
 
 def main():
     """
@@ -21,6 +94,9 @@ def main():
     """
     pipeline_logger = __logger__.get_module_logger("pipeline")
 
+    # 清空上一次运行的输入/输出目录 (只在主进程中进行, 导入配置模块时不会清空)
+    __config__.create_dict()
+
     # 初始化
     path_config = __config__.get_path_config()
     camera_config = __config__.get_camera_config()
@@ -28,6 +104,11 @@ def main():
     qwen_vl_config = __config__.get_api_config("qwen_vl")
     deepseek_config = __config__.get_api_config("deepseek")
     robot_config = __config__.get_robot_config()
+    batch_config = __config__.get_batch_config()
+    cache_config = __config__.get_cache_config()
+    ocr_config = __config__.get_ocr_config()
+    llm_config = __config__.get_llm_config()
+    answer_config = __config__.get_answer_config()
     assets_confog = __config__.get_assets_config()
 
     # 文件路径
@@ -41,9 +122,16 @@ def main():
     BOX_VIZ_IMAGE_FILENAME = os.path.join(OUTPUT_LOG_PATH, "box_viz_image.png")         # 标注答题框的图片
     PREVIEW_IMAGE_FILENAME = os.path.join(OUTPUT_LOG_PATH, "preview.png")               # 预览图
     TASK_FILENAME = os.path.join(OUTPUT_LOG_PATH, "task.json")                          # 任务编排
+    PAGES_PATH = os.path.join(INPUT_IMAGE_PATH, "pages")                                # 多页拍摄的页面图片
+    BATCH_OUTPUT_PATH = os.path.join(OUTPUT_LOG_PATH, "batch")                          # 批量处理的逐页结果
+    TIMING_FILENAME = os.path.join(OUTPUT_LOG_PATH, "timing.json")                      # 各阶段耗时
+    SIM_DRAWING_FILENAME = os.path.join(OUTPUT_LOG_PATH, "sim_drawing.png")             # 模拟器书写轨迹
 
     image_client = OpenCVImageClient(
-        camera_config.get("id")
+        camera_config.get("id"),
+        assets_confog.get("layout_font", r"C:\Windows\Fonts\simfang.ttf"),
+        camera_config.get("preprocess"),
+        camera_config.get("grabber")
     )
 
     robot_writer = RobotWritingClient(
@@ -55,25 +143,61 @@ def main():
         robot_config.get("speed_write"),
         robot_config.get("origin_x"),
         robot_config.get("origin_y"),
-        assets_confog.get("chinese_fonts")
+        assets_confog.get("chinese_fonts"),
+        robot_config.get("motion"),
+        robot_config.get("simplify_tolerance", 0.0),
+        assets_confog.get("hershey_cache"),
+        robot_config.get("backend", "p340"),
+        robot_config.get("simulator")
     )
 
+    response_cache = None
+    if cache_config.get("dir"):
+        response_cache = ResponseCache(
+            cache_config.get("dir"),
+            cache_config.get("max_size_mb", 200),
+            cache_config.get("ttl_hours", 168)
+        )
+
     qwen_client = QwenClient(
         api_key=qwen_config.get("api_key"),
         base_url=qwen_config.get("base_url"),
         vl_model=qwen_vl_config.get("model"),
-        text_model=qwen_config.get("model")
+        text_model=qwen_config.get("model"),
+        cache=response_cache,
+        upload_config=ocr_config.get("upload"),
+        transport_config=llm_config
+    )
+
+    local_ocr = None
+    local_ocr_config = ocr_config.get("local") or {}
+    if ocr_config.get("policy", "remote") != "remote" and local_ocr_config.get("det_model"):
+        try:
+            local_ocr = LocalOCRClient(**local_ocr_config)
+        except OCRError as e:
+            pipeline_logger.warning(f"本地OCR不可用: {e}")
+
+    ocr_router = OCRRouter(
+        qwen_client,
+        local_ocr,
+        ocr_config.get("policy", "remote"),
+        ocr_config.get("min_confidence", 0.6)
     )
 
     deepseek_client = DeepSeekClient(
         api_key=deepseek_config.get("api_key"),
         base_url=deepseek_config.get("base_url"),
-        model=deepseek_config.get("model")
+        model=deepseek_config.get("model"),
+        cache=response_cache,
+        transport_config=llm_config
     )
 
     print("请选择操作类型: ")
     print("[1] 直接书写")
     print("[2] AI答题")
+    print("[3] AI答题 (边作答边书写)")
+    print("[4] 多页批量答题")
+    print("[5] 重新书写上一次的答案")
     
     strategy = input()
 
@@ -82,19 +206,13 @@ def main():
         text = input()
         format_text_to_json(text, TASK_FILENAME)
         robot_writer.go_center()
-        tasks = robot_writer.load_writing_tasks(TASK_FILENAME)
-        for task in tasks:
-            robot_writer.write_text_line(
-                task.get("text"),
-                task.get("a4_x_mm"),
-                task.get("a4_y_mm"),
-                task.get("char_height_mm"),
-                task.get("char_spacing_ratio")
-            )
+        run_writing_tasks(robot_writer, robot_config, TASK_FILENAME)
         robot_writer.stand_by()
+        save_simulated_drawing(robot_writer, SIM_DRAWING_FILENAME)
 
 
     if strategy == "2":
+        timer = StageTimer()
         pipeline_logger.info("=====================================================")
         pipeline_logger.info("===               Start the Pipeline              ===")
         pipeline_logger.info("=====================================================")
@@ -106,7 +224,8 @@ def main():
         pipeline_logger.info("=====================================================")
         pipeline_logger.info("")
 
-        image_client.capture_single_image(IMAGE_FILENAME)           # 试卷实体 -> IMAGE
+        with timer.stage("capture"):
+            image_client.capture_single_image(IMAGE_FILENAME)       # 试卷实体 -> IMAGE
 
         # Step 2: OCR生成文本
         pipeline_logger.info("=====================================================")
@@ -114,17 +233,8 @@ def main():
         pipeline_logger.info("=====================================================")
         pipeline_logger.info("")
 
-        qwen_client.ocr_image(IMAGE_FILENAME, OCR_FILENAME)         # IMAGE -> OCR_TXT
-
-        # Step 3: 文本分割
-        # pipeline_logger.info("=====================================================")
-        # pipeline_logger.info("===                Step3: Text Split              ===")
-        # pipeline_logger.info("=====================================================")
-        # pipeline_logger.info("")
-
-        # full_text = read_txt_file(OCR_FILENAME)
-        # print(qwen_client.text_split(full_text))
-
+        with timer.stage("ocr"):
+            full_text = ocr_router.ocr_image(IMAGE_FILENAME, OCR_FILENAME)      # IMAGE -> OCR_TXT
 
         # Step 3: AI生成答案
         pipeline_logger.info("=====================================================")
@@ -132,10 +242,26 @@ def main():
         pipeline_logger.info("=====================================================")
         pipeline_logger.info("")
 
-        # deepseek_client.answer_reasoning_question(OCR_FILENAME, ANSWER_FILENAME)        # OCR_TXT -> ANSWER_TXT
-        deepseek_client.answer_translation_question(OCR_FILENAME, ANSWER_FILENAME)
-        # deepseek_client.answer_english_question(OCR_FILENAME, ANSWER_FILENAME)
-        # deepseek_client.answer_math_question(OCR_FILENAME, ANSWER_FILENAME)
+        with timer.stage("split"):
+            # 只有检测到多个答题框时才切分题目, 单个答题框时整页作为一道题作答 (阅读材料中的编号行不是独立的题目)
+            img, img_w, img_h, mm_per_pixel_x, mm_per_pixel_y, px_per_mm_y = image_client.load_image_and_get_scale(IMAGE_FILENAME)
+            regions = image_client.detect_answer_boxes(img, BOX_VIZ_IMAGE_FILENAME)
+            questions = [full_text]
+            if len(regions) > 1:
+                # local: 按题目编号切分; model: 由模型按 "==== UnitN ====" / "【第N题】" 格式切分后本地解析
+                # auto: 按编号能切出多道题时不再请求模型 (模型切分需要原样输出整页文本, 耗时与整页作答相当)
+                split_mode = answer_config.get("split", "auto")
+                questions = split_questions(full_text) if split_mode != "model" else []
+                if split_mode == "model" or (split_mode == "auto" and len(questions) < 2):
+                    units = parse_split_units(qwen_client.text_split(full_text))
+                    questions = unit_questions(units) or split_questions(full_text)
+
+        with timer.stage("answer"):
+            # 每道题自动判断题型并选择提示词, 互相独立的题目并发作答, 答案按题目顺序排列
+            answers = deepseek_client.answer_questions(questions, max_concurrency=answer_config.get("max_concurrency"))
+            answer = "\n".join(a for a in answers if a)
+            with open(ANSWER_FILENAME, "w", encoding="utf-8") as f:                # OCR_TXT -> ANSWER_TXT
+                f.write(answer)
 
         # Step 4: 位置映射
         pipeline_logger.info("=====================================================")
@@ -143,11 +269,23 @@ def main():
         pipeline_logger.info("=====================================================")
         pipeline_logger.info("")
 
-        answer = read_txt_file(ANSWER_FILENAME)
-        img, img_w, img_h, mm_per_pixel_x, mm_per_pixel_y, px_per_mm_y = image_client.load_image_and_get_scale(IMAGE_FILENAME)
-        box = image_client.detect_single_black_box(img, BOX_VIZ_IMAGE_FILENAME)
-        image_client.generate_writing_task(img, box, answer, mm_per_pixel_x, mm_per_pixel_y,
-                                        px_per_mm_y, PREVIEW_IMAGE_FILENAME, TASK_FILENAME)      # ANSWER_TXT -> TASK_JSON
+        with timer.stage("position_mapping"):
+            if len(regions) > 1 and len(answers) == len(regions):
+                # 题目数与答题框数一致: 第i道题的答案写入阅读顺序中的第i个答题框
+                image_client.generate_writing_tasks(img, regions, answers, mm_per_pixel_x, mm_per_pixel_y,
+                                                    px_per_mm_y, PREVIEW_IMAGE_FILENAME, TASK_FILENAME)
+            else:
+                # 单个答题框, 或无法确定对应关系: 全部答案写入面积最大的答题框
+                if len(regions) > 1:
+                    pipeline_logger.warning(f"题目数量 ({len(answers)}) 与答题框数量 ({len(regions)}) 不一致, "
+                                            f"全部答案写入面积最大的答题框")
+                if regions:
+                    box = max(regions, key=lambda r: r["area"])["box"]
+                else:
+                    box = image_client.detect_single_black_box(img, BOX_VIZ_IMAGE_FILENAME)
+                image_client.generate_writing_task(img, box, answer, mm_per_pixel_x, mm_per_pixel_y,
+                                                px_per_mm_y, PREVIEW_IMAGE_FILENAME, TASK_FILENAME)  # ANSWER -> TASK_JSON
+            remember_task(response_cache, TASK_FILENAME)
         
 
         # Step 5: 机械臂书写
@@ -156,23 +294,114 @@ def main():
         pipeline_logger.info("=====================================================")
         pipeline_logger.info("")
 
-        robot_writer.go_center()
-        tasks = robot_writer.load_writing_tasks(TASK_FILENAME)
-        for task in tasks:
-            robot_writer.write_text_line(
-                task.get("text"),
-                task.get("a4_x_mm"),
-                task.get("a4_y_mm"),
-                task.get("char_height_mm"),
-                task.get("char_spacing_ratio")
+        with timer.stage("writing"):
+            robot_writer.go_center()
+            run_writing_tasks(robot_writer, robot_config, TASK_FILENAME)
+
+        pipeline_logger.info("=====================================================")
+        pipeline_logger.info("===               Pipeline Finished               ===")
+        pipeline_logger.info("=====================================================")
+        for line in timer.format_summary().splitlines():
+            pipeline_logger.info(line)
+        timer.save(TIMING_FILENAME, cache=response_cache.stats() if response_cache else None,
+                   ocr=qwen_client.ocr_metrics, ocr_route=ocr_router.ocr_metrics,
+                   answer=deepseek_client.answer_metrics, llm=LLMTransport.all_metrics())
+        robot_writer.stand_by()
+        save_simulated_drawing(robot_writer, SIM_DRAWING_FILENAME)
+
+    if strategy == "3":
+        timer = StageTimer()
+        pipeline_logger.info("=====================================================")
+        pipeline_logger.info("===          Start the Streaming Pipeline         ===")
+        pipeline_logger.info("=====================================================")
+        pipeline_logger.info("")
+
+        with timer.stage("capture"):
+            image_client.capture_single_image(IMAGE_FILENAME)       # 试卷实体 -> IMAGE
+
+        with timer.stage("ocr"):
+            full_text = ocr_router.ocr_image(IMAGE_FILENAME, OCR_FILENAME)      # IMAGE -> OCR_TXT
+
+        # 先定位答题框, 使答案的第一行生成后即可排版书写
+        with timer.stage("position_mapping"):
+            img, img_w, img_h, mm_per_pixel_x, mm_per_pixel_y, px_per_mm_y = image_client.load_image_and_get_scale(IMAGE_FILENAME)
+            box = image_client.detect_single_black_box(img, BOX_VIZ_IMAGE_FILENAME)
+            layout = image_client.create_streaming_layout(box, mm_per_pixel_x, mm_per_pixel_y, px_per_mm_y)
+        if layout is None:
+            return
+
+        # 答案生成, 排版和书写同时进行
+        with timer.stage("answer_and_writing"):
+            robot_writer.go_center()
+            pipeline = StreamingAnswerPipeline(robot_writer, layout, robot_config.get("optimize_path", True))
+            stats = pipeline.run(
+                lambda on_delta: deepseek_client.answer_text(full_text, ANSWER_FILENAME, on_delta)
             )
+        layout.save_tasks(TASK_FILENAME)
+        remember_task(response_cache, TASK_FILENAME)
+        layout.render_preview(img, PREVIEW_IMAGE_FILENAME)
 
         pipeline_logger.info("=====================================================")
         pipeline_logger.info("===               Pipeline Finished               ===")
         pipeline_logger.info("=====================================================")
+        for line in timer.format_summary().splitlines():
+            pipeline_logger.info(line)
+        timer.save(TIMING_FILENAME, streaming=stats, cache=response_cache.stats() if response_cache else None,
+                   ocr=qwen_client.ocr_metrics, ocr_route=ocr_router.ocr_metrics,
+                   answer=deepseek_client.answer_metrics, llm=LLMTransport.all_metrics())
         robot_writer.stand_by()
+        save_simulated_drawing(robot_writer, SIM_DRAWING_FILENAME)
 
+    if strategy == "4":
+        print("请输入试卷图片目录 (直接回车则用摄像头逐页拍摄): ")
+        image_dir = input().strip()
+        raw = batch_config.get("raw", False)
+        if not image_dir:
+            os.makedirs(PAGES_PATH, exist_ok=True)
+            image_client.capture_multi_images(PAGES_PATH)       # 试卷实体 -> 多页IMAGE (已预处理)
+            image_dir, raw = PAGES_PATH, False
+
+        processor = BatchPageProcessor(
+            image_client,
+            ocr_router.ocr_image,
+            deepseek_client.answer_text,
+            batch_config.get("workers"),
+            batch_config.get("concurrency", 4),
+            raw,
+            batch_config.get("start_method")
+        )
+        stats = processor.run(image_dir, BATCH_OUTPUT_PATH, TASK_FILENAME)
+        for line in processor.timer.format_summary().splitlines():
+            pipeline_logger.info(line)
+        processor.timer.save(TIMING_FILENAME, batch=stats, cache=response_cache.stats() if response_cache else None,
+                             ocr=qwen_client.ocr_metrics, ocr_route=ocr_router.ocr_metrics,
+                             answer=deepseek_client.answer_metrics, llm=LLMTransport.all_metrics())
+
+        # 机械臂一次只能在一页上书写, 逐页放入试卷
+        for page, page_task_path in stats["page_tasks"].items():
+            print(f"请放入第{page}页试卷, 按回车开始书写: ")
+            input()
+            robot_writer.go_center()
+            run_writing_tasks(robot_writer, robot_config, page_task_path)
+            robot_writer.stand_by()
+        save_simulated_drawing(robot_writer, SIM_DRAWING_FILENAME)
+
+    if strategy == "5":
+        if not recall_task(response_cache, TASK_FILENAME):
+            pipeline_logger.error("缓存中没有上一次的写字任务 (需要在配置中启用cache.dir)")
+            return
+        robot_writer.go_center()
+        run_writing_tasks(robot_writer, robot_config, TASK_FILENAME)
+        robot_writer.stand_by()
+        save_simulated_drawing(robot_writer, SIM_DRAWING_FILENAME)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        main()
+    except LLMError as e:
+        __logger__.get_module_logger("pipeline").error(f"大模型请求失败, 流程终止: {e}")
+    except OCRError as e:
+        __logger__.get_module_logger("pipeline").error(f"本地OCR失败, 流程终止: {e}")
+    except MotionError as e:
+        __logger__.get_module_logger("pipeline").error(f"机械臂运动超时, 流程终止: {e}")
\ No newline at end of file
@@ -1,15 +1,22 @@
 """
 deepseek_api.py
 
-DeepSeek模型API调用模块
+DeepSeek模型API调用模块, 按题型 (见src.core.answer) 选择提示词模板作答
 
 Author: Zhu Jiahao
 Date: 2025-07-15
 """
 
 import os
-from openai import OpenAI
+import asyncio
+import time
+from typing import Callable, List, Optional
 from src.utils.utils import read_txt_file
+from src.core.answer import (DEFAULT_QUESTION_TYPE, build_prompt, classification_prompt, classify_question_local,
+                             parse_classification)
+from src.core.response_cache import ResponseCache
+from src.core.stream_sink import ConsoleSubscriber, FileSubscriber, StreamSink
+from src.api.llm_transport import LLMTransport, LLMError
 from src.utils.config import __config__
 from src.utils.logger import __logger__
 
@@ -20,171 +27,262 @@ deepseek_logger = __logger__.get_module_logger("DeepSeek")
 class DeepSeekClient:
     """ DeepSeek服务API
     """
-    def __init__(self, api_key, base_url, model):
+    def __init__(self, api_key, base_url, model, cache: Optional[ResponseCache] = None,
+                 transport_config: Optional[dict] = None):
+        """
+        初始化
+
+        Args:
+            cache (ResponseCache): 可选, 答案缓存
+            transport_config (dict): 可选, 共享传输层的配置 (见LLMTransport), 只在该服务地址第一次使用时生效
+        """
         self.api_key = api_key
         self.base_url = base_url
         self.model = model
-        self.client = OpenAI(api_key=api_key, base_url=base_url)
+        self.cache = cache
+        self.answer_metrics = []        # 每次作答的首个token延迟和输出速度
+        self.transport = LLMTransport.shared(api_key, base_url, **(transport_config or {}))
 
-    def answer_reasoning_question(self, question_path: str, log_path: str) -> None:
-        """ 调用DeepSeek, 回答一个推理类问题
+    def answer_reasoning_question(self, question_path: str, log_path: str, on_delta: Optional[Callable[[str], None]] = None) -> str:
+        """ 调用DeepSeek, 回答一个推理类问题, 参数见answer_question
+        """
+        return self.answer_question(question_path, log_path, on_delta, "reasoning")
+
+    def answer_translation_question(self, question_path: str, log_path: str, on_delta: Optional[Callable[[str], None]] = None) -> str:
+        """ 调用DeepSeek, 回答一个文言文翻译问题, 参数见answer_question
+        """
+        return self.answer_question(question_path, log_path, on_delta, "translation")
+
+    def answer_english_question(self, question_path: str, log_path: str, on_delta: Optional[Callable[[str], None]] = None) -> str:
+        """ 调用DeepSeek, 写一篇英语作文, 参数见answer_question
+        """
+        return self.answer_question(question_path, log_path, on_delta, "english")
+
+    def answer_math_question(self, question_path: str, log_path: str, on_delta: Optional[Callable[[str], None]] = None) -> str:
+        """ 调用DeepSeek, 回答数学算数题, 参数见answer_question
+        """
+        return self.answer_question(question_path, log_path, on_delta, "math")
+
+    def answer_question(self,
+                        question_path: str,
+                        log_path: str,
+                        on_delta: Optional[Callable[[str], None]] = None,
+                        question_type: Optional[str] = None) -> str:
+        """ 调用DeepSeek, 按题型选择提示词模板作答
 
         Args:
             question_path (str): 问题路径
             log_path (str): 日志记录路径
+            on_delta (Callable[[str], None]): 可选, 每收到一段流式输出时的回调
+            question_type (str): 题型 (见PROMPT_TEMPLATES), 为None时自动判断
+
+        Returns:
+            str: 答案
         """
-        question = read_txt_file(question_path)
-        prompt = (
-            f"你是一位经验丰富的侦探，请根据以下题目文本推理并得出合理结论。"
-            f"要求：简要说明推理过程并给出结论，总字数控制在50字以内，不得包含无关内容，答案不需要标注字数。\n\n"
-            f"{question}\n\n"
-            "请开始作答："
-        )
+        return self.answer_text(read_txt_file(question_path), log_path, on_delta, question_type)
 
+    def answer_text(self,
+                    question: str,
+                    log_path: Optional[str] = None,
+                    on_delta: Optional[Callable[[str], None]] = None,
+                    question_type: Optional[str] = None) -> str:
+        """ 与answer_question相同, 但直接传入题目文本, 不经过文件
 
-        deepseek_logger.info("Deepseek正在作答...")
-        try:
-            # 调用DeepSeek API
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "你是一位经验丰富的侦探，请严格按照用户要求的内容，分析题目并给出答案"},
-                    {"role": "user", "content": prompt}
-                ],
-                stream=True
-            )
-            result = ""
-            with open(log_path, "w", encoding="utf-8") as f:
-                for chunk in response:
-                    delta = chunk.choices[0].delta
-                    if getattr(delta, "content", None):
-                        content = delta.content
-                        print(content, end="", flush=True)  # 输出到终端
-                        f.write(content)                    # 写入文件
-                        result += content
-            print(" ")
-
-        except Exception as e:
-            deepseek_logger.error(f"DeepSeekClient Error: {e}")
+        Args:
+            question (str): 题目文本
+            log_path (str): 可选, 答案同时写入的文件
+            on_delta (Callable[[str], None]): 可选, 每收到一段流式输出时的回调
+            question_type (str): 题型 (见PROMPT_TEMPLATES), 为None时自动判断
+
+        Returns:
+            str: 答案
+        """
+        question_type = question_type or self.classify_question(question)
+        system, prompt = build_prompt(question_type, question)
+        return self.__stream_answer(system, prompt, log_path, on_delta)
 
-    def answer_translation_question(self, question_path: str, log_path: str) -> None:
-        """ 调用DeepSeek, 回答一个文言文翻译问题
+    def answer_questions(self,
+                         questions: List[str],
+                         question_types: Optional[List[Optional[str]]] = None,
+                         max_concurrency: Optional[int] = None) -> List[str]:
+        """ 并发回答一页上互相独立的多道题, 总耗时取决于最慢的一道题, 而不是各题耗时之和
+
+        并发数受传输层的max_concurrency限制, 也可以用max_concurrency进一步限制。某道题作答失败时, 该题的答案为空字符串。
 
         Args:
-            question_path (str): 问题路径
-            log_path (str): 日志记录路径
+            questions (List[str]): 题目文本列表
+            question_types (List[str]): 可选, 与questions对应的题型, 为None的项自动判断
+            max_concurrency (int): 可选, 同时作答的题目数上限
+
+        Returns:
+            List[str]: 与questions顺序一致的答案
         """
-        question = read_txt_file(question_path)
-        prompt = (
-            f"你是一位经验丰富的文言文翻译大师，请将下面这段文言文翻译成白话文。"
-            f"要求：总字数控制在100字以内，不得包含无关内容，答案不需要标注字数。\n\n"
-            f"{question}\n\n"
-            "请开始作答："
-        )
+        async def run() -> List[str]:
+            try:
+                return await self.aanswer_questions(questions, question_types, max_concurrency)
+            finally:
+                await self.transport.aclose()
 
-        deepseek_logger.info("Deepseek正在作答...")
-        try:
-            # 调用DeepSeek API
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "你是一位经验丰富的文言文翻译大师，请严格按照用户要求的内容，进行翻译并给出答案"},
-                    {"role": "user", "content": prompt}
-                ],
-                stream=True
-            )
-            result = ""
-            with open(log_path, "w", encoding="utf-8") as f:
-                for chunk in response:
-                    delta = chunk.choices[0].delta
-                    if getattr(delta, "content", None):
-                        content = delta.content
-                        print(content, end="", flush=True)  # 输出到终端
-                        f.write(content)                    # 写入文件
-                        result += content
-            print(" ")
-
-        except Exception as e:
-            deepseek_logger.error(f"DeepSeekClient Error: {e}")
+        return asyncio.run(run())
+
+    async def aanswer_questions(self,
+                                questions: List[str],
+                                question_types: Optional[List[Optional[str]]] = None,
+                                max_concurrency: Optional[int] = None) -> List[str]:
+        """ answer_questions()的协程版本
+        """
+        question_types = question_types or [None] * len(questions)
+        slots = asyncio.Semaphore(max_concurrency or max(len(questions), 1))
+
+        async def answer_one(question: str, question_type: Optional[str]) -> str:
+            async with slots:
+                return await self.aanswer(question, question_type)
 
-    def answer_english_question(self, question_path: str, log_path: str) -> None:
-        """ 调用DeepSeek, 写一篇英语作文
+        start = time.perf_counter()
+        results = await asyncio.gather(*(answer_one(q, t) for q, t in zip(questions, question_types)),
+                                       return_exceptions=True)
+        answers = []
+        for i, result in enumerate(results):
+            if isinstance(result, LLMError):
+                deepseek_logger.error(f"第{i + 1}题作答失败: {result}")
+                answers.append("")
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                answers.append(result)
+        deepseek_logger.info(f"{len(questions)} 道题并发作答完成, 耗时 {time.perf_counter() - start:.2f}s")
+        return answers
+
+    async def aanswer(self, question: str, question_type: Optional[str] = None) -> str:
+        """ 以异步方式回答一道题 (不输出到终端)
 
         Args:
-            question_path (str): 问题路径
-            log_path (str): 日志记录路径
+            question (str): 题目文本
+            question_type (str): 题型, 为None时自动判断
+
+        Returns:
+            str: 答案
+
+        Raises:
+            LLMError: 重试后仍作答失败
         """
-        question = read_txt_file(question_path)
-        prompt = (
-            f"你是一位高考考生，请根据以下题目，撰写一篇英语作文"
-            f"要求：总字数控制在100词以内，不得包含无关内容，答案不需要标注字数。\n\n"
-            f"{question}\n\n"
-            "请开始作答："
-        )
+        question_type = question_type or await self.aclassify_question(question)
+        system, prompt = build_prompt(question_type, question)
 
+        cache_key = ResponseCache.key("answer", self.model, system, prompt)
+        cached = self.cache.get(cache_key) if self.cache is not None else None
+        if cached is not None:
+            return cached
 
-        deepseek_logger.info("Deepseek正在作答...")
-        try:
-            # 调用DeepSeek API
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "你是一位高考考生，请严格按照用户要求的内容，分析题目并给出答案"},
-                    {"role": "user", "content": prompt}
-                ],
-                stream=True
-            )
-            result = ""
-            with open(log_path, "w", encoding="utf-8") as f:
-                for chunk in response:
-                    delta = chunk.choices[0].delta
-                    if getattr(delta, "content", None):
-                        content = delta.content
-                        print(content, end="", flush=True)  # 输出到终端
-                        f.write(content)                    # 写入文件
-                        result += content
-            print(" ")
-
-        except Exception as e:
-            deepseek_logger.error(f"DeepSeekClient Error: {e}")
+        sink, report = StreamSink(), {}
+        result = await self.transport.achat(self.model, self.__messages(system, prompt), stream=True,
+                                            on_delta=sink, report=report)
+        metrics = self.__record_metrics(question_type, sink, report)
+        deepseek_logger.info(f"[{question_type}] 作答完成, 耗时 {metrics['total_s']:.2f}s, {len(result)} 字")
+        if self.cache is not None and result:
+            self.cache.put(cache_key, result, model=self.model)
+        return result
 
-    def answer_math_question(self, question_path: str, log_path: str) -> None:
-        """ 调用DeepSeek, 写三道数学题
+    def classify_question(self, question: str) -> str:
+        """ 判断题型: 先用本地规则, 无法确定时请模型分类
 
         Args:
-            question_path (str): 问题路径
-            log_path (str): 日志记录路径
+            question (str): 题目文本
+
+        Returns:
+            str: 题型
+        """
+        question_type, scores = classify_question_local(question)
+        if question_type:
+            deepseek_logger.info(f"本地规则判断题型: {question_type} {scores}")
+            return question_type
+        system, prompt = classification_prompt(question)
+        try:
+            reply = self.transport.chat(self.model, self.__messages(system, prompt), stream=False)
+        except LLMError as e:
+            deepseek_logger.warning(f"题型分类失败, 使用默认题型 {DEFAULT_QUESTION_TYPE}: {e}")
+            return DEFAULT_QUESTION_TYPE
+        return self.__parse_classification(reply, scores)
+
+    async def aclassify_question(self, question: str) -> str:
+        """ classify_question()的协程版本
         """
-        question = read_txt_file(question_path)
-        prompt = (
-            f"你是一位高考考生，请根据以下题目，回答三道数学算数题"
-            f"要求：只需要答案， 三个答案使用逗号分隔，不得包含无关内容。\n\n"
-            f"{question}\n\n"
-            "请开始作答："
-        )
+        question_type, scores = classify_question_local(question)
+        if question_type:
+            deepseek_logger.info(f"本地规则判断题型: {question_type} {scores}")
+            return question_type
+        system, prompt = classification_prompt(question)
+        try:
+            reply = await self.transport.achat(self.model, self.__messages(system, prompt), stream=False)
+        except LLMError as e:
+            deepseek_logger.warning(f"题型分类失败, 使用默认题型 {DEFAULT_QUESTION_TYPE}: {e}")
+            return DEFAULT_QUESTION_TYPE
+        return self.__parse_classification(reply, scores)
+
+    def __parse_classification(self, reply: str, scores: dict) -> str:
+        question_type = parse_classification(reply) or DEFAULT_QUESTION_TYPE
+        deepseek_logger.info(f"模型判断题型: {question_type} (本地规则得分 {scores})")
+        return question_type
+
+    @staticmethod
+    def __messages(system: str, prompt: str) -> List[dict]:
+        return [
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt}
+        ]
+
+    def __stream_answer(self, system: str, prompt: str, log_path: Optional[str],
+                        on_delta: Optional[Callable[[str], None]] = None) -> str:
+        """ 以流式方式调用DeepSeek, 将回答分发到终端, 文件 (可选) 和on_delta回调
+
+        Args:
+            system (str): 系统消息内容
+            prompt (str): 用户消息内容
+            log_path (str): 可选, 答案同时写入的文件
+            on_delta (Callable[[str], None]): 可选, 每收到一段流式输出时的回调
+
+        Returns:
+            str: 答案
 
+        Raises:
+            LLMError: 重试后仍作答失败
+        """
+        cache_key = None
+        if self.cache is not None:
+            cache_key = ResponseCache.key("answer", self.model, system, prompt)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                deepseek_logger.info("命中答案缓存")
+                with self.__sink(log_path, on_delta) as sink:
+                    sink(cached)
+                return cached
 
         deepseek_logger.info("Deepseek正在作答...")
+        report = {}
         try:
-            # 调用DeepSeek API
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "你是一位高考考生，请严格按照用户要求的内容，分析题目并给出答案"},
-                    {"role": "user", "content": prompt}
-                ],
-                stream=True
-            )
-            result = ""
-            with open(log_path, "w", encoding="utf-8") as f:
-                for chunk in response:
-                    delta = chunk.choices[0].delta
-                    if getattr(delta, "content", None):
-                        content = delta.content
-                        print(content, end="", flush=True)  # 输出到终端
-                        f.write(content)                    # 写入文件
-                        result += content
-            print(" ")
-
-        except Exception as e:
-            deepseek_logger.error(f"DeepSeekClient Error: {e}")
\ No newline at end of file
+            with self.__sink(log_path, on_delta) as sink:
+                result = self.transport.chat(self.model, self.__messages(system, prompt), stream=True,
+                                             on_delta=sink, report=report)
+        except LLMError as e:
+            deepseek_logger.error(f"DeepSeekClient Error: {e}")
+            raise
+
+        metrics = self.__record_metrics("answer", sink, report)
+        deepseek_logger.info(f"作答完成: 首个token {metrics['ttft_s'] or 0:.2f}s, {metrics['tokens_per_s']:.1f} token/s")
+        if cache_key is not None and result:
+            self.cache.put(cache_key, result, model=self.model)
+        return result
+
+    @staticmethod
+    def __sink(log_path: Optional[str], on_delta: Optional[Callable[[str], None]]) -> StreamSink:
+        """ 终端 + 文件 (可选) + 回调 (可选) 的输出分发
+        """
+        return StreamSink(ConsoleSubscriber(), FileSubscriber(log_path) if log_path else None, on_delta)
+
+    def __record_metrics(self, label: str, sink: StreamSink, report: dict) -> dict:
+        """ 记录一次作答的首个token延迟和输出速度
+        """
+        metrics = {"label": label, "attempts": report.get("attempts"), "queued_s": report.get("queued_s"),
+                   **sink.stats(report.get("completion_tokens"))}
+        self.answer_metrics.append(metrics)
+        return metrics
@@ -16,6 +16,10 @@ import os
 import json
 from src.utils.config import __config__
 from src.utils.logger import __logger__
+from src.core.layout import StreamingLayout, fit_font_size
+from src.core.enhance import enhance_image
+from src.core.grabber import FrameGrabber, open_frame_source
+from src.core.boxes import batched_merge_nms, greedy_merge_nms, merge_overlapping_boxes, reading_order
 
 __all__ = ['OpenCVImageClient']
 
@@ -25,16 +29,32 @@ class OpenCVImageClient:
     """ OpenCV图像处理类
     """
     def __init__(self,
-                camera_id: int):
+                camera_id: int,
+                font_path: str = r"C:\Windows\Fonts\simfang.ttf",
+                preprocess_config: Optional[dict] = None,
+                grabber_config: Optional[dict] = None):
         """
         初始化
 
         Args:
-            camera_id (int): 摄像头索引
+            camera_id (int | str): 摄像头索引, 也可以是视频文件路径或图片目录 (离线测试)
+            font_path (str): 排版与预览使用的仿宋字体文件路径
+            preprocess_config (dict): 可选, 画面预处理配置 (crop_first, target_width, top_crop_mm, bottom_crop_mm)
+            grabber_config (dict): 可选, 后台取帧配置 (buffer_size, preview_scale, sharpest_window_s)
         """
+        preprocess_config = preprocess_config or {}
+        grabber_config = grabber_config or {}
         self.camera_id = camera_id
+        self.font_path = font_path
+        self.crop_first = preprocess_config.get("crop_first", False)
+        self.target_width = preprocess_config.get("target_width", 2100)
+        self.top_crop_mm = preprocess_config.get("top_crop_mm", 62)
+        self.bottom_crop_mm = preprocess_config.get("bottom_crop_mm", 10)
+        self.buffer_size = grabber_config.get("buffer_size", 8)
+        self.preview_scale = grabber_config.get("preview_scale", 0.25)
+        self.sharpest_window_s = grabber_config.get("sharpest_window_s", 0.5)
         self.image_num = 0
-        self.cap: Optional[cv2.VideoCapture] = None
+        self.cap = None
 
     def capture_single_image(self, capture_path: str) -> None:
         """ 打开摄像头并捕获一张图像
@@ -42,39 +62,26 @@ class OpenCVImageClient:
         Args:
             capture_path (str): 图像存储路径
         """
-        cv_logger.info("正在开启摄像头...")
-
-        self.cap = cv2.VideoCapture(self.camera_id)
-        if not self.cap.isOpened():
-            cv_logger.error("无法打开摄像头")
+        grabber = self.__open_grabber()
+        if grabber is None:
             return
-        
-        # 设置分辨率
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 3840)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 2160)
 
         cv_logger.info("摄像头已启动, 按空格拍照...")
 
-        while True:
-            ret, frame = self.cap.read()
-            if not ret:
-                cv_logger.error("摄像头获取失败")
-                break
+        with grabber:
+            while True:
+                key = self.__show_preview(grabber)
+                if key is None:
+                    cv_logger.error("摄像头获取失败")
+                    break
 
-            preview = cv2.resize(frame, (0, 0), fx=0.33, fy=0.33)
-            cv2.imshow("image capture", preview)
-            key = cv2.waitKey(1)
+                if key == 32:     # SPACE
+                    final = self.preprocess_frame(grabber.sharpest(self.sharpest_window_s))
 
-            if key == 32:     # SPACE
-                rotated = self.__rotate_image(frame, 90, True)
-                enhanced = self.__enhance_image(rotated)
-                final = self.__process_for_a4(enhanced)
+                    cv2.imwrite(capture_path, final)
+                    cv_logger.info(f"图片已保存: {capture_path}")
+                    break
 
-                cv2.imwrite(capture_path, final)
-                cv_logger.info(f"图片已保存: {capture_path}")
-                break
-        
-        self.cap.release()
         cv2.destroyAllWindows()
 
     def capture_multi_images(self, capture_path: str) -> List:
@@ -86,48 +93,88 @@ class OpenCVImageClient:
         Return:
             文件列表
         """
+        file_list = []
+        grabber = self.__open_grabber()
+        if grabber is None:
+            return file_list
+
+        cv_logger.info("摄像头已启动, 按空格拍照, ESC结束。")
+
+        with grabber:
+            while True:
+                key = self.__show_preview(grabber)
+                if key is None:
+                    cv_logger.error("摄像头获取失败")
+                    break
+
+                if key == 27:       # ESC
+                    cv_logger.info("用户退出图像捕获模式")
+                    break
+                elif key == 32:     # SPACE
+                    self.image_num += 1
+                    cv_logger.info(f"拍摄了第{self.image_num}页")
+
+                    final = self.preprocess_frame(grabber.sharpest(self.sharpest_window_s))
+
+                    filename = os.path.join(capture_path, f"{self.image_num}.jpg")
+                    cv2.imwrite(filename, final)
+                    cv_logger.info(f"图片已保存: {filename}")
+                    file_list.append(filename)
+
+        cv2.destroyAllWindows()
+        return file_list
+
+    def __open_grabber(self) -> Optional[FrameGrabber]:
+        """ 打开画面来源 (摄像头索引, 视频文件或图片目录) 并启动后台取帧线程
+
+        Returns:
+            FrameGrabber: 取帧器, 无法打开画面来源时返回None
+        """
         cv_logger.info("正在开启摄像头...")
 
-        self.cap = cv2.VideoCapture(self.camera_id)
+        self.cap = open_frame_source(self.camera_id)
         if not self.cap.isOpened():
             cv_logger.error("无法打开摄像头")
-        
-        # 设置分辨率
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 3840)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 2160)
+            return None
 
-        file_list = []
-        cv_logger.info("摄像头已启动, 按空格拍照, ESC结束。")
+        grabber = FrameGrabber(self.cap, self.buffer_size, self.preview_scale).start()
+        if not grabber.wait_for_frame():
+            grabber.stop()
+            cv_logger.error("摄像头获取失败")
+            return None
+        return grabber
 
-        while True:
-            ret, frame = self.cap.read()
-            if not ret:
-                cv_logger.error("摄像头获取失败")
-                break
-
-            preview = cv2.resize(frame, (0, 0), fx=0.33, fy=0.33)
-            cv2.imshow("image capture", preview)
-            key = cv2.waitKey(1)
-
-            if key == 27:       # ESC
-                cv_logger.info("用户退出图像捕获模式")
-                break
-            elif key == 32:     # SPACE
-                self.image_num += 1
-                cv_logger.info(f"拍摄了第{self.image_num}页")
-
-                rotated = self.__rotate_image(frame, 90, True)
-                enhanced = self.__enhance_image(rotated)
-                final = self.__process_for_a4(enhanced)
-
-                filename = os.path.join(capture_path, f"{self.image_num}.jpg")
-                cv2.imwrite(filename, final)
-                cv_logger.info(f"图片已保存: {filename}")
-                file_list.append(filename)
-
-        self.cap.release()
-        cv2.destroyAllWindows()
-        return file_list
+    def __show_preview(self, grabber: FrameGrabber) -> Optional[int]:
+        """ 显示最新的低分辨率预览并读取按键
+
+        Returns:
+            int: 按键码, 画面来源已结束时返回None
+        """
+        if not grabber.alive:
+            return None
+        cv2.imshow("image capture", grabber.preview())
+        return cv2.waitKey(1)
+
+    def preprocess_frame(self, frame: np.ndarray) -> np.ndarray:
+        """ 将摄像头原始画面处理为A4试卷图像: 旋转, 增强, 缩放并裁剪
+
+        crop_first为True时, 先从原始画面中取出最终保留的区域, 只对该区域旋转和增强, 再缩放;
+        否则按 旋转 -> 增强 -> 缩放裁剪 的原顺序处理。增强是逐像素运算, 与裁剪, 旋转的先后顺序无关,
+        两种顺序的差异只来自缩放时区域边界的对齐, 可用benchmarks.bench_preprocess对比。
+
+        Args:
+            frame (np.ndarray): 摄像头原始画面 (BGR)
+
+        Returns:
+            np.ndarray: 处理后的试卷图像
+        """
+        if self.crop_first:
+            result = self.__crop_enhance_resize(frame)
+            if result is not None:
+                return result
+        rotated = self.__rotate_image(frame, 90, True)
+        enhanced = self.__enhance_image(rotated)
+        return self.__process_for_a4(enhanced)
 
     def load_image_and_get_scale(self, image_path: str) -> Tuple:
         """ 加载图像并计算毫米和像素间的转换比例
@@ -163,21 +210,24 @@ class OpenCVImageClient:
 
         return img, img_w, img_h, mm_per_pixel_x, mm_per_pixel_y, px_per_mm_y
 
-    def detect_single_black_box(self, img: np.ndarray, log_path: str, min_area: int=500) -> Tuple:
+    def detect_single_black_box(self, img: np.ndarray, log_path: str, min_area: int=500, downscale: int=8) -> Tuple:
         """
         检测图像中唯一的黑色闭合矩形框，并将其绘制到本地图片。
         要求图像只存在一个黑框，自动排除小轮廓或噪声。
 
+        先在缩小downscale倍的图像上粗略定位候选区域, 再只在候选区域内按原分辨率精确提取轮廓,
+        结果与整图检测一致。
+
         Args:
             img (np.ndarray): BGR图像
-            log_path (str): 日志存储路径
+            log_path (str): 日志存储路径, 为None时不保存标注图
             min_area (int): 最小有效区域（单位：像素平方），用于排除噪声小框
+            downscale (int): 粗检测的缩小倍数, 为1时直接在整幅原图上检测
 
         Return:
             Tuple(x, y, w, h, area)
         """        
-        bin_mask = self.__get_black_mask(img)
-        contours = self.__find_external_contours(bin_mask)
+        contours = self.__find_black_contours(img, min_area, downscale)
 
         # 过滤掉面积太小的噪声
         boxes = []
@@ -200,10 +250,58 @@ class OpenCVImageClient:
             boxes.sort(key=lambda b: b[4], reverse=True)
             box = boxes[0][:4]
 
-        self.__save_boxes_visualization(img, box, log_path)
+        if log_path:
+            self.__save_boxes_visualization(img, [box], log_path)
 
         return box
 
+    def detect_answer_boxes(self,
+                            img: np.ndarray,
+                            log_path: str,
+                            min_area: int=500,
+                            downscale: int=8,
+                            min_side: int=60,
+                            rectangularity: float=0.85,
+                            iou_threshold: float=0.6) -> List[dict]:
+        """
+        检测图像中的全部答题框, 按阅读顺序 (从上到下, 从左到右) 返回
+
+        只保留近似矩形的轮廓 (轮廓面积与外接矩形面积之比不低于rectangularity, 且短边不小于min_side),
+        以排除文字等非答题框区域; 重叠的框合并为一个。
+
+        Args:
+            img (np.ndarray): BGR图像
+            log_path (str): 标注图保存路径, 为None时不保存
+            min_area (int): 最小有效区域（单位：像素平方），用于排除噪声小框
+            downscale (int): 粗检测的缩小倍数, 为1时直接在整幅原图上检测
+            min_side (int): 答题框短边的最小像素数
+            rectangularity (float): 轮廓面积与外接矩形面积之比的下限
+            iou_threshold (float): IoU阈值, 超过此值的框将被合并
+
+        Return:
+            List[dict]: 答题框列表, 每项为 {"index": 序号 (从0开始), "box": (x, y, w, h), "area": 面积}
+        """
+        contours = self.__find_black_contours(img, min_area, downscale)
+
+        boxes = []
+        for cnt in contours:
+            area = cv2.contourArea(cnt)
+            if area < min_area:
+                continue
+            x, y, w, h = cv2.boundingRect(cnt)
+            if min(w, h) < min_side or area < rectangularity * w * h:
+                continue
+            boxes.append((x, y, w, h, area))
+
+        boxes = reading_order(merge_overlapping_boxes(boxes, iou_threshold))
+        regions = [{"index": i, "box": tuple(b[:4]), "area": float(b[4])} for i, b in enumerate(boxes)]
+        cv_logger.info(f"检测到 {len(regions)} 个答题框")
+
+        if log_path and regions:
+            self.__save_boxes_visualization(img, [r["box"] for r in regions], log_path)
+
+        return regions
+
     def generate_writing_task(self,
                             img: np.ndarray,
                             box: Tuple,
@@ -226,16 +324,115 @@ class OpenCVImageClient:
             preview_path (str): 预览图生成路径
             task_path (str): 任务文件生成路径
         """
+        self.generate_writing_tasks(img, [{"index": 0, "box": box}], [answer], mm_per_pixel_x, mm_per_pixel_y,
+                                    px_per_mm_y, preview_path, task_path)
+
+    def generate_writing_tasks(self,
+                            img: np.ndarray,
+                            regions: List[dict],
+                            answers: List[str],
+                            mm_per_pixel_x: float,
+                            mm_per_pixel_y: float,
+                            px_per_mm_y: float,
+                            preview_path: str,
+                            task_path: str) -> None:
+        """ 为多个答题框一次性规划书写任务, 并生成一张预览图
+
+        Args:
+            img (np.ndarray): BGR图像
+            regions (List[dict]): detect_answer_boxes返回的答题框列表
+            answers (List[str]): 答案, 第i个答案写入第i个答题框, 答案为空的答题框不书写
+            mm_per_pixel_x (float): 水平方向每像素对应的毫米数
+            mm_per_pixel_y (float): 垂直方向每像素对应的毫米数
+            px_per_mm_y (float): 垂直方向每毫米对应的像素数
+            preview_path (str): 预览图生成路径
+            task_path (str): 任务文件生成路径, 每个任务带有所属答题框的序号 "box"
+
+        Raises:
+            ValueError: 答案数量与答题框数量不一致 (无法确定答案与答题框的对应关系)
+        """
+        if len(answers) != len(regions):
+            raise ValueError(f"答案数量 ({len(answers)}) 与答题框数量 ({len(regions)}) 不一致")
+
         pil_img = Image.fromarray(cv2.cvtColor(img.copy(), cv2.COLOR_BGR2RGB))
         draw = ImageDraw.Draw(pil_img)
-        font_path = r"C:\Windows\Fonts\simfang.ttf"
-        if not os.path.exists(font_path):
-            cv_logger.error(f"仿宋字体文件不存在: {font_path}")
+        if not os.path.exists(self.font_path):
+            cv_logger.error(f"仿宋字体文件不存在: {self.font_path}")
             return
-        
+
         writing_tasks = []
         cv_logger.info("")
+        for region, answer in zip(regions, answers):
+            if not answer:
+                continue
+            for task in self.__layout_answer(draw, region["box"], answer, mm_per_pixel_x, mm_per_pixel_y, px_per_mm_y):
+                task["box"] = region["index"]
+                writing_tasks.append(task)
+
+        # 保存预览图
+        annotated_bgr = cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
+        cv2.imwrite(preview_path, annotated_bgr)
+        cv_logger.info(f"预览图已保存至: {preview_path}")
+        
+        with open(task_path, "w", encoding="utf-8") as f:
+            json.dump(writing_tasks, f, ensure_ascii=False, indent=2)
+        print(f"✅ 写字任务已保存至: {task_path}")
+
+    def create_streaming_layout(self,
+                                box: Tuple,
+                                mm_per_pixel_x: float,
+                                mm_per_pixel_y: float,
+                                px_per_mm_y: float) -> Optional[StreamingLayout]:
+        """ 创建增量排版器, 用于边生成答案边书写。答案长度未知, 字号取generate_writing_task的最小字号
+
+        Args:
+            box (Tuple[int, int, int, int]): 黑框的(x, y, w, h)矩形框坐标
+            mm_per_pixel_x (float): 水平方向每像素对应的毫米数
+            mm_per_pixel_y (float): 垂直方向每像素对应的毫米数
+            px_per_mm_y (float): 垂直方向每毫米对应的像素数
+
+        Returns:
+            StreamingLayout: 增量排版器, 字体文件不存在时返回None
+        """
+        if not os.path.exists(self.font_path):
+            cv_logger.error(f"仿宋字体文件不存在: {self.font_path}")
+            return None
+
+        _, _, _, h = box
+        min_font_mm = min(8.0, h * mm_per_pixel_y)
+        min_font_px = max(int(min_font_mm * px_per_mm_y), 1)
+        font = ImageFont.truetype(self.font_path, min_font_px)
+        return StreamingLayout(font, box, mm_per_pixel_x, mm_per_pixel_y, px_per_mm_y)
+
 
+
+
+    """
+    =================================================================================
+                                    以下是私有函数
+    =================================================================================
+    """
+     
+    def __layout_answer(self,
+                        draw: ImageDraw.ImageDraw,
+                        box: Tuple,
+                        answer: str,
+                        mm_per_pixel_x: float,
+                        mm_per_pixel_y: float,
+                        px_per_mm_y: float) -> List[dict]:
+        """ 在一个答题框内排版答案, 将文字绘制到预览图上
+
+        Args:
+            draw (ImageDraw.ImageDraw): 预览图的绘图对象
+            box (Tuple[int, int, int, int]): 答题框的(x, y, w, h)矩形框坐标
+            answer (str): 答案
+            mm_per_pixel_x (float): 水平方向每像素对应的毫米数
+            mm_per_pixel_y (float): 垂直方向每像素对应的毫米数
+            px_per_mm_y (float): 垂直方向每毫米对应的像素数
+
+        Returns:
+            List[dict]: 书写任务
+        """
         x, y, w, h = box
         # 将像素换算成毫米
         box_w_mm = w * mm_per_pixel_x
@@ -251,34 +448,20 @@ class OpenCVImageClient:
         text_box_w = int(w * 0.8)
         text_box_h = int(h * 0.95)
 
-        # final_lines, final_font, line_height = [], None, 0
-        # for font_px in range(max_font_px, min_font_px - 1, -1):
-        #     font = ImageFont.truetype(font_path, font_px)
-        #     lines = self.__wrap_text(answer, font, text_box_w, draw)
-        #     lh = font.getbbox("汉")[3] - font.getbbox("汉")[1]
-        #     if lh * len(lines) <= text_box_h:
-        #         final_lines, final_font, line_height = lines, font, lh
-        #         break
-
-        # print(max_font_px, max_font_mm, line_height)
-
-        # # 如果没找到合适字号，强行用最小字号
-        # if not final_font:
-        # 使用固定字号 (不再自适应)
-        final_font = ImageFont.truetype(font_path, min_font_px)
-        final_lines = self.__wrap_text(answer, final_font, text_box_w, draw)
-        line_height = final_font.getbbox("汉")[3] - final_font.getbbox("汉")[1]
+        metrics, final_lines, fitted = fit_font_size(answer, self.font_path, min_font_px, max_font_px, text_box_w, text_box_h)
+        if not fitted:
+            cv_logger.warning(f"最小字号 {min_font_px}px 仍无法放入答题框, 答案可能超出范围")
+        final_font = metrics.font
+        line_height = metrics.line_height
 
         # 计算文字起始位置, 实现居中排版
-        # max_line_width = max(draw.textlength(line, font=final_font) for line in final_lines)
-        # x_start = x + (w - max_line_width) / 2
-        # y_start = y + (h - line_height * len(final_lines)) / 2
-        max_line_w_px = max(draw.textbbox((0,0), line, font=final_font)[2] for line in final_lines) if final_lines else 0
+        max_line_w_px = max(metrics.measure(line) for line in final_lines) if final_lines else 0
         total_text_h_px = line_height * len(final_lines)
         x_start = x + (w - max_line_w_px) / 2
         y_start = y + (h - total_text_h_px) / 3
 
-        # 绘制文字, 保存书写任务
+        # 绘制文字, 生成书写任务
+        writing_tasks = []
         char_height_mm = (final_font.size / px_per_mm_y) * 0.8  # 估算字符高度
         for i, line in enumerate(final_lines):
             y_line = y_start + i * line_height
@@ -290,25 +473,8 @@ class OpenCVImageClient:
                 "char_height_mm": char_height_mm,
                 "char_spacing_ratio": 1.2
             })
+        return writing_tasks
 
-        # 保存预览图
-        annotated_bgr = cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
-        cv2.imwrite(preview_path, annotated_bgr)
-        cv_logger.info(f"预览图已保存至: {preview_path}")
-        
-        with open(task_path, "w", encoding="utf-8") as f:
-            json.dump(writing_tasks, f, ensure_ascii=False, indent=2)
-        print(f"✅ 写字任务已保存至: {task_path}")
-
-
-
-
-    """
-    =================================================================================
-                                    以下是私有函数
-    =================================================================================
-    """
-     
     def __enhance_image(self, image: np.ndarray) -> np.ndarray:
         """ 图像增强: 增加对比度, 突出红色
 
@@ -316,19 +482,10 @@ class OpenCVImageClient:
             image (np.ndarray): 输入图像
 
         Returns:
-            np.ndarray: 旋转后的图像
+            np.ndarray: 增强后的图像
         """
-        enhanced_image = cv2.convertScaleAbs(image, alpha=1.3, beta=0)
-        hsv = cv2.cvtColor(enhanced_image, cv2.COLOR_BGR2HSV)
-        h, s, v = cv2.split(hsv)
-
-        red_mask = cv2.inRange(h, 0, 10) + cv2.inRange(h, 170, 180)
-        s_red = np.where(red_mask > 0, np.clip(s * 2.0, 0, 255).astype(np.uint8), s)
-        non_red_mask = cv2.bitwise_not(red_mask)
-        s_combined = np.where(non_red_mask > 0, np.clip(s * 0.6, 0, 255).astype(np.uint8), s_red)
-
-        final_hsv = cv2.merge([h, s_combined, v])
-        return cv2.cvtColor(final_hsv, cv2.COLOR_HSV2BGR)
+        # 查找表实现, 结果与逐步计算一致, 见src.core.enhance
+        return enhance_image(image)
     
     def __rotate_image(self, image: np.ndarray, angle: int = 90, clockwise: bool = False) -> np.ndarray:
         """
@@ -371,27 +528,70 @@ class OpenCVImageClient:
         Returns:
             np.ndarray: 旋转后的图像
         """
-        TARGET_WIDTH = 2100
-        TOP_CROP_MM = 62
-        BOTTOM_CROP_MM = 10
-
         h, w, _ = image.shape
-        ratio = TARGET_WIDTH / w
-        new_height = int(h * ratio)
-        resized = cv2.resize(image, (TARGET_WIDTH, new_height), interpolation=cv2.INTER_AREA)
-
-        px_per_mm = TARGET_WIDTH / 210
-        top = int(TOP_CROP_MM * px_per_mm)
-        bottom = int(BOTTOM_CROP_MM * px_per_mm)
+        new_height, top, bottom = self.__a4_geometry(h, w)
+        resized = cv2.resize(image, (self.target_width, new_height), interpolation=cv2.INTER_AREA)
 
         if top >= new_height - bottom:
             cv_logger.info(f"警告：图像太小无法裁剪，返回原图。")
             return resized
         
         cropped = resized[top:new_height - bottom, :]
-        cv_logger.info(f"图片已处理：缩放({TARGET_WIDTH}x{new_height})，裁剪上下({top}px, {bottom}px)")
+        cv_logger.info(f"图片已处理：缩放({self.target_width}x{new_height})，裁剪上下({top}px, {bottom}px)")
         return cropped
 
+    def __a4_geometry(self, h: int, w: int) -> Tuple[int, int, int]:
+        """ 计算缩放到目标宽度后的高度, 以及上下裁剪的像素数
+
+        Args:
+            h (int): 旋转后的图像高度
+            w (int): 旋转后的图像宽度
+
+        Returns:
+            Tuple: (缩放后高度, 顶部裁剪像素数, 底部裁剪像素数)
+        """
+        new_height = int(h * (self.target_width / w))
+        px_per_mm = self.target_width / 210
+        return new_height, int(self.top_crop_mm * px_per_mm), int(self.bottom_crop_mm * px_per_mm)
+
+    def __crop_enhance_resize(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """ 先裁剪再旋转增强, 最后缩放的预处理, 输出尺寸与原顺序一致
+
+        顺时针旋转90°后的第y行对应原始画面的第y列, 因此直接按列截取原始画面。
+        截取的起点选在缩放后恰好落在整数行附近的位置, 使区域缩放的采样位置与整图缩放一致。
+
+        Args:
+            frame (np.ndarray): 摄像头原始画面 (BGR)
+
+        Returns:
+            np.ndarray: 处理后的试卷图像, 图像太小无法裁剪时返回None
+        """
+        h, w = frame.shape[1], frame.shape[0]       # 旋转后的高度和宽度
+        new_height, top, bottom = self.__a4_geometry(h, w)
+        if top >= new_height - bottom:
+            return None
+
+        # 保留的行在旋转后图像中的范围, 上下各多取2行, 再在附近寻找缩放后最接近整数行的边界
+        scale_y = new_height / h
+        misalign = lambda rows: abs(rows * scale_y - round(rows * scale_y))
+        first = max(int(top / scale_y) - 2, 0)
+        src_top = min(range(max(first - 64, 0), first + 1), key=lambda s: (misalign(s), -s))
+        last = min(int(np.ceil((new_height - bottom) / scale_y)) + 2, h)
+        src_bottom = min(range(last, min(last + 64, h) + 1), key=lambda s: (misalign(s - src_top), s))
+
+        region = cv2.rotate(frame[:, src_top:src_bottom], cv2.ROTATE_90_CLOCKWISE)
+        enhanced = enhance_image(region, out=region)
+
+        region_height = int(round((src_bottom - src_top) * scale_y))
+        resized = cv2.resize(enhanced, (self.target_width, region_height), interpolation=cv2.INTER_AREA)
+        offset = top - int(round(src_top * scale_y))
+        out_height = new_height - bottom - top
+        if offset < 0 or offset + out_height > region_height:
+            return None
+
+        cv_logger.info(f"图片已处理：缩放({self.target_width}x{new_height})，裁剪上下({top}px, {bottom}px)")
+        return resized[offset:offset + out_height]
+
     def __get_black_mask(self, image: np.ndarray) -> np.ndarray:
         """ 获取图像中的黑色区域掩码
 
@@ -409,16 +609,21 @@ class OpenCVImageClient:
         # mask_clean = cv2.morphologyEx(mask_red, cv2.MORPH_CLOSE, kernel, iterations=2)
         # mask_clean = cv2.morphologyEx(mask_clean, cv2.MORPH_OPEN, kernel, iterations=1)
 
-        # 转换为HSV颜色空间
-        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        # 黑色的HSV范围为 H: 0~180, S: 0~255, V: 0~100, 其中V = max(B, G, R),
+        # 因此等价于B, G, R三个通道都不超过100, 可以直接在BGR图像上判断, 省去HSV转换
+        mask_black = cv2.inRange(image, (0, 0, 0), (100, 100, 100))
 
-        # 定义黑色的HSV范围
-        lower_black = np.array([0, 0, 0])     
-        upper_black = np.array([180, 255, 100]) 
+        return self.__clean_black_mask(mask_black)
 
-        # 生成黑色区域的掩膜
-        mask_black = cv2.inRange(hsv, lower_black, upper_black)
+    def __clean_black_mask(self, mask_black: np.ndarray) -> np.ndarray:
+        """ 对黑色区域掩码做闭运算和开运算, 连接断线并去除噪点
 
+        Args:
+            mask_black (np.ndarray): 黑色区域掩码
+
+        Return:
+            掩码
+        """
         kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
         mask_clean = cv2.morphologyEx(mask_black, cv2.MORPH_CLOSE, kernel, iterations=2)
         mask_clean = cv2.morphologyEx(mask_clean, cv2.MORPH_OPEN, kernel, iterations=1)
@@ -437,30 +642,120 @@ class OpenCVImageClient:
         contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         return contours
     
-    def __save_boxes_visualization(self, img: np.ndarray, box: Tuple, log_path: str) -> None:
+    def __find_black_contours(self, image: np.ndarray, min_area: int, downscale: int) -> list:
+        """ 提取黑色区域的外部轮廓, downscale大于1时使用两阶段检测
+
+        Args:
+            image (np.ndarray): BGR图像
+            min_area (int): 最小有效区域 (原图像素平方)
+            downscale (int): 粗检测的缩小倍数
+
+        Return:
+            外部轮廓
+        """
+        if downscale > 1:
+            return self.__find_contours_two_stage(image, downscale, min_area)
+        return self.__find_external_contours(self.__get_black_mask(image))
+
+    def __find_contours_two_stage(self, image: np.ndarray, downscale: int, min_area: int) -> list:
+        """ 两阶段提取黑色区域的外部轮廓
+
+        1. 粗检测: 先把原图按downscale x downscale分块, 每个通道取块内最小值缩小 (细线不会因缩小而消失),
+           再在小图上判断黑色并找出外接矩形足够大的候选区域。某个块内存在黑色像素时, 该块各通道的最小值
+           都不超过阈值, 因此候选区域不会遗漏; 原分辨率上不再生成整幅掩码, 也不做膨胀
+        2. 精细化: 候选区域向外扩展若干像素后, 只在区域内按原分辨率判断黑色, 做形态学运算并提取轮廓,
+           丢弃被区域边界截断的轮廓 (它们会在自己的候选区域中被完整提取), 并去除重复轮廓。
+           只返回面积不小于min_area的轮廓
+
+        Args:
+            image (np.ndarray): BGR图像
+            downscale (int): 缩小倍数
+            min_area (int): 最小有效区域 (原图像素平方)
+
+        Return:
+            外部轮廓 (原图坐标)
+        """
+        img_h, img_w = image.shape[:2]
+
+        # 分块最小值池化后只在小图上判断黑色
+        coarse_mask = cv2.inRange(self.__block_min(image, downscale), (0, 0, 0), (100, 100, 100))
+        # 原图上的闭运算可以连接4像素以内的间隙, 在小图上对应不超过2个像素
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+        coarse_mask = cv2.morphologyEx(coarse_mask, cv2.MORPH_CLOSE, kernel, iterations=1)
+
+        # 扩展量需覆盖闭运算新增的像素和形态学运算的影响范围
+        margin = 16
+        contours, seen = [], set()
+        for cand in self.__find_external_contours(coarse_mask):
+            x, y, w, h = cv2.boundingRect(cand)
+            if (w + 1) * (h + 1) * downscale * downscale < min_area:
+                continue
+            x0, y0 = max(x * downscale - margin, 0), max(y * downscale - margin, 0)
+            x1, y1 = min((x + w) * downscale + margin, img_w), min((y + h) * downscale + margin, img_h)
+            mask = self.__clean_black_mask(cv2.inRange(image[y0:y1, x0:x1], (0, 0, 0), (100, 100, 100)))
+            for cnt in self.__find_external_contours(mask):
+                # 面积过小的轮廓随后会被过滤, 这里提前跳过
+                if cv2.contourArea(cnt) < min_area:
+                    continue
+                cx, cy, cw, ch = cv2.boundingRect(cnt)
+                if (cx == 0 and x0 > 0) or (cy == 0 and y0 > 0) \
+                        or (cx + cw == x1 - x0 and x1 < img_w) or (cy + ch == y1 - y0 and y1 < img_h):
+                    continue
+                key = (cx + x0, cy + y0, cw, ch)
+                if key in seen:
+                    continue
+                seen.add(key)
+                contours.append(cnt + np.array([x0, y0], dtype=cnt.dtype))
+        return contours
+
+    @staticmethod
+    def __block_min(image: np.ndarray, block: int) -> np.ndarray:
+        """ 分块最小值池化: 输出的每个像素为原图对应block x block块内各通道的最小值
+
+        行方向对block个跨步视图逐个取最小值, 只读取原图, 不生成原分辨率的中间结果;
+        列方向在已缩小block倍的图像上用锚点在左侧的1 x block腐蚀后跨步采样。
+        不能整除的边缘部分单独成块。
+
+        Args:
+            image (np.ndarray): 原图
+            block (int): 块大小
+
+        Return:
+            缩小后的图像, 尺寸为原图的1/block (向上取整)
+        """
+        rows = image[::block].copy()
+        for i in range(1, block):
+            part = image[i::block]
+            cv2.min(rows[:len(part)], part, dst=rows[:len(part)])
+        kernel = np.ones((1, block), dtype=np.uint8)
+        return cv2.erode(rows, kernel, anchor=(0, 0))[:, ::block].copy()
+
+    def __save_boxes_visualization(self, img: np.ndarray, boxes: List[Tuple], log_path: str) -> None:
         """
         保存画出黑框和角点坐标的中间图像，便于调试和 UI 显示。
         
         参数:
             img (np.ndarray): 原始图像（BGR格式）
-            box (Tuple[int, int, int, int]): 黑框的(x, y, w, h)矩形框坐标
+            boxes (List[Tuple[int, int, int, int]]): 黑框的(x, y, w, h)矩形框坐标列表, 多个框时标注序号
             log_path (str): 保存绘图图像的目标目录
         """
         img_vis = img.copy()
         font = cv2.FONT_HERSHEY_SIMPLEX
 
-        x, y, w, h = box  # 解包单个矩形框
-        cv2.rectangle(img_vis, (x, y), (x + w, y + h), (0, 255, 0), 2)
+        for i, (x, y, w, h) in enumerate(boxes):
+            cv2.rectangle(img_vis, (x, y), (x + w, y + h), (0, 255, 0), 2)
 
-        coords = [(x, y), (x + w, y), (x, y + h), (x + w, y + h)]
-        for cx, cy in coords:
-            text = f"({cx},{cy})"
-            cv2.putText(img_vis, text, (cx, cy - 5), font, 0.4, (255, 0, 0), 1)
+            coords = [(x, y), (x + w, y), (x, y + h), (x + w, y + h)]
+            for cx, cy in coords:
+                text = f"({cx},{cy})"
+                cv2.putText(img_vis, text, (cx, cy - 5), font, 0.4, (255, 0, 0), 1)
+            if len(boxes) > 1:
+                cv2.putText(img_vis, f"#{i}", (x + 5, y + 30), font, 1.0, (0, 0, 255), 2)
 
         cv2.imwrite(log_path, img_vis)
         cv_logger.info(f"坐标图保存至: {log_path}")
 
-    def __non_max_suppression(self, boxes, iou_threshold=0.6):
+    def __non_max_suppression(self, boxes, iou_threshold=0.6, mode="batched"):
         """
         对输入的边界框列表执行非极大值抑制，合并高度重叠的框。
         与传统的NMS不同，这里我们合并框而不是简单删除，以应对同一个框被分割检测的情况。
@@ -468,93 +763,17 @@ class OpenCVImageClient:
         Args:
             boxes (list): 格式为 [(x, y, w, h), ...] 的框列表。
             iou_threshold (float): IoU阈值，超过此值的框将被合并。
+            mode (str): "batched" 向量化实现 (见src.core.boxes.batched_merge_nms, 结果与逐对实现一致),
+                        "greedy" 原有的逐对计算实现
 
         Returns:
             list: 合并后的框列表。
         """
-        if not boxes:
-            return []
+        if mode == "greedy":
+            merged_boxes = greedy_merge_nms(boxes, iou_threshold)
+        else:
+            merged_boxes = batched_merge_nms(boxes, iou_threshold)
 
-        # 将 (x, y, w, h) 转换为 (x1, y1, x2, y2)
-        rects = np.array([[b[0], b[1], b[0] + b[2], b[1] + b[3]] for b in boxes])
-        
-        # 计算面积
-        areas = (rects[:, 2] - rects[:, 0]) * (rects[:, 3] - rects[:, 1])
-        # 按y1坐标排序
-        indices = np.argsort(rects[:, 1])
-
-        merged_boxes = []
-        while len(indices) > 0:
-            last = len(indices) - 1
-            i = indices[last]
-            
-            # 将当前框加入到合并列表中
-            current_rect = rects[i]
-            current_area = areas[i]  # 保留当前面积
-            indices = np.delete(indices, last)
-
-            # 寻找与当前框高度重叠的其他框
-            suppress = [last]
-            for pos in range(len(indices)):
-                j = indices[pos]
-                
-                # 计算 IoU
-                xx1 = np.maximum(current_rect[0], rects[j][0])
-                yy1 = np.maximum(current_rect[1], rects[j][1])
-                xx2 = np.minimum(current_rect[2], rects[j][2])
-                yy2 = np.minimum(current_rect[3], rects[j][3])
-
-                w = np.maximum(0, xx2 - xx1)
-                h = np.maximum(0, yy2 - yy1)
-                
-                intersection = w * h
-                union = areas[i] + areas[j] - intersection
-                iou = intersection / union if union > 0 else 0
-                
-                # 如果 IoU 超过阈值，则合并这两个框
-                if iou > iou_threshold:
-                    # 合并框：取两个框的最大外接矩形
-                    current_rect[0] = min(current_rect[0], rects[j][0])
-                    current_rect[1] = min(current_rect[1], rects[j][1])
-                    current_rect[2] = max(current_rect[2], rects[j][2])
-                    current_rect[3] = max(current_rect[3], rects[j][3])
-                    current_area += areas[j]  # 累加合并的面积
-                    
-                    # 标记此框，以便后续删除
-                    suppress.append(pos)
-            
-            # 从索引中删除已被合并的框
-            indices = np.delete(indices, [s for s in suppress if s != last])
-            
-            # 将合并后的大框 (x1, y1, x2, y2) 转换回 (x, y, w, h)
-            merged_w = current_rect[2] - current_rect[0]
-            merged_h = current_rect[3] - current_rect[1]
-            merged_boxes.append((int(current_rect[0]), int(current_rect[1]), int(merged_w), int(merged_h), int(current_area)))
-            
         cv_logger.info(f"📦 非极大值抑制：原始检测到 {len(boxes)} 个框，合并后剩余 {len(merged_boxes)} 个框。")
         return merged_boxes
 
-    def __wrap_text(self, text: str, font: str, max_width: float, draw):
-        """将文本在指定宽度内自动换行
-        
-        Args:
-            text (str): 要书写的文本
-            font (ImageFont): 
-        """
-        lines, current = [], ""
-        for ch in text:
-            # 使用 getbbox 计算当前文本宽度
-            bbox = draw.textbbox((0, 0), current + ch, font=font)
-            text_width = bbox[2] - bbox[0]  # x_max - x_min
-            
-            if text_width > max_width:
-                lines.append(current)
-                current = ch
-            else:
-                current += ch
-        
-        if current:
-            lines.append(current)
-        
-        return lines
-
@@ -0,0 +1,351 @@
+"""
+llm_transport.py
+
+大模型请求的公共传输层, 供QwenClient和DeepSeekClient共用
+
+- 同一个服务地址 (base_url + api_key) 只创建一个传输对象, 复用同一个HTTP连接池
+- 同步接口chat()和异步接口achat(), 并发请求数有上限 (信号量);
+  异步客户端和信号量按事件循环分别保存, 用完后由创建事件循环的一方调用aclose()关闭
+- 连接失败, 超时, 限流 (429) 和服务端错误 (5xx) 按指数退避加随机抖动重试;
+  流式请求只在收到第一段内容之前重试, 避免重复输出
+- 每个请求有总时限 (deadline), 包括重试和退避等待的时间
+- 记录每个请求的耗时, 首个token延迟, 重试次数和token用量
+
+Author: Zhu Jiahao
+Date: 2025-08-07
+"""
+
+import asyncio
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Callable, Dict, List, Optional
+import httpx
+import openai
+from openai import AsyncOpenAI, OpenAI
+from src.utils.logger import __logger__
+from src.utils.timing import percentile
+
+__all__ = ['LLMTransport', 'LLMError', 'LLMDeadlineExceeded']
+
+llm_logger = __logger__.get_module_logger("LLM")
+
+# 可以重试的错误: 连接失败/超时, 限流, 服务端错误
+_RETRYABLE = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+
+class LLMError(Exception):
+    """ 大模型请求失败 (重试后仍失败, 或不可重试的错误)
+    """
+
+
+class LLMDeadlineExceeded(LLMError):
+    """ 请求超过总时限
+    """
+
+
+class LLMTransport:
+    """ 带连接池, 并发上限, 重试和统计的大模型请求传输层
+    """
+    _shared: Dict[tuple, "LLMTransport"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self,
+                api_key: str,
+                base_url: str,
+                max_connections: int = 16,
+                max_concurrency: int = 4,
+                max_retries: int = 3,
+                backoff_base: float = 0.5,
+                backoff_max: float = 8.0,
+                timeout: float = 60.0,
+                deadline: Optional[float] = 180.0,
+                include_usage: bool = True):
+        """
+        初始化
+
+        Args:
+            api_key (str): API密钥
+            base_url (str): 服务地址
+            max_connections (int): 连接池的最大连接数
+            max_concurrency (int): 同时进行的请求数上限
+            max_retries (int): 最大重试次数
+            backoff_base (float): 第一次重试前的最大等待时间 (s), 之后每次翻倍
+            backoff_max (float): 单次重试等待时间的上限 (s)
+            timeout (float): 单次HTTP请求的超时 (s)
+            deadline (float): 默认的请求总时限 (s), 为None时不限制
+            include_usage (bool): 流式请求是否要求服务端返回token用量
+        """
+        self.base_url = base_url
+        self.max_concurrency = max(max_concurrency, 1)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.deadline = deadline
+        self.include_usage = include_usage
+        self.records = deque(maxlen=1000)
+
+        self._api_key = api_key
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0, timeout=timeout,
+                             http_client=httpx.Client(limits=self._limits, timeout=timeout))
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        # 异步客户端和信号量绑定在事件循环上, 每个事件循环一份, 事件循环被回收时随之释放
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._async_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, api_key: str, base_url: str, **options) -> "LLMTransport":
+        """ 获取服务地址对应的共享传输对象, 不存在时按options创建
+
+        Args:
+            api_key (str): API密钥
+            base_url (str): 服务地址
+            **options: 见__init__, 只在第一次创建时生效
+
+        Returns:
+            LLMTransport: 传输对象
+        """
+        key = (base_url, api_key)
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(api_key, base_url, **options)
+            return cls._shared[key]
+
+    @classmethod
+    def all_metrics(cls) -> Dict[str, dict]:
+        """ 全部共享传输对象的统计, 服务地址 -> metrics()
+        """
+        with cls._shared_lock:
+            return {transport.base_url: transport.metrics() for transport in cls._shared.values()}
+
+    def chat(self,
+             model: str,
+             messages: List[dict],
+             stream: bool = True,
+             on_delta: Optional[Callable[[str], None]] = None,
+             deadline: Optional[float] = None,
+             report: Optional[dict] = None,
+             **kwargs) -> str:
+        """ 发送一次对话请求, 返回完整的回复文本
+
+        Args:
+            model (str): 模型名
+            messages (List[dict]): 消息列表
+            stream (bool): 是否使用流式接口
+            on_delta (Callable[[str], None]): 可选, 流式请求每收到一段内容时的回调
+            deadline (float): 请求总时限 (s), 默认使用初始化时的设置
+            report (dict): 可选, 请求结束 (成功或失败) 后写入本次请求的统计
+                (attempts, queued_s, latency_s, ttft_s, prompt_tokens, completion_tokens, error)
+            **kwargs: 其他请求参数
+
+        Returns:
+            str: 回复文本
+
+        Raises:
+            LLMError: 重试后仍失败, 或超过总时限
+        """
+        record = self.__new_record(model, stream, report)
+        end = self.__deadline(deadline)
+        with self._slots:
+            record["queued_s"] = time.perf_counter() - record["_start"]
+            record["_start"] = time.perf_counter()          # 耗时和首个token延迟不含排队时间
+            for attempt in range(self.max_retries + 1):
+                record["attempts"] = attempt + 1
+                try:
+                    options = self.__request_options(model, messages, stream, end, kwargs)
+                    response = self.client.chat.completions.create(**options)
+                    if not stream:
+                        return self.__finish(record, self.__message_text(response, record))
+                    try:
+                        parts = []
+                        for chunk in response:
+                            self.__consume_chunk(chunk, record, parts, on_delta, end)
+                    finally:
+                        response.close()
+                    return self.__finish(record, "".join(parts))
+                except Exception as e:
+                    delay = self.__retry_delay(e, attempt, record, end)
+                time.sleep(delay)
+
+    async def achat(self,
+                    model: str,
+                    messages: List[dict],
+                    stream: bool = True,
+                    on_delta: Optional[Callable[[str], None]] = None,
+                    deadline: Optional[float] = None,
+                    report: Optional[dict] = None,
+                    **kwargs) -> str:
+        """ chat()的协程版本, 使用异步HTTP客户端, 并发数同样受max_concurrency限制
+        """
+        client, slots = self.__async_client()
+        record = self.__new_record(model, stream, report)
+        end = self.__deadline(deadline)
+        async with slots:
+            record["queued_s"] = time.perf_counter() - record["_start"]
+            record["_start"] = time.perf_counter()          # 耗时和首个token延迟不含排队时间
+            for attempt in range(self.max_retries + 1):
+                record["attempts"] = attempt + 1
+                try:
+                    options = self.__request_options(model, messages, stream, end, kwargs)
+                    response = await client.chat.completions.create(**options)
+                    if not stream:
+                        return self.__finish(record, self.__message_text(response, record))
+                    try:
+                        parts = []
+                        async for chunk in response:
+                            self.__consume_chunk(chunk, record, parts, on_delta, end)
+                    finally:
+                        await response.close()
+                    return self.__finish(record, "".join(parts))
+                except Exception as e:
+                    delay = self.__retry_delay(e, attempt, record, end)
+                await asyncio.sleep(delay)
+
+    def metrics(self) -> Dict[str, dict]:
+        """ 按模型汇总最近的请求
+
+        Returns:
+            dict: 模型名 -> {calls, errors, retries, p50_latency_s, p95_latency_s, p50_ttft_s, p95_ttft_s,
+                prompt_tokens, completion_tokens, tokens_per_s}
+        """
+        by_model: Dict[str, List[dict]] = {}
+        for record in list(self.records):
+            by_model.setdefault(record["model"], []).append(record)
+
+        result = {}
+        for model, records in by_model.items():
+            ok = [r for r in records if r["ok"]]
+            latencies = [r["latency_s"] for r in ok]
+            ttfts = [r["ttft_s"] for r in ok if r["ttft_s"] is not None]
+            completion = sum(r["completion_tokens"] or 0 for r in ok)
+            # 输出速度只统计流式请求: 首个token之后的时间内生成的token数
+            streamed = [r for r in ok if r["stream"] and r["completion_tokens"]]
+            streamed_tokens = sum(r["completion_tokens"] for r in streamed)
+            streaming_s = sum(r["latency_s"] - (r["ttft_s"] or 0) for r in streamed)
+            result[model] = {
+                "calls": len(records),
+                "errors": len(records) - len(ok),
+                "retries": sum(r["attempts"] - 1 for r in records),
+                "p50_latency_s": percentile(latencies, 50),
+                "p95_latency_s": percentile(latencies, 95),
+                "p50_ttft_s": percentile(ttfts, 50),
+                "p95_ttft_s": percentile(ttfts, 95),
+                "prompt_tokens": sum(r["prompt_tokens"] or 0 for r in ok),
+                "completion_tokens": completion,
+                "tokens_per_s": streamed_tokens / streaming_s if streaming_s > 0 else 0.0,
+            }
+        return result
+
+    async def aclose(self) -> None:
+        """ 关闭当前事件循环的异步客户端 (连接池), 之后在该事件循环中调用achat()时重新创建
+
+        异步连接只能在创建它的事件循环中关闭, 应在事件循环结束前调用, 例如asyncio.run()的协程返回之前。
+        """
+        with self._async_lock:
+            entry = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[0].close()
+
+    def __async_client(self):
+        """ 当前事件循环的异步客户端和信号量, 不存在时创建
+        """
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            entry = self._async_clients.get(loop)
+            if entry is None:
+                client = AsyncOpenAI(api_key=self._api_key, base_url=self.base_url, max_retries=0, timeout=self.timeout,
+                                     http_client=httpx.AsyncClient(limits=self._limits, timeout=self.timeout))
+                entry = (client, asyncio.Semaphore(self.max_concurrency))
+                self._async_clients[loop] = entry
+        return entry
+
+    def __request_options(self, model: str, messages: List[dict], stream: bool, end: Optional[float],
+                          kwargs: dict) -> dict:
+        """ 单次请求的参数, 超时不超过剩余的总时限
+        """
+        timeout = self.timeout
+        if end is not None:
+            remaining = end - time.perf_counter()
+            if remaining <= 0:
+                raise LLMDeadlineExceeded("请求超过总时限")
+            timeout = min(timeout, remaining)
+        options = {"model": model, "messages": messages, "stream": stream, "timeout": timeout, **kwargs}
+        if stream and self.include_usage:
+            options.setdefault("stream_options", {"include_usage": True})
+        return options
+
+    def __consume_chunk(self, chunk, record: dict, parts: List[str], on_delta, end: Optional[float]) -> None:
+        """ 处理一个流式分片: 记录用量和首个token时间, 回调增量内容
+        """
+        if getattr(chunk, "usage", None):
+            record["prompt_tokens"] = chunk.usage.prompt_tokens
+            record["completion_tokens"] = chunk.usage.completion_tokens
+        if chunk.choices:
+            content = getattr(chunk.choices[0].delta, "content", None)
+            if content:
+                if record["ttft_s"] is None:
+                    record["ttft_s"] = time.perf_counter() - record["_start"]
+                parts.append(content)
+                if on_delta:
+                    on_delta(content)
+        if end is not None and time.perf_counter() > end:
+            raise LLMDeadlineExceeded("流式输出超过总时限")
+
+    def __message_text(self, response, record: dict) -> str:
+        """ 非流式回复的文本, 同时记录用量
+        """
+        if getattr(response, "usage", None):
+            record["prompt_tokens"] = response.usage.prompt_tokens
+            record["completion_tokens"] = response.usage.completion_tokens
+        record["ttft_s"] = time.perf_counter() - record["_start"]
+        return response.choices[0].message.content or ""
+
+    def __retry_delay(self, error: Exception, attempt: int, record: dict, end: Optional[float]) -> float:
+        """ 判断是否重试, 返回重试前的等待时间; 不重试时记录失败并抛出LLMError
+        """
+        retryable = isinstance(error, _RETRYABLE) and record["ttft_s"] is None
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        out_of_time = end is not None and time.perf_counter() + delay >= end
+
+        if not retryable or attempt >= self.max_retries or out_of_time:
+            record["ok"] = False
+            record["error"] = self.__describe(error)
+            self.__finish(record, None)
+            if isinstance(error, LLMError):
+                raise error
+            if out_of_time and retryable:
+                raise LLMDeadlineExceeded(f"请求超过总时限, 最后一次错误: {record['error']}") from error
+            raise LLMError(f"{record['model']} 请求失败 (共尝试 {attempt + 1} 次): {record['error']}") from error
+
+        llm_logger.warning(f"{record['model']} 请求失败, {delay:.2f}s 后进行第 {attempt + 1} 次重试: "
+                           f"{self.__describe(error)}")
+        return delay
+
+    @staticmethod
+    def __describe(error: Exception) -> str:
+        """ 错误的简短描述 (HTTP错误只保留状态码, 不输出响应正文)
+        """
+        if isinstance(error, openai.APIStatusError):
+            return f"{type(error).__name__}: HTTP {error.status_code}"
+        return f"{type(error).__name__}: {error}"
+
+    def __new_record(self, model: str, stream: bool, report: Optional[dict]) -> dict:
+        return {"model": model, "stream": stream, "ok": True, "attempts": 0, "queued_s": 0.0, "latency_s": 0.0, "ttft_s": None,
+                "prompt_tokens": None, "completion_tokens": None, "error": None, "_start": time.perf_counter(),
+                "_report": report}
+
+    def __finish(self, record: dict, text: Optional[str]) -> Optional[str]:
+        record["latency_s"] = time.perf_counter() - record.pop("_start")
+        report = record.pop("_report")
+        if report is not None:
+            report.update(record)
+        self.records.append(record)
+        return text
+
+    def __deadline(self, deadline: Optional[float]) -> Optional[float]:
+        deadline = self.deadline if deadline is None else deadline
+        return time.perf_counter() + deadline if deadline else None
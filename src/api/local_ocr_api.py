@@ -0,0 +1,256 @@
+"""
+local_ocr_api.py
+
+本地OCR模块, 在CPU上运行, 不需要网络
+
+使用OpenCV DNN加载磁盘上的ONNX模型 (不增加依赖):
+1. 文字检测: DB模型 (例如OpenCV提供的DB_TD500_resnet50.onnx, 支持中英文), 输出每一行文字的四边形
+2. 文字识别: CRNN模型 (例如crnn_cs_CN.onnx), 把每一行透视变换为水平的文字条后识别,
+   输出按CTC贪心解码, 同时得到每个字符的概率, 用于计算置信度
+模型输入宽度固定时, 长文字条在字间空白处切成若干段分别识别。
+
+识别结果的置信度为各字符概率的平均值, 供OCRRouter决定是否改用远程OCR。
+
+Author: Zhu Jiahao
+Date: 2025-08-11
+"""
+
+import math
+import os
+import threading
+import time
+from typing import List, Optional, Tuple
+import cv2
+import numpy as np
+from src.core.boxes import reading_order
+from src.core.stream_sink import ConsoleSubscriber, FileSubscriber, StreamSink
+from src.utils.logger import __logger__
+
+__all__ = ['LocalOCRClient', 'OCRError', 'ctc_greedy_decode', 'split_text_strip']
+
+local_ocr_logger = __logger__.get_module_logger("LocalOCR")
+
+# DB模型的输入归一化参数 (与OpenCV文字检测示例一致)
+_DB_MEAN = (122.67891434, 116.66876762, 104.00698793)
+
+
+class OCRError(Exception):
+    """ 本地OCR失败 (模型无法加载或推理出错)
+    """
+
+
+def ctc_greedy_decode(output: np.ndarray, charset: List[str]) -> Tuple[str, float]:
+    """ CTC贪心解码: 每个时间步取概率最大的类别, 合并相邻重复, 去掉空白 (下标0)
+
+    Args:
+        output (np.ndarray): 识别网络输出, 形状 (T, C) 或 (T, 1, C), 可以是概率或未归一化的分数
+        charset (List[str]): 字符表, 第i个字符对应类别i+1
+
+    Returns:
+        Tuple: (文本, 置信度), 置信度为输出字符概率的平均值, 没有输出字符时为0
+    """
+    scores = output.reshape(output.shape[0], -1).astype(np.float32)
+    if scores.min() < 0 or not np.allclose(scores.sum(axis=1), 1.0, atol=1e-3):
+        scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+        scores /= scores.sum(axis=1, keepdims=True)
+
+    best = scores.argmax(axis=1)
+    chars, probs, previous = [], [], 0
+    for t, label in enumerate(best):
+        if label != 0 and label != previous and label <= len(charset):
+            chars.append(charset[label - 1])
+            probs.append(float(scores[t, label]))
+        previous = label
+    return "".join(chars), float(np.mean(probs)) if probs else 0.0
+
+
+def split_text_strip(strip: np.ndarray, aspect: float, search: float = 0.15) -> List[np.ndarray]:
+    """ 把水平文字条按宽度等分为宽高比约为aspect的若干段, 切点移到名义切点附近墨迹最少的列 (字间空白)
+
+    Args:
+        strip (np.ndarray): 文字条图像 (灰度或BGR)
+        aspect (float): 每段的目标宽高比 (识别模型输入的宽/高)
+        search (float): 在名义切点左右各段宽的这一比例内寻找空白列
+
+    Returns:
+        List[np.ndarray]: 各段图像
+    """
+    h, w = strip.shape[:2]
+    parts = math.ceil(w / (h * aspect)) if h > 0 else 1
+    if parts <= 1:
+        return [strip]
+
+    gray = strip if strip.ndim == 2 else cv2.cvtColor(strip, cv2.COLOR_BGR2GRAY)
+    ink = (255 - gray.astype(np.int32)).sum(axis=0)
+    step = w / parts
+    window = max(int(step * search), 1)
+    cuts = [0]
+    for i in range(1, parts):
+        nominal = int(i * step)
+        lo, hi = max(nominal - window, cuts[-1] + 1), min(nominal + window, w - 1)
+        cuts.append(lo + int(ink[lo:hi + 1].argmin()) if hi >= lo else nominal)
+    cuts.append(w)
+    return [strip[:, a:b] for a, b in zip(cuts, cuts[1:]) if b > a]
+
+
+class LocalOCRClient:
+    """ 本地OCR服务 (OpenCV DNN + ONNX模型)
+    """
+    def __init__(self,
+                det_model: str,
+                rec_model: str,
+                charset: str,
+                det_input_size: Tuple[int, int] = (960, 1344),
+                rec_input_size: Tuple[int, int] = (100, 32),
+                rec_color: bool = True,
+                binary_threshold: float = 0.3,
+                polygon_threshold: float = 0.5,
+                max_candidates: int = 500,
+                unclip_ratio: float = 2.0):
+        """
+        初始化, 加载模型
+
+        Args:
+            det_model (str): DB文字检测模型 (.onnx) 路径
+            rec_model (str): CRNN文字识别模型 (.onnx) 路径
+            charset (str): 字符表文件路径, 每行一个字符, 顺序与识别模型的类别1, 2, ...一致
+            det_input_size (Tuple[int, int]): 检测模型输入 (宽, 高), 需为32的倍数, 默认接近A4比例
+            rec_input_size (Tuple[int, int]): 识别模型输入 (宽, 高)
+            rec_color (bool): 识别模型是否使用三通道输入 (中文模型通常为True), False为灰度输入
+            binary_threshold (float): DB概率图二值化阈值
+            polygon_threshold (float): 文字框的最低检测得分
+            max_candidates (int): 最多检测的文字框数
+            unclip_ratio (float): 文字框外扩比例
+
+        Raises:
+            OCRError: 模型或字符表文件不存在, 或无法加载
+        """
+        for path in (det_model, rec_model, charset):
+            if not path or not os.path.exists(path):
+                raise OCRError(f"本地OCR模型文件不存在: {path}")
+
+        with open(charset, "r", encoding="utf-8") as f:
+            self.charset = [line.rstrip("\r\n") for line in f if line.rstrip("\r\n")]
+        self.rec_input_size = tuple(rec_input_size)
+        self.rec_color = rec_color
+
+        try:
+            self.detector = cv2.dnn.TextDetectionModel_DB(det_model)
+            self.detector.setBinaryThreshold(binary_threshold)
+            self.detector.setPolygonThreshold(polygon_threshold)
+            self.detector.setMaxCandidates(max_candidates)
+            self.detector.setUnclipRatio(unclip_ratio)
+            self.detector.setInputParams(1.0 / 255.0, tuple(det_input_size), _DB_MEAN)
+            self.recognizer = cv2.dnn.readNet(rec_model)
+        except cv2.error as e:
+            raise OCRError(f"本地OCR模型加载失败: {e}") from e
+
+        # cv2.dnn的网络不能在多个线程中同时推理 (批量模式会在线程池中调用)
+        self._lock = threading.Lock()
+        self.ocr_metrics = []
+        local_ocr_logger.info(f"本地OCR模型已加载: {os.path.basename(det_model)}, {os.path.basename(rec_model)}, "
+                              f"字符表 {len(self.charset)} 个字符")
+
+    def recognize(self, image_path: str) -> dict:
+        """ 识别一张图片
+
+        Args:
+            image_path (str): 图片路径
+
+        Returns:
+            dict: text (按阅读顺序每行一段), confidence (按字符数加权的平均置信度),
+                lines ([{"box", "text", "confidence"}]), elapsed_s
+
+        Raises:
+            OCRError: 无法读取图片或推理出错
+        """
+        image = cv2.imread(image_path)
+        if image is None:
+            raise OCRError(f"无法读取图片: {image_path}")
+
+        start = time.perf_counter()
+        try:
+            with self._lock:
+                quads, _ = self.detector.detect(image)
+                lines = [self.__recognize_quad(image, np.asarray(quad, dtype=np.float32)) for quad in quads]
+        except cv2.error as e:
+            raise OCRError(f"本地OCR推理失败: {e}") from e
+
+        lines = [line for line in lines if line["text"]]
+        order = reading_order([(*line["box"], i) for i, line in enumerate(lines)])
+        lines = [lines[box[4]] for box in order]
+        chars = sum(len(line["text"]) for line in lines)
+        confidence = sum(line["confidence"] * len(line["text"]) for line in lines) / chars if chars else 0.0
+        result = {
+            "text": "\n".join(line["text"] for line in lines),
+            "confidence": confidence,
+            "lines": lines,
+            "elapsed_s": time.perf_counter() - start,
+        }
+        self.ocr_metrics.append({"image": image_path, "lines": len(lines), "chars": chars,
+                                 "confidence": confidence, "ocr_s": result["elapsed_s"]})
+        local_ocr_logger.info(f"本地OCR完成: {len(lines)} 行, {chars} 字, 置信度 {confidence:.2f}, "
+                              f"耗时 {result['elapsed_s']:.2f}s")
+        return result
+
+    def ocr_image(self, image_path: str, log_path: Optional[str], prompt: str = None) -> str:
+        """ 与QwenClient.ocr_image接口一致: 识别结果输出到终端并追加到日志文件
+
+        Args:
+            image_path (str): 图片路径
+            log_path (str): 日志记录路径, 为None时不写文件
+            prompt (str): 不使用, 只为与QwenClient.ocr_image保持一致
+
+        Returns:
+            str: 识别出的文本
+
+        Raises:
+            OCRError: 识别失败
+        """
+        text = self.recognize(image_path)["text"]
+        with StreamSink(ConsoleSubscriber(), FileSubscriber(log_path, "a") if log_path else None) as sink:
+            sink(text)
+        return text
+
+    def __recognize_quad(self, image: np.ndarray, quad: np.ndarray) -> dict:
+        """ 识别一个文字框: 透视变换为水平文字条, 必要时分段识别
+        """
+        strip = self.__warp_strip(image, quad)
+        texts, probs = [], []
+        rec_w, rec_h = self.rec_input_size
+        for part in split_text_strip(strip, rec_w / rec_h):
+            text, confidence = self.__recognize_strip(part)
+            if text:
+                texts.append(text)
+                probs.append((confidence, len(text)))
+        text = "".join(texts)
+        confidence = sum(c * n for c, n in probs) / len(text) if text else 0.0
+
+        x, y, w, h = cv2.boundingRect(quad.astype(np.int32))
+        return {"box": (x, y, w, h), "text": text, "confidence": confidence}
+
+    def __warp_strip(self, image: np.ndarray, quad: np.ndarray) -> np.ndarray:
+        """ 把文字框透视变换为高度等于识别模型输入高度的水平文字条
+        """
+        rect = cv2.minAreaRect(quad)
+        points = cv2.boxPoints(rect)
+        # 左上, 右上, 右下, 左下
+        s, d = points.sum(axis=1), np.diff(points, axis=1).ravel()
+        src = np.float32([points[s.argmin()], points[d.argmin()], points[s.argmax()], points[d.argmax()]])
+        width = max(np.linalg.norm(src[1] - src[0]), 1.0)
+        height = max(np.linalg.norm(src[3] - src[0]), 1.0)
+
+        rec_h = self.rec_input_size[1]
+        out_w = max(int(round(width * rec_h / height)), 1)
+        dst = np.float32([[0, 0], [out_w - 1, 0], [out_w - 1, rec_h - 1], [0, rec_h - 1]])
+        return cv2.warpPerspective(image, cv2.getPerspectiveTransform(src, dst), (out_w, rec_h))
+
+    def __recognize_strip(self, strip: np.ndarray) -> Tuple[str, float]:
+        """ 识别一段文字条
+        """
+        if self.rec_color:
+            blob = cv2.dnn.blobFromImage(strip, 1.0 / 127.5, self.rec_input_size, (127.5, 127.5, 127.5))
+        else:
+            blob = cv2.dnn.blobFromImage(cv2.cvtColor(strip, cv2.COLOR_BGR2GRAY), 1.0 / 127.5, self.rec_input_size, 127.5)
+        self.recognizer.setInput(blob)
+        return ctc_greedy_decode(self.recognizer.forward(), self.charset)
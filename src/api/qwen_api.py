@@ -8,8 +8,17 @@ Date: 2025-07-15
 """
 
 import os
-from openai import OpenAI
-from src.utils.utils import encode_image_to_base64, get_image_mime_type
+import base64
+import json
+import time
+from typing import Optional
+import cv2
+import numpy as np
+from src.utils.utils import get_image_mime_type
+from src.core.response_cache import ResponseCache
+from src.core.ocr_upload import prepare_ocr_image
+from src.core.stream_sink import ConsoleSubscriber, FileSubscriber, StreamSink
+from src.api.llm_transport import LLMTransport, LLMError
 from src.utils.config import __config__
 from src.utils.logger import __logger__
 
@@ -20,56 +29,133 @@ qwen_logger = __logger__.get_module_logger("Qwen")
 class QwenClient:
     """Qwen服务API
     """
-    def __init__(self, api_key, base_url, vl_model, text_model):
+    def __init__(self, api_key, base_url, vl_model, text_model, cache: Optional[ResponseCache] = None,
+                 upload_config: Optional[dict] = None, transport_config: Optional[dict] = None):
+        """
+        初始化
+
+        Args:
+            transport_config (dict): 可选, 共享传输层的配置 (见LLMTransport), 只在该服务地址第一次使用时生效
+            cache (ResponseCache): 可选, OCR结果缓存
+            upload_config (dict): 可选, OCR上传图片的预处理配置 (mode, max_dpi, format, quality, crop_to_text),
+                为空时按原文件上传
+        """
         self.api_key = api_key
         self.base_url = base_url
         self.vl_model = vl_model
         self.text_model = text_model
-        self.client = OpenAI(api_key=api_key, base_url=base_url)
+        self.cache = cache
+        self.upload_config = upload_config
+        self.ocr_metrics = []           # 每次OCR的上传字节数与耗时, 用于权衡上传体积和识别准确率
+        self.transport = LLMTransport.shared(api_key, base_url, **(transport_config or {}))
+
+    def ocr_image(self, image_path: str, log_path: Optional[str], prompt: str=None) -> str:
+        """ 对图片进行OCR, 识别结果输出到终端并追加到日志文件
 
-    def ocr_image(self, image_path: str, log_path: str, prompt: str=None) -> None:
-        """ 对图片列表进行OCR, 返回并拼接成完整的文本。
-        
         Args:
             image_path (str): 图片路径
-            log_path (str): 日志记录路径
+            log_path (str): 日志记录路径, 为None时不写文件
             prompt (str): 可选, 系统消息内容。
+
+        Returns:
+            str: 识别出的文本
+
+        Raises:
+            LLMError: 重试后仍识别失败
         """
+        system = prompt or "你是一个试卷识别助手，请准确提取试卷中的所有文字内容，不要添加任何解释或说明，直接输出试卷原文。"
+        instruction = "请准确提取这张试卷中的所有文字内容"
         try:
-            b64 = encode_image_to_base64(image_path)
-            mime = get_image_mime_type(image_path)
+            start = time.perf_counter()
+            with open(image_path, "rb") as f:
+                image_bytes = f.read()
+
+            cache_key = None
+            if self.cache is not None:
+                upload = json.dumps(self.upload_config, sort_keys=True) if self.upload_config else None
+                cache_key = ResponseCache.key("ocr", self.vl_model, system, instruction, upload, image_bytes)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    qwen_logger.info(f"命中OCR缓存: {image_path}")
+                    with self.__sink(log_path) as sink:
+                        sink(cached)
+                    return cached
+
+            payload, mime, info = self.__prepare_upload(image_path, image_bytes)
+            prepared = time.perf_counter()
+            b64 = base64.b64encode(payload).decode("utf-8")
             messages = [
-                {"role": "system", "content": [{"type": "text", "text": prompt or "你是一个试卷识别助手，请准确提取试卷中的所有文字内容，不要添加任何解释或说明，直接输出试卷原文。"}]},
+                {"role": "system", "content": [{"type": "text", "text": system}]},
                 {"role": "user", "content": [
                     {"type": "image_url", "image_url": {"url": f"data:{mime};base64,{b64}"}},
-                    {"type": "text", "text": "请准确提取这张试卷中的所有文字内容"}
+                    {"type": "text", "text": instruction}
                 ]}
             ]
-            response = self.client.chat.completions.create(
-                model=self.vl_model,
-                messages=messages,
-                stream=True
-            )
-            result = ""
-            with open(log_path, "a", encoding="utf-8") as f:
-                for chunk in response:
-                    delta = chunk.choices[0].delta
-                    if getattr(delta, "content", None):
-                        content = delta.content
-                        print(content, end="", flush=True)  # 输出到终端
-                        f.write(content)                    # 写入文件
-                        result += content
-            print(" ")
-            
-        except Exception as e:
+            report = {}
+            with self.__sink(log_path) as sink:
+                result = self.transport.chat(self.vl_model, messages, stream=True, on_delta=sink, report=report)
+            stream = sink.stats(report.get("completion_tokens"))
+
+            metrics = {
+                "image": image_path,
+                "original_bytes": len(image_bytes),
+                "payload_bytes": len(payload),
+                "base64_bytes": len(b64),
+                **info,
+                "prepare_s": prepared - start,
+                "ocr_s": time.perf_counter() - prepared,
+                "chars": len(result),
+                "ttft_s": stream["ttft_s"],
+                "tokens_per_s": stream["tokens_per_s"],
+            }
+            self.ocr_metrics.append(metrics)
+            qwen_logger.info(f"OCR完成: 上传 {len(payload) / 1024:.0f}KB (原图 {len(image_bytes) / 1024:.0f}KB), "
+                             f"预处理 {metrics['prepare_s']:.2f}s, 识别 {metrics['ocr_s']:.2f}s "
+                             f"(首个token {stream['ttft_s'] or 0:.2f}s, {stream['tokens_per_s']:.1f} token/s), "
+                             f"{len(result)} 字")
+
+            if cache_key is not None and result:
+                self.cache.put(cache_key, result, model=self.vl_model)
+            return result
+
+        except LLMError as e:
             qwen_logger.error(f"QwenClient OCR error: {e}")
-            exit()
+            raise
+
+    @staticmethod
+    def __sink(log_path: Optional[str]) -> StreamSink:
+        """ 终端 + 日志文件 (追加, 可选) 的输出分发
+        """
+        return StreamSink(ConsoleSubscriber(), FileSubscriber(log_path, "a") if log_path else None)
+
+    def __prepare_upload(self, image_path: str, image_bytes: bytes):
+        """ 按upload_config生成上传的图片, 未配置时直接使用原文件
+
+        Returns:
+            Tuple: (图片字节, MIME类型, 信息)
+        """
+        if not self.upload_config:
+            return image_bytes, get_image_mime_type(image_path), {}
+
+        image = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+        config = self.upload_config
+        return prepare_ocr_image(
+            image,
+            mode=config.get("mode", "gray"),
+            max_dpi=config.get("max_dpi", 150),
+            fmt=config.get("format", "jpeg"),
+            quality=config.get("quality", 80),
+            crop_to_text=config.get("crop_to_text", False)
+        )
 
     def text_split(self, text: str) -> str:
-        """ 文本分割
+        """ 文本分割, 输出格式见src.core.answer.parse_split_units
 
         Args:
             text (str): 待分割的文本
+
+        Returns:
+            str: 分割后的文本, 请求失败时返回空字符串
         """
         qwen_logger.info(f"正在进行文本分割, 文本长度: {len(text)}...")
 
@@ -83,21 +169,30 @@ class QwenClient:
             f"{text}"
         )
 
+        system = "你是一个文本切割助手，输出时严格按照约定格式。"
+        cache_key = None
+        if self.cache is not None:
+            cache_key = ResponseCache.key("split", self.text_model, system, prompt)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                qwen_logger.info("命中缓存, 跳过文本分割请求")
+                return cached
+
         try:
-            response = self.client.chat.completions.create(
+            result = self.transport.chat(
                 self.text_model,
                 messages=[
-                    {"role": "system", "content": "你是一个文本切割助手，输出时严格按照约定格式。"},
+                    {"role": "system", "content": system},
                     {"role": "user", "content": prompt}
                 ],
-                stream=False,
-                stream_options={"include_usage": False}
-            )
+                stream=False
+            ).strip()
 
-        except Exception as e:
+        except LLMError as e:
             qwen_logger.error(f"文本分割模块错误: {e}")
             return ""
 
-        result = response.choices[0].message.content.strip()
         qwen_logger.info("非流式响应已完成")
+        if cache_key is not None and result:
+            self.cache.put(cache_key, result, model=self.text_model)
         return result
\ No newline at end of file
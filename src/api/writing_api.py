@@ -7,11 +7,17 @@ Author: Zhu Jiahao
 Date: 2025-07-18
 """
 
-import pickle
+import os
 import time
 import json
-from pymycobot.ultraArmP340 import ultraArmP340
-from HersheyFonts import HersheyFonts
+import numpy as np
+from src.core.planner import plan_toolpath, pen_up_distance
+from src.core.font_store import open_chinese_font
+from src.core.glyph_cache import HersheyGlyphCache
+from src.core.motion import MotionStreamer
+from src.core.simplify import StrokeSimplifier
+from src.core.simulator import SimulatedUltraArmP340
+from src.core.toolpath import PEN_DOWN, compile_toolpath, save_toolpath, load_toolpath, toolpath_key
 from src.utils.config import __config__
 from src.utils.logger import __logger__
 
@@ -23,6 +29,9 @@ writing_logger = __logger__.get_module_logger("Writing")
 ASCII_OFFSET_X_FACTOR = -0.7
 ASCII_OFFSET_Y_FACTOR = -0.23
 
+# 纸张中心 (机械臂坐标), 即go_center后笔尖所在位置
+CENTER_COORDS = (235.55, 0.0)
+
 # 全角标点映射
 PUNCTUATION_MAP = {
     '，': ',', '。': '.', '“': '"', '”': '"', '：': ':', 
@@ -42,7 +51,12 @@ class RobotWritingClient:
                 speed_write: int, 
                 origin_x: float,
                 origin_y: float,
-                chinese_font_path: str):
+                chinese_font_path: str,
+                motion_config: dict = None,
+                simplify_tolerance: float = 0.0,
+                hershey_cache_path: str = None,
+                backend: str = "p340",
+                simulator_config: dict = None):
         """
         初始化
 
@@ -55,6 +69,12 @@ class RobotWritingClient:
             origin_y (float): 机械臂默认Y坐标 (即机械臂位于A4纸[0, 0]时的Y坐标)
             speed_move (int): 移动画笔的速度
             speed_write (int): 写字的速度    
+            chinese_font_path (str): 中文笔画字体路径
+            motion_config (dict): 可选, 流式运动配置 (streaming, lookahead, blend_tolerance, poll_interval)
+            simplify_tolerance (float): 中文笔画抽稀容差 (mm), 0表示不抽稀
+            hershey_cache_path (str): 可选, ASCII字形缓存文件路径, 不存在时预热后写入
+            backend (str): 机械臂后端, "p340" 为真实机械臂, "sim" 为离线模拟器
+            simulator_config (dict): 可选, 模拟器参数 (见SimulatedUltraArmP340)
         """
         self.z_up = z_up
         self.z_down = z_down
@@ -62,19 +82,42 @@ class RobotWritingClient:
         self.speed_write = speed_write
         self.origin_x = origin_x
         self.origin_y = origin_y
-
-        try:
-            self.ua = ultraArmP340(com_port, baudrate)
-        except:
-            writing_logger.error("机器人无法连接")
-            exit()
+        self.chinese_font_path = chinese_font_path
+        motion_config = motion_config or {}
+        self.streaming = motion_config.get("streaming", False)
+
+        self.backend = backend
+        if backend == "sim":
+            simulator_config = dict(simulator_config or {})
+            simulator_config.setdefault("pen_contact_z", (z_up + z_down) / 2.0)
+            self.ua = SimulatedUltraArmP340(**simulator_config)
+            writing_logger.info("使用离线模拟机械臂")
+        else:
+            try:
+                from pymycobot.ultraArmP340 import ultraArmP340
+                self.ua = ultraArmP340(com_port, baudrate)
+            except:
+                writing_logger.error("机器人无法连接")
+                exit()
+
+        self.streamer = MotionStreamer(
+            self.ua,
+            lookahead=motion_config.get("lookahead", 4),
+            blend_tolerance=motion_config.get("blend_tolerance", 1.0),
+            poll_interval=motion_config.get("poll_interval", 0.02)
+        )
         
         try:
-            with open(chinese_font_path, "rb") as f:
-                self.chinese_font = pickle.load(f)
+            self.chinese_font = open_chinese_font(chinese_font_path)
         except FileNotFoundError:
             writing_logger.error("找不到中文字体")
             exit()
+        self.simplifier = StrokeSimplifier(self.chinese_font, simplify_tolerance)
+
+        self.glyph_cache = HersheyGlyphCache()
+        if hershey_cache_path and not self.glyph_cache.load(hershey_cache_path):
+            self.glyph_cache.warm()
+            self.glyph_cache.save(hershey_cache_path)
 
         writing_logger.info("机器人正在回零...")
         self.ua.go_zero()
@@ -115,11 +158,11 @@ class RobotWritingClient:
         writing_logger.info("机械臂正在前往纸张中心...")
         self.ua.set_angles([0, 0, 0], self.speed_move)
         time.sleep(0.1)
-        self.ua.set_coords([235.55, 0, self.z_up], self.speed_move)
+        self.ua.set_coords([CENTER_COORDS[0], CENTER_COORDS[1], self.z_up], self.speed_move)
         # 控制误差在±0.1
         while True:
             coords = self.ua.get_coords_info()
-            if abs(coords[0] - 235.55) <= 0.1 and abs(coords[1]) <= 0.1:
+            if abs(coords[0] - CENTER_COORDS[0]) <= 0.1 and abs(coords[1] - CENTER_COORDS[1]) <= 0.1:
                 break
             time.sleep(0.02)
         writing_logger.info("机械臂已到达纸张中心")
@@ -134,43 +177,15 @@ class RobotWritingClient:
             center_y (float): 该汉字中心点y坐标 (mm)
             height (float): 字体高度 (mm)
         """
-        # 1. 检查并获取字符数据
-        if ch not in self.chinese_font:
+        strokes = self.__chinese_char_strokes(ch, center_x, center_y, height)
+        if not strokes:
             return
-        strokes = self.chinese_font[ch]
-        # print(strokes)
 
-        # 2. 确定缩放比例
-        char_spacing_base = 70.0
-        x_ratio = 1.0
-        y_ratio = 0.8
-        scale_x = height / char_spacing_base * x_ratio
-        scale_y = height / char_spacing_base * y_ratio
-
-        # 3. 逐笔画绘制
+        # 逐笔画绘制
         for stroke in strokes:
-            # 找到该笔画的第一个点
-            x0_raw = stroke[0]["y"] / 10.0
-            y0_raw = stroke[0]["x"] / 10.0 - char_spacing_base
-            # 将该点转换为机械臂坐标
-            px0 = center_x - x0_raw * scale_x
-            py0 = center_y + y0_raw * scale_y
-            # 将笔移动到起笔点 (空中)
-            # self.ua.set_coords([px0, py0, self.z_up], self.speed_move)
-            self.__move_sync(px0, py0)
-            # 笔下落开始绘制
-            # self.ua.set_coords([px0, py0, self.z_down], self.speed_write)
-            self.__write_sync(px0, py0)
-            # 继续绘制这一笔的后续点
-            for pt in stroke[1:]:
-                x_raw = pt["y"] / 10.0
-                y_raw = pt["x"] / 10.0 - char_spacing_base
-                px = center_x - x_raw * scale_x
-                py = center_y + y_raw * scale_y
-                # self.ua.set_coords([px, py, self.z_down], self.speed_write)
-                self.__write_sync(px, py)
+            self.__draw_stroke(stroke, lift=False)
 
-        # 4. 写完一个字，提起笔
+        # 写完一个字，提起笔
         self.ua.set_coord("z", self.z_up, self.speed_move)
 
     def write_ascii_char(self, ch: str, center_x: float, center_y: float, height: float) -> None:
@@ -183,50 +198,21 @@ class RobotWritingClient:
             center_y (float): 该汉字中心点y坐标 (mm)
             height (float): 字体高度 (mm)
         """
-        # 1. 加载字体对象并初始化
-        hf = HersheyFonts()
-        hf.load_default_font("futural")
-        # 2. 定义字体缩放规范
-        ascii_unit_height = 100.0
-        hf.normalize_rendering(ascii_unit_height)
-        ascii_scale = height / ascii_unit_height
-        # 3. 获取字符线段数据
-        raw_segments = hf.lines_for_text(ch)
-        if not raw_segments: return
-        # 4. 将线段合并为连续路径
-        paths = self.__merge_segments_to_paths(raw_segments)
+        paths = self.__ascii_char_strokes(ch, center_x, center_y, height)
         if not paths: return
-        # 5. 对齐
-        all_x_raw = [pt[0] for path_item in paths for pt in path_item]
-        if not all_x_raw: return
-        center_offset_x_raw = (min(all_x_raw) + max(all_x_raw)) / 2.0
-        # 6. 调整offset
-        ascii_offset_x = height * ASCII_OFFSET_X_FACTOR
-        ascii_offset_y = height * ASCII_OFFSET_Y_FACTOR
-        # 7. 遍历每条路径，逐路径绘图
+        # 遍历每条路径，逐路径绘图
         for path in paths:
-            # 计算起点
-            x_h0, y_h0 = path[0]
-            x_adj_raw0 = x_h0 - center_offset_x_raw
-            x_pen_offset0 = (y_h0 * ascii_scale) - (height / 2.0)
-            y_pen_offset0 = x_adj_raw0 * ascii_scale
-            px0 = center_x + x_pen_offset0 + ascii_offset_x
-            py0 = center_y + y_pen_offset0 + ascii_offset_y
+            px0, py0 = path[0]
             # 落笔
             self.ua.set_coords([px0, py0, self.z_up], self.speed_move)
             self.ua.set_coords([px0, py0, self.z_down], self.speed_write)
             time.sleep(0.01)
             # 绘制后续所有路径
-            for (x_h, y_h) in path[1:]:
-                x_adj_raw = x_h - center_offset_x_raw
-                x_pen_offset = (y_h * ascii_scale) - (height / 2.0)
-                y_pen_offset = x_adj_raw * ascii_scale
-                px = center_x + x_pen_offset + ascii_offset_x
-                py = center_y + y_pen_offset + ascii_offset_y
+            for px, py in path[1:]:
                 self.ua.set_coords([px, py, self.z_down], self.speed_write)
                 time.sleep(0.01)
             
-        # 8. 写完收笔
+        # 写完收笔
         self.ua.set_coord("z", self.z_up, self.speed_move)
         time.sleep(0.1)
 
@@ -242,39 +228,189 @@ class RobotWritingClient:
             spacing_ratio (float): 字符间水平间隔比例
         """
         writing_logger.info(f"正在书写: '{text}', 书写起点位置(A4纸坐标): [{start_x:.2f}, {start_y:.2f}]")
-        current_a4_x_offset = 0
 
-        # 遍历字符
-        for char in text:
-            # 1. 处理全角标点映射
-            is_full_width_punct = char in PUNCTUATION_MAP
-            char_to_write = PUNCTUATION_MAP.get(char, char)
-            # 2. 字符类型判断
-            is_chinese = char_to_write in self.chinese_font
-            is_space = char_to_write == ' '
-            is_ascii = char_to_write.isascii() and char_to_write.isprintable() and not is_space and not is_chinese
-            # 3. 计算字符宽度
-            width = height if (is_chinese or is_full_width_punct) else height / 2
-            # 4. 跳过空格
-            if is_space:
-                current_a4_x_offset += width * spacing_ratio
-                continue
-            # 5. 坐标转换
-            center_start_x = start_x + current_a4_x_offset + width / 2.0
-            center_start_y = start_y + height / 2.0
-            # print(center_start_x, center_start_y)
-            robot_x, robot_y = self.__a4_to_robot_coords(center_start_x, center_start_y)
-
-            # 6. 调用绘制函数
-            if is_chinese:
+        for char, char_to_write, char_type, robot_x, robot_y in self.__layout_line(text, start_x, start_y, height, spacing_ratio):
+            if char_type == "chinese":
                 self.write_chinese_char(char_to_write, robot_x, robot_y, height)
-            elif is_ascii:
+            elif char_type == "ascii":
                 self.write_ascii_char(char_to_write, robot_x, robot_y, height)
             else:
                 writing_logger.warning(f"出现了无法识别的字符: {char}")
-            # 7. 更新偏移量
-            offset = width * spacing_ratio
-            current_a4_x_offset += offset
+
+    def build_line_strokes(self, text: str, start_x: float, start_y: float, height: float, spacing_ratio: float) -> list:
+        """
+        计算一行文本的全部笔画 (机械臂坐标), 不控制机械臂运动
+
+        Args:
+            text (str): 要写的文本
+            start_x (float): 起始点的X坐标 (A4纸坐标)
+            start_y (float): 起始点的Y坐标 (A4纸坐标)
+            height (float): 字体高度
+            spacing_ratio (float): 字符间水平间隔比例
+
+        Returns:
+            List[List[Tuple[float, float]]]: 按字体顺序排列的笔画列表
+        """
+        strokes = []
+        for char, char_to_write, char_type, robot_x, robot_y in self.__layout_line(text, start_x, start_y, height, spacing_ratio):
+            if char_type == "chinese":
+                strokes.extend(self.__chinese_char_strokes(char_to_write, robot_x, robot_y, height))
+            elif char_type == "ascii":
+                strokes.extend(self.__ascii_char_strokes(char_to_write, robot_x, robot_y, height))
+            else:
+                writing_logger.warning(f"出现了无法识别的字符: {char}")
+        return strokes
+
+    def write_tasks(self, tasks: list, optimize: bool = True) -> None:
+        """
+        书写load_writing_tasks读取的全部任务
+
+        optimize为True时, 先将所有任务规划为一条完整的书写路径 (笔画反向, 最近邻与2-opt重排),
+        以减少抬笔移动距离; 否则按原有顺序逐行书写。
+
+        Args:
+            tasks (List[dict]): 写字任务列表
+            optimize (bool): 是否进行书写路径规划
+        """
+        if not optimize:
+            for task in tasks:
+                self.write_text_line(
+                    task.get("text"),
+                    task.get("a4_x_mm"),
+                    task.get("a4_y_mm"),
+                    task.get("char_height_mm"),
+                    task.get("char_spacing_ratio")
+                )
+            return
+
+        toolpath = self.plan_tasks(tasks)
+        writing_logger.info(f"开始按规划路径书写, 共 {len(toolpath)} 笔")
+        for stroke in toolpath:
+            # 每一笔写完后提笔, 下一笔可能属于其他字符
+            self.__draw_stroke(stroke, lift=True)
+
+    def plan_tasks(self, tasks: list) -> list:
+        """
+        将全部写字任务规划为一条书写路径, 并输出优化前后的抬笔移动距离
+
+        Args:
+            tasks (List[dict]): 写字任务列表
+
+        Returns:
+            List[List[Tuple[float, float]]]: 规划后的笔画序列 (机械臂坐标)
+        """
+        lines = [
+            self.build_line_strokes(
+                task.get("text"),
+                task.get("a4_x_mm"),
+                task.get("a4_y_mm"),
+                task.get("char_height_mm"),
+                task.get("char_spacing_ratio")
+            )
+            for task in tasks
+        ]
+        original = [stroke for line in lines for stroke in line]
+        toolpath = plan_toolpath(lines, origin=CENTER_COORDS)
+
+        before = pen_up_distance(original, origin=CENTER_COORDS)
+        after = pen_up_distance(toolpath, origin=CENTER_COORDS)
+        writing_logger.info(
+            f"书写路径规划完成: 抬笔移动距离 {before:.1f}mm -> {after:.1f}mm, "
+            f"预计节省 {(before - after) / self.speed_move:.1f}s"
+        )
+        return toolpath
+
+    def compile_tasks(self, tasks: list, toolpath_path: str = None, optimize: bool = True) -> np.ndarray:
+        """
+        将全部写字任务编译为运动程序, 可选保存到文件
+
+        Args:
+            tasks (List[dict]): 写字任务列表
+            toolpath_path (str): 可选, 运动程序保存路径 (.npy)
+            optimize (bool): 是否进行书写路径规划
+
+        Returns:
+            np.ndarray: 运动程序 (格式见src.core.toolpath)
+        """
+        if optimize:
+            strokes = self.plan_tasks(tasks)
+        else:
+            strokes = [
+                stroke
+                for task in tasks
+                for stroke in self.build_line_strokes(
+                    task.get("text"),
+                    task.get("a4_x_mm"),
+                    task.get("a4_y_mm"),
+                    task.get("char_height_mm"),
+                    task.get("char_spacing_ratio")
+                )
+            ]
+        program = compile_toolpath(strokes, self.z_up, self.z_down, self.speed_move, self.speed_write)
+
+        if toolpath_path:
+            save_toolpath(program, toolpath_path)
+            writing_logger.info(f"运动程序已保存至: {toolpath_path}, 共 {len(program)} 条指令")
+        return program
+
+    def load_or_compile_tasks(self, tasks: list, cache_dir: str, optimize: bool = True) -> np.ndarray:
+        """
+        从缓存目录读取写字任务对应的运动程序, 若不存在则编译并写入缓存
+
+        Args:
+            tasks (List[dict]): 写字任务列表
+            cache_dir (str): 运动程序缓存目录
+            optimize (bool): 是否进行书写路径规划
+
+        Returns:
+            np.ndarray: 运动程序 (内存映射)
+        """
+        font_mtime = os.path.getmtime(self.chinese_font_path) if os.path.exists(self.chinese_font_path) else 0
+        key = toolpath_key(
+            tasks,
+            z_up=self.z_up, z_down=self.z_down,
+            speed_move=self.speed_move, speed_write=self.speed_write,
+            origin_x=self.origin_x, origin_y=self.origin_y,
+            font=[os.path.abspath(self.chinese_font_path), font_mtime],
+            simplify_tolerance=self.simplifier.tolerance_mm,
+            hershey=[self.glyph_cache.font_name, self.glyph_cache.unit_height],
+            optimize=optimize
+        )
+        toolpath_path = os.path.join(cache_dir, f"{key}.npy")
+        if os.path.exists(toolpath_path):
+            writing_logger.info(f"命中运动程序缓存: {toolpath_path}")
+            return load_toolpath(toolpath_path)
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.compile_tasks(tasks, toolpath_path, optimize)
+        return load_toolpath(toolpath_path)
+
+    def replay_toolpath(self, toolpath) -> None:
+        """
+        回放运动程序
+
+        Args:
+            toolpath (str | np.ndarray): 运动程序文件路径, 或已加载的运动程序
+        """
+        program = load_toolpath(toolpath) if isinstance(toolpath, str) else toolpath
+        writing_logger.info(f"开始回放运动程序, 共 {len(program)} 条指令")
+
+        last_x = last_y = None
+        last_pen = None
+        for x, y, z, speed, pen in program.tolist():
+            if self.streaming:
+                # 笔画结束 (落笔 -> 抬笔) 时等待队列清空, 保证笔画终点精度
+                if last_pen == PEN_DOWN and pen != PEN_DOWN:
+                    self.streamer.finish()
+                self.streamer.send(x, y, z, speed)
+            elif pen != PEN_DOWN and (x, y) == (last_x, last_y):
+                # 原地抬笔, 无需等待到位
+                self.ua.set_coord("z", z, speed)
+            else:
+                self.__goto_sync(x, y, z, speed)
+            last_x, last_y, last_pen = x, y, pen
+        if self.streaming:
+            self.streamer.finish()
 
     def load_writing_tasks(self, json_path) -> list:
         """
@@ -298,6 +434,31 @@ class RobotWritingClient:
             writing_logger.error(f"❌ JSON 解码失败: {e}")
             return []
 
+    def __draw_stroke(self, stroke: list, lift: bool = True) -> None:
+        """书写一个笔画: 抬笔移动到起点, 落笔后逐点书写
+
+        流式模式下, 笔画内的各点连续下发, 只在笔画结束时等待机械臂到位
+
+        Args:
+            stroke (List[Tuple[float, float]]): 笔画 (机械臂坐标)
+            lift (bool): 笔画结束后是否原地抬笔
+        """
+        if self.streaming:
+            x0, y0 = stroke[0]
+            self.streamer.send(x0, y0, self.z_up, self.speed_move)
+            for px, py in stroke:
+                self.streamer.send(px, py, self.z_down, self.speed_write)
+            self.streamer.finish()
+        else:
+            # 将笔移动到起笔点 (空中)
+            self.__move_sync(*stroke[0])
+            # 笔下落开始绘制, 并继续绘制这一笔的后续点
+            for px, py in stroke:
+                self.__write_sync(px, py)
+
+        if lift:
+            self.ua.set_coord("z", self.z_up, self.speed_move)
+
     def __move_sync(self, target_coords_x: float, target_coords_y: float, timeout: float = 5.0):
         """同步控制机械臂移动 (非写字状态)，带超时控制
         
@@ -306,19 +467,7 @@ class RobotWritingClient:
             target_coords_y (float): 目标坐标Y (机械臂坐标)
             timeout (float): 超时时间, 默认5秒
         """
-        self.ua.set_coords([target_coords_x, target_coords_y, self.z_up], self.speed_move)
-        
-        start_time = time.time()
-        while True:
-            # 检查是否超时
-            if time.time() - start_time > timeout:
-                writing_logger.error("机械臂运动存在误差, 请检查...")
-                break
-            
-            coords = self.ua.get_coords_info()
-            if abs(coords[0] - target_coords_x) <= 0.1 and abs(coords[1] - target_coords_y) <= 0.1:
-                break
-            time.sleep(0.02)
+        self.__goto_sync(target_coords_x, target_coords_y, self.z_up, self.speed_move, timeout)
 
     def __write_sync(self, target_coords_x: float, target_coords_y: float, timeout: float = 5.0):
         """同步控制机械臂移动 (写字状态)，带超时控制
@@ -328,7 +477,19 @@ class RobotWritingClient:
             target_coords_y (float): 目标坐标Y (机械臂坐标)
             timeout (float): 超时时间, 默认5秒
         """
-        self.ua.set_coords([target_coords_x, target_coords_y, self.z_down], self.speed_write)
+        self.__goto_sync(target_coords_x, target_coords_y, self.z_down, self.speed_write, timeout)
+
+    def __goto_sync(self, target_coords_x: float, target_coords_y: float, target_coords_z: float, speed: int, timeout: float = 5.0):
+        """同步控制机械臂移动到指定坐标，带超时控制
+        
+        Args:
+            target_coords_x (float): 目标坐标X (机械臂坐标)
+            target_coords_y (float): 目标坐标Y (机械臂坐标)
+            target_coords_z (float): 目标坐标Z (机械臂坐标)
+            speed (int): 运动速度
+            timeout (float): 超时时间, 默认5秒
+        """
+        self.ua.set_coords([target_coords_x, target_coords_y, target_coords_z], speed)
         
         start_time = time.time()
         while True:
@@ -342,44 +503,108 @@ class RobotWritingClient:
                 break
             time.sleep(0.02)
 
-    def __merge_segments_to_paths(self, segments):
-        """将一堆线段首尾拼接成连续的路径, 是write_ascii_char函数的子函数
-
-        Examples:
-            Input:
-                segments = [
-                    ((1, 1), (2, 2)),
-                    ((2, 2), (3, 3)),
-                    ((4, 4), (5, 5)),
-                ]
-            Output:
-                [
-                    [(1, 1), (2, 2), (3, 3)],
-                    [(4, 4), (5, 5)]
-                ]
-        """
-        segs = [((x1, y1), (x2, y2)) for ((x1, y1), (x2, y2)) in segments]
-        paths = []
-        # 不断从segs中取出线段并合并成路径
-        while segs:
-            (start, end) = segs.pop(0)
-            path = [start, end]
-            # 1. 向后拓展路径
-            extended = True
-            while extended:
-                extended = False
-                for idx, ((x1, y1), (x2, y2)) in enumerate(segs):
-                    if (x1, y1) == path[-1]: path.append((x2, y2)); segs.pop(idx); extended = True; break
-                    elif (x2, y2) == path[-1]: path.append((x1, y1)); segs.pop(idx); extended = True; break
-            # 2. 向前拓展路径
-            extended = True
-            while extended:
-                extended = False
-                for idx, ((x1, y1), (x2, y2)) in enumerate(segs):
-                    if (x2, y2) == path[0]: path.insert(0, (x1, y1)); segs.pop(idx); extended = True; break
-                    elif (x1, y1) == path[0]: path.insert(0, (x2, y2)); segs.pop(idx); extended = True; break
-            paths.append(path)
-        return paths
+    def __layout_line(self, text: str, start_x: float, start_y: float, height: float, spacing_ratio: float):
+        """逐字符计算一行文本的排版位置, 是write_text_line函数的子函数
+
+        Yields:
+            Tuple(原字符, 实际书写字符, 字符类型, 字符中心X坐标, 字符中心Y坐标 (机械臂坐标)),
+            字符类型为 "chinese", "ascii" 或 "unknown", 空格和换行符不输出
+        """
+        current_a4_x_offset = 0
+
+        # 遍历字符
+        for char in text:
+            # 0. 换行符由排版处理, 行内出现时跳过
+            if char in "\r\n":
+                continue
+            # 1. 处理全角标点映射
+            is_full_width_punct = char in PUNCTUATION_MAP
+            char_to_write = PUNCTUATION_MAP.get(char, char)
+            # 2. 字符类型判断
+            is_chinese = char_to_write in self.chinese_font
+            is_space = char_to_write == ' '
+            is_ascii = char_to_write.isascii() and char_to_write.isprintable() and not is_space and not is_chinese
+            # 3. 计算字符宽度
+            width = height if (is_chinese or is_full_width_punct) else height / 2
+            # 4. 跳过空格
+            if is_space:
+                current_a4_x_offset += width * spacing_ratio
+                continue
+            # 5. 坐标转换
+            center_start_x = start_x + current_a4_x_offset + width / 2.0
+            center_start_y = start_y + height / 2.0
+            robot_x, robot_y = self.__a4_to_robot_coords(center_start_x, center_start_y)
+
+            # 6. 输出字符位置
+            char_type = "chinese" if is_chinese else "ascii" if is_ascii else "unknown"
+            yield char, char_to_write, char_type, robot_x, robot_y
+            # 7. 更新偏移量
+            offset = width * spacing_ratio
+            current_a4_x_offset += offset
+
+    def __chinese_char_strokes(self, ch: str, center_x: float, center_y: float, height: float) -> list:
+        """计算一个汉字的全部笔画 (机械臂坐标), 是write_chinese_char函数的子函数
+
+        Args:
+            ch (str): 汉字
+            center_x (float): 该汉字中心点x坐标 (mm)
+            center_y (float): 该汉字中心点y坐标 (mm)
+            height (float): 字体高度 (mm)
+
+        Returns:
+            List[List[Tuple[float, float]]]: 笔画列表
+        """
+        # 1. 检查并获取字符数据
+        if ch not in self.chinese_font:
+            return []
+        strokes = self.simplifier.get_strokes(ch, height)
+
+        # 2. 确定缩放比例
+        char_spacing_base = 70.0
+        x_ratio = 1.0
+        y_ratio = 0.8
+        scale_x = height / char_spacing_base * x_ratio
+        scale_y = height / char_spacing_base * y_ratio
+
+        # 3. 逐笔画转换为机械臂坐标 (字体的y对应机械臂x方向)
+        result = []
+        for pts in strokes:
+            px = center_x - pts[:, 1] / 10.0 * scale_x
+            py = center_y + (pts[:, 0] / 10.0 - char_spacing_base) * scale_y
+            result.append(list(zip(px.tolist(), py.tolist())))
+        return result
+
+    def __ascii_char_strokes(self, ch: str, center_x: float, center_y: float, height: float) -> list:
+        """计算一个ASCII字符的全部路径 (机械臂坐标), 是write_ascii_char函数的子函数
+
+        Args:
+            ch (str): ASCII字符
+            center_x (float): 该字符中心点x坐标 (mm)
+            center_y (float): 该字符中心点y坐标 (mm)
+            height (float): 字体高度 (mm)
+
+        Returns:
+            List[List[Tuple[float, float]]]: 路径列表
+        """
+        # 1. 获取缓存的字符路径 (已归一化并合并为连续路径)
+        ascii_unit_height = self.glyph_cache.unit_height
+        ascii_scale = height / ascii_unit_height
+        paths, center_offset_x_raw = self.glyph_cache.get(ch)
+        if not paths: return []
+        # 2. 调整offset
+        ascii_offset_x = height * ASCII_OFFSET_X_FACTOR
+        ascii_offset_y = height * ASCII_OFFSET_Y_FACTOR
+        # 3. 逐点转换为机械臂坐标
+        result = []
+        for path in paths:
+            points = []
+            for (x_h, y_h) in path:
+                x_adj_raw = x_h - center_offset_x_raw
+                x_pen_offset = (y_h * ascii_scale) - (height / 2.0)
+                y_pen_offset = x_adj_raw * ascii_scale
+                points.append((center_x + x_pen_offset + ascii_offset_x, center_y + y_pen_offset + ascii_offset_y))
+            result.append(points)
+        return result
 
     def __a4_to_robot_coords(self, a4_x_mm: float, a4_y_mm: float):
         """
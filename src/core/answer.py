@@ -4,11 +4,238 @@ answer.py
 AI答案生成模块
 
 答案生成流程:
-1. 将OCR识别的试卷文本按单元分割
-2. 使用Deepseek模型自动生成答案
-3. 支持多种题型
-4. 输出结构化的答案列表
+1. 将OCR识别的试卷文本按题目分割 (解析QwenClient.text_split的单元格式, 或按题目编号切分)
+2. 判断每道题的题型: 先用本地关键词/正则规则打分, 无法确定时再请模型分类
+3. 按题型选择提示词模板, 使用Deepseek模型生成答案 (互相独立的题目并发作答)
+4. 输出按题目顺序排列的答案列表
+
+新增题型时调用register_template注册模板即可, 不需要修改DeepSeekClient。
 
 Author: Zhu Jiahao
 Date: 2025-07-16
-"""
\ No newline at end of file
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+__all__ = ['PROMPT_TEMPLATES', 'DEFAULT_QUESTION_TYPE', 'register_template', 'build_prompt',
+           'classify_question_local', 'classification_prompt', 'parse_classification', 'split_questions',
+           'parse_split_units', 'unit_questions']
+
+# 题型 -> 提示词模板
+#   system: 系统消息
+#   instruction: 放在题目之前的作答要求
+#   keywords: 题目中出现时给该题型加分的关键词 (不区分大小写)
+#   patterns: 题目匹配时给该题型加分的正则表达式
+PROMPT_TEMPLATES: Dict[str, dict] = {
+    "reasoning": {
+        "system": "你是一位经验丰富的侦探，请严格按照用户要求的内容，分析题目并给出答案",
+        "instruction": "你是一位经验丰富的侦探，请根据以下题目文本推理并得出合理结论。"
+                       "要求：简要说明推理过程并给出结论，总字数控制在50字以内，不得包含无关内容，答案不需要标注字数。",
+        "keywords": ["推理", "推断", "侦探", "凶手", "嫌疑", "线索", "说谎", "真话", "谁是"],
+        "patterns": [],
+    },
+    "translation": {
+        "system": "你是一位经验丰富的文言文翻译大师，请严格按照用户要求的内容，进行翻译并给出答案",
+        "instruction": "你是一位经验丰富的文言文翻译大师，请将下面这段文言文翻译成白话文。"
+                       "要求：总字数控制在100字以内，不得包含无关内容，答案不需要标注字数。",
+        "keywords": ["翻译", "文言文", "现代汉语", "白话文", "画线句子", "之乎", "曰"],
+        "patterns": [r"[之乎者也矣焉哉][，。！？]"],
+    },
+    "english": {
+        "system": "你是一位高考考生，请严格按照用户要求的内容，分析题目并给出答案",
+        "instruction": "你是一位高考考生，请根据以下题目，撰写一篇英语作文"
+                       "要求：总字数控制在100词以内，不得包含无关内容，答案不需要标注字数。",
+        "keywords": ["英语", "作文", "书面表达", "essay", "write", "words", "letter", "dear"],
+        "patterns": [r"[A-Za-z]+(?:\s+[A-Za-z]+){5,}"],
+    },
+    "math": {
+        "system": "你是一位高考考生，请严格按照用户要求的内容，分析题目并给出答案",
+        "instruction": "你是一位高考考生，请根据以下题目，回答数学算数题"
+                       "要求：只需要答案， 多个答案使用逗号分隔，不得包含无关内容。",
+        "keywords": ["计算", "数学", "求值", "方程", "算式", "等于"],
+        "patterns": [r"\d+\s*[+\-×÷*/]\s*\d+", r"=\s*[?？_（(]"],
+    },
+}
+
+# 本地规则无法判断, 且模型分类失败时使用的题型
+DEFAULT_QUESTION_TYPE = "reasoning"
+
+# 本地规则的判定阈值: 最高分不低于MIN_SCORE, 且比第二名高出MIN_MARGIN
+MIN_SCORE = 2
+MIN_MARGIN = 1
+
+# 题目开头的编号: 【第N题】, "1." "1、" "(1)" "一、" 等; "."之后紧跟数字时是行首的小数 (如 "3.14"), 不是编号
+_QUESTION_MARKER = re.compile(r"^\s*(?:【第\s*\d+\s*题】|\d{1,2}\s*[.．](?!\d)|\d{1,2}\s*、|[（(]\s*\d{1,2}\s*[)）]|[一二三四五六七八九十]+\s*、)",
+                              re.MULTILINE)
+
+
+def register_template(question_type: str, system: str, instruction: str,
+                      keywords: Optional[List[str]] = None, patterns: Optional[List[str]] = None) -> None:
+    """ 注册 (或覆盖) 一个题型的提示词模板
+
+    Args:
+        question_type (str): 题型名称
+        system (str): 系统消息
+        instruction (str): 放在题目之前的作答要求
+        keywords (List[str]): 本地分类使用的关键词
+        patterns (List[str]): 本地分类使用的正则表达式
+    """
+    PROMPT_TEMPLATES[question_type] = {
+        "system": system,
+        "instruction": instruction,
+        "keywords": list(keywords or []),
+        "patterns": list(patterns or []),
+    }
+
+
+def build_prompt(question_type: str, question: str) -> Tuple[str, str]:
+    """ 按题型生成提示词
+
+    Args:
+        question_type (str): 题型名称, 未注册时使用DEFAULT_QUESTION_TYPE
+        question (str): 题目文本
+
+    Returns:
+        Tuple: (系统消息, 用户消息)
+    """
+    template = PROMPT_TEMPLATES.get(question_type) or PROMPT_TEMPLATES[DEFAULT_QUESTION_TYPE]
+    prompt = (
+        f"{template['instruction']}\n\n"
+        f"{question}\n\n"
+        "请开始作答："
+    )
+    return template["system"], prompt
+
+
+def classify_question_local(question: str) -> Tuple[Optional[str], Dict[str, int]]:
+    """ 用关键词和正则规则判断题型, 每命中一个关键词或正则加1分
+
+    Args:
+        question (str): 题目文本
+
+    Returns:
+        Tuple: (题型, 各题型得分), 得分不足或不能拉开差距时题型为None
+    """
+    lowered = question.lower()
+    scores = {}
+    for name, template in PROMPT_TEMPLATES.items():
+        score = sum(1 for keyword in template["keywords"] if keyword.lower() in lowered)
+        score += sum(1 for pattern in template["patterns"] if re.search(pattern, question))
+        scores[name] = score
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    best, best_score = ranked[0]
+    runner_up = ranked[1][1] if len(ranked) > 1 else 0
+    if best_score >= MIN_SCORE and best_score - runner_up >= MIN_MARGIN:
+        return best, scores
+    return None, scores
+
+
+def classification_prompt(question: str) -> Tuple[str, str]:
+    """ 请模型判断题型的提示词
+
+    Returns:
+        Tuple: (系统消息, 用户消息)
+    """
+    labels = ", ".join(PROMPT_TEMPLATES)
+    system = "你是一个试题分类助手，只输出题型标签，不要输出其他内容。"
+    prompt = f"请判断下面这道题属于哪一种题型，只能从以下标签中选择一个输出：{labels}\n\n{question}"
+    return system, prompt
+
+
+def parse_classification(reply: str) -> Optional[str]:
+    """ 从模型的分类回复中取出题型标签
+
+    Returns:
+        str: 题型, 回复中没有已注册的题型时返回None
+    """
+    lowered = reply.strip().lower()
+    for name in PROMPT_TEMPLATES:
+        if name in lowered:
+            return name
+    return None
+
+
+def split_questions(text: str) -> List[str]:
+    """ 按题目编号把整页文本切分成若干道题, 第一个编号之前的内容 (标题, 说明等) 并入第一题
+
+    Args:
+        text (str): OCR文本
+
+    Returns:
+        List[str]: 题目文本, 没有编号时整页作为一道题
+    """
+    starts = [m.start() for m in _QUESTION_MARKER.finditer(text)]
+    if len(starts) < 2:
+        return [text.strip()] if text.strip() else []
+    starts[0] = 0
+    bounds = starts + [len(text)]
+    return [text[bounds[i]:bounds[i + 1]].strip() for i in range(len(starts)) if text[bounds[i]:bounds[i + 1]].strip()]
+
+
+# QwenClient.text_split的输出格式: "==== UnitN ====" 开始一个单元, "【第N题】" 开始一道题
+_UNIT_HEADER = re.compile(r"^\s*=+\s*Unit\s*(\d+)\s*=+\s*$", re.MULTILINE | re.IGNORECASE)
+_SPLIT_QUESTION = re.compile(r"【第\s*(\d+)\s*题】")
+
+
+def parse_split_units(text: str) -> List[dict]:
+    """ 解析QwenClient.text_split的输出 (本地解析, 结果确定)
+
+    Examples:
+        Input:
+            ==== Unit1 ====
+            一、文言文阅读
+            学而时习之，不亦说乎？
+            【第1题】将画线句子翻译成现代汉语。
+
+            【第2题】……
+        Output:
+            [{"unit": 1, "title": "一、文言文阅读", "material": "学而时习之，不亦说乎？",
+              "questions": [{"index": 1, "text": "将画线句子翻译成现代汉语。"}, {"index": 2, "text": "……"}]}]
+
+    Args:
+        text (str): text_split的输出
+
+    Returns:
+        List[dict]: 单元列表, 按原文顺序; 没有单元标记时, 整段文本视为一个单元
+    """
+    headers = list(_UNIT_HEADER.finditer(text))
+    if headers:
+        blocks = [(int(m.group(1)), text[m.end():headers[i + 1].start() if i + 1 < len(headers) else len(text)])
+                  for i, m in enumerate(headers)]
+    else:
+        blocks = [(1, text)]
+
+    units = []
+    for number, block in blocks:
+        markers = list(_SPLIT_QUESTION.finditer(block))
+        head = block[:markers[0].start()] if markers else block
+        lines = head.strip().splitlines()
+        title = lines[0].strip() if lines else ""
+        material = "\n".join(lines[1:]).strip()
+        questions = []
+        for i, m in enumerate(markers):
+            end = markers[i + 1].start() if i + 1 < len(markers) else len(block)
+            stem = block[m.end():end].strip()
+            if stem:
+                questions.append({"index": int(m.group(1)), "text": stem})
+        units.append({"unit": number, "title": title, "material": material, "questions": questions})
+    return units
+
+
+def unit_questions(units: List[dict]) -> List[str]:
+    """ 把单元中的每道题展开为可以独立作答的题目文本 (带上单元标题和阅读材料)
+
+    Args:
+        units (List[dict]): parse_split_units的结果
+
+    Returns:
+        List[str]: 按题目顺序排列的题目文本
+    """
+    questions = []
+    for unit in units:
+        context = "\n".join(part for part in (unit["title"], unit["material"]) if part)
+        for question in unit["questions"]:
+            questions.append(f"{context}\n\n{question['text']}" if context else question["text"])
+    return questions
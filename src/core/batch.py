@@ -0,0 +1,233 @@
+"""
+batch.py
+
+多页批量处理模块
+
+capture_multi_images一次可以拍摄多页试卷, 本模块对一个目录中的全部页面批量处理:
+1. 图像预处理和答题框检测是CPU密集的, 在进程池中按页并行
+2. 每页预处理完成后立即提交OCR和答题请求, 网络请求在线程池中并发, 并发数有上限
+3. 全部页面完成后按页码顺序排版, 每页生成一个任务文件, 并合并为一个总任务文件 (每个任务带有页码 "page")
+
+处理结束后输出吞吐量 (页/分钟)。
+
+Author: Zhu Jiahao
+Date: 2025-08-04
+"""
+
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Callable, List, Optional
+import cv2
+from src.api.image_api import OpenCVImageClient
+from src.api.llm_transport import LLMError
+from src.api.local_ocr_api import OCRError
+from src.utils.logger import __logger__
+from src.utils.timing import StageTimer
+
+__all__ = ['BatchPageProcessor', 'list_page_images']
+
+batch_logger = __logger__.get_module_logger("Batch")
+
+
+def list_page_images(image_dir: str) -> List[str]:
+    """ 列出目录中的页面图片 (.jpg/.png), 按文件名中的数字自然排序 (2.jpg排在10.jpg之前)
+
+    Args:
+        image_dir (str): 页面图片目录
+
+    Returns:
+        List[str]: 图片路径列表
+    """
+    files = [os.path.join(image_dir, f) for f in os.listdir(image_dir)
+             if os.path.splitext(f)[1].lower() in (".jpg", ".jpeg", ".png")]
+    natural = lambda path: [int(t) if t.isdigit() else t for t in re.split(r"(\d+)", os.path.basename(path))]
+    return sorted(files, key=natural)
+
+
+def _prepare_page(page: int, image_path: str, output_dir: str, font_path: str,
+                  preprocess_config: Optional[dict], raw: bool) -> dict:
+    """ 在进程池中处理一页: (可选) 预处理摄像头原始画面, 检测答题框
+
+    Returns:
+        dict: page, image, box, scale (mm_per_pixel_x, mm_per_pixel_y, px_per_mm_y), error, prepare_s
+    """
+    start = time.perf_counter()
+    client = OpenCVImageClient(None, font_path, preprocess_config)
+    result = {"page": page, "image": image_path, "box": None, "scale": None, "error": None}
+
+    if raw:
+        frame = cv2.imread(image_path)
+        if frame is None:
+            result["error"] = f"无法读取图片: {image_path}"
+            return result
+        result["image"] = os.path.join(output_dir, f"page_{page}.jpg")
+        cv2.imwrite(result["image"], client.preprocess_frame(frame))
+
+    loaded = client.load_image_and_get_scale(result["image"])
+    if loaded is None:
+        result["error"] = f"无法读取图片: {result['image']}"
+        return result
+    img, _, _, mm_per_pixel_x, mm_per_pixel_y, px_per_mm_y = loaded
+    try:
+        box = client.detect_single_black_box(img, os.path.join(output_dir, f"page_{page}_box_viz.png"))
+    except ValueError as e:
+        result["error"] = str(e)
+        return result
+
+    result["box"] = tuple(int(v) for v in box)
+    result["scale"] = (mm_per_pixel_x, mm_per_pixel_y, px_per_mm_y)
+    result["prepare_s"] = time.perf_counter() - start
+    return result
+
+
+class BatchPageProcessor:
+    """ 多页试卷批量处理
+    """
+    def __init__(self,
+                image_client: OpenCVImageClient,
+                ocr_fn: Callable[[str, str], str],
+                answer_fn: Callable[[str, str], str],
+                workers: Optional[int] = None,
+                concurrency: int = 4,
+                raw: bool = False,
+                start_method: Optional[str] = None):
+        """
+        初始化
+
+        Args:
+            image_client (OpenCVImageClient): 图像处理服务, 提供字体和预处理配置, 并负责排版
+            ocr_fn (Callable): OCR函数 (图片路径, 输出文本路径) -> 识别文本, 例如 qwen_client.ocr_image 或 ocr_router.ocr_image
+            answer_fn (Callable): 答题函数 (题目文本, 答案路径) -> 答案, 例如 deepseek_client.answer_text
+            workers (int): 预处理进程数, 默认为CPU核数
+            concurrency (int): 同时进行的OCR/答题请求数上限
+            raw (bool): 目录中是否为摄像头原始画面 (需要先预处理), False表示已经是处理后的A4页面
+            start_method (str): 进程池的启动方式 ("spawn", "fork"...), 默认使用平台默认值 (Windows上为spawn)
+        """
+        self.image_client = image_client
+        self.ocr_fn = ocr_fn
+        self.answer_fn = answer_fn
+        self.workers = workers
+        self.concurrency = max(concurrency, 1)
+        self.raw = raw
+        self.start_method = start_method
+        self.timer = StageTimer()
+
+    def run(self, image_dir: str, output_dir: str, task_path: str) -> dict:
+        """ 批量处理目录中的全部页面
+
+        Args:
+            image_dir (str): 页面图片目录
+            output_dir (str): 中间结果 (每页的OCR文本, 答案, 标注图, 预览图, 任务文件) 输出目录
+            task_path (str): 合并后的任务文件路径
+
+        Returns:
+            dict: pages, failed, total_s, pages_per_minute, page_tasks (页码 -> 该页任务文件路径)
+        """
+        files = list_page_images(image_dir)
+        batch_logger.info(f"批量处理 {len(files)} 页: {image_dir}")
+        os.makedirs(output_dir, exist_ok=True)
+        start = time.perf_counter()
+
+        pages = {}
+        context = multiprocessing.get_context(self.start_method)
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as processes, \
+                ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch-llm") as threads:
+            prepared = [processes.submit(_prepare_page, i + 1, path, output_dir, self.image_client.font_path,
+                                         self.__preprocess_config(), self.raw)
+                        for i, path in enumerate(files)]
+            answered = []
+            for future in as_completed(prepared):
+                page = future.result()
+                pages[page["page"]] = page
+                if page["error"]:
+                    batch_logger.error(f"第{page['page']}页处理失败: {page['error']}")
+                    continue
+                self.timer.record("prepare", page["prepare_s"])
+                answered.append(threads.submit(self.__ocr_and_answer, page, output_dir))
+            for future in as_completed(answered):
+                future.result()
+
+        page_tasks = {}
+        merged = []
+        with self.timer.stage("layout"):
+            for number in sorted(pages):
+                page = pages[number]
+                if page["error"]:
+                    continue
+                tasks = self.__layout_page(page, output_dir)
+                if tasks is None:
+                    continue
+                page_tasks[number] = page["task_path"]
+                merged.extend(dict(task, page=number) for task in tasks)
+
+        with open(task_path, "w", encoding="utf-8") as f:
+            json.dump(merged, f, ensure_ascii=False, indent=2)
+
+        total_s = time.perf_counter() - start
+        done = len(page_tasks)
+        stats = {
+            "pages": done,
+            "failed": len(files) - done,
+            "total_s": total_s,
+            "pages_per_minute": done / total_s * 60 if total_s > 0 else 0.0,
+            "page_tasks": page_tasks,
+        }
+        batch_logger.info(f"批量处理完成: {done}/{len(files)} 页, 耗时 {total_s:.1f}s, "
+                          f"吞吐量 {stats['pages_per_minute']:.2f} 页/分钟, 任务文件: {task_path}")
+        return stats
+
+    def __ocr_and_answer(self, page: dict, output_dir: str) -> None:
+        """ 在线程池中对一页进行OCR和答题
+        """
+        number = page["page"]
+        page["ocr_path"] = os.path.join(output_dir, f"page_{number}_ocr.txt")
+        page["answer_path"] = os.path.join(output_dir, f"page_{number}_answer.txt")
+
+        start = time.perf_counter()
+        try:
+            text = self.ocr_fn(page["image"], page["ocr_path"])
+            ocr_done = time.perf_counter()
+            page["answer"] = self.answer_fn(text, page["answer_path"])
+        except (LLMError, OCRError) as e:
+            batch_logger.error(f"第{number}页OCR或答题失败: {e}")
+            return
+        self.timer.record("ocr", ocr_done - start)
+        self.timer.record("answer", time.perf_counter() - ocr_done)
+        batch_logger.info(f"第{number}页OCR与答题完成")
+
+    def __layout_page(self, page: dict, output_dir: str) -> Optional[list]:
+        """ 排版一页的答案, 生成该页的预览图和任务文件
+
+        Returns:
+            list: 该页的任务列表, 没有答案或排版失败时返回None
+        """
+        number = page["page"]
+        answer = page.get("answer")
+        if not answer:
+            batch_logger.error(f"第{number}页没有答案, 跳过排版")
+            return None
+
+        img = cv2.imread(page["image"])
+        page["task_path"] = os.path.join(output_dir, f"page_{number}_task.json")
+        self.image_client.generate_writing_task(img, page["box"], answer, *page["scale"],
+                                                os.path.join(output_dir, f"page_{number}_preview.png"),
+                                                page["task_path"])
+        if not os.path.exists(page["task_path"]):
+            return None
+        with open(page["task_path"], "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def __preprocess_config(self) -> dict:
+        """ 传给子进程的预处理配置
+        """
+        client = self.image_client
+        return {
+            "crop_first": client.crop_first,
+            "target_width": client.target_width,
+            "top_crop_mm": client.top_crop_mm,
+            "bottom_crop_mm": client.bottom_crop_mm,
+        }
@@ -0,0 +1,265 @@
+"""
+boxes.py
+
+答题框的合并与排序
+
+1. 重叠合并: 按x1排序后扫描, 每个框只与x方向上可能相交的框 (二分查找得到的连续区间) 批量计算IoU,
+   IoU超过阈值的框用并查集归为一组, 每组合并为外接矩形。复杂度约为 O(n log n + 相交对数)
+2. 阅读顺序: 先按行 (垂直方向有重叠的框视为同一行) 从上到下, 行内从左到右
+3. 合并式NMS: greedy_merge_nms为OpenCVImageClient原有的逐对计算实现;
+   batched_merge_nms保持逐对实现的语义 (不断扩大的合并框依次与剩余框比较), 用numpy向量化计算IoU,
+   结果与逐对实现完全一致, 适用于上千个框的情况
+
+框的格式与检测结果一致: (x, y, w, h, area)
+
+Author: Zhu Jiahao
+Date: 2025-08-01
+"""
+
+import numpy as np
+from typing import Iterator, List, Tuple
+
+__all__ = ['batched_merge_nms', 'greedy_merge_nms', 'merge_overlapping_boxes', 'reading_order']
+
+Box = Tuple[int, int, int, int, float]
+
+
+def _find(parent: List[int], i: int) -> int:
+    """ 并查集查找 (路径减半)
+    """
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def _union_groups(n: int, pairs: Iterator[Tuple[np.ndarray, np.ndarray]]) -> List[List[int]]:
+    """ 用并查集将相连的下标分组
+
+    Args:
+        n (int): 元素个数
+        pairs (Iterator): 每次给出两个等长的下标数组, 对应位置的两个元素相连
+
+    Returns:
+        List[List[int]]: 各组的下标 (组内升序, 各组按最小下标排序)
+    """
+    parent = list(range(n))
+    for left, right in pairs:
+        for i, j in zip(left.tolist(), right.tolist()):
+            a, b = _find(parent, i), _find(parent, j)
+            if a != b:
+                parent[max(a, b)] = min(a, b)
+
+    groups = {}
+    for i in range(n):
+        groups.setdefault(_find(parent, i), []).append(i)
+    return list(groups.values())
+
+
+def greedy_merge_nms(boxes: List[Box], iou_threshold: float = 0.6) -> List[Box]:
+    """ 合并式NMS的逐对实现 (原OpenCVImageClient.__non_max_suppression)
+
+    按y1从大到小依次取出一个框, 与剩余的框逐个计算IoU, 超过阈值的合并进来 (外接矩形随之扩大)。
+
+    Args:
+        boxes (List[Box]): 框列表 (x, y, w, h, ...)
+        iou_threshold (float): IoU阈值
+
+    Returns:
+        List[Box]: 合并后的框 (x, y, w, h, area), area为组内各框外接矩形面积之和
+    """
+    if not boxes:
+        return []
+
+    # 将 (x, y, w, h) 转换为 (x1, y1, x2, y2)
+    rects = np.array([[b[0], b[1], b[0] + b[2], b[1] + b[3]] for b in boxes])
+    
+    # 计算面积
+    areas = (rects[:, 2] - rects[:, 0]) * (rects[:, 3] - rects[:, 1])
+    # 按y1坐标排序
+    indices = np.argsort(rects[:, 1])
+
+    merged_boxes = []
+    while len(indices) > 0:
+        last = len(indices) - 1
+        i = indices[last]
+        
+        # 将当前框加入到合并列表中
+        current_rect = rects[i]
+        current_area = areas[i]  # 保留当前面积
+        indices = np.delete(indices, last)
+
+        # 寻找与当前框高度重叠的其他框
+        suppress = [last]
+        for pos in range(len(indices)):
+            j = indices[pos]
+            
+            # 计算 IoU
+            xx1 = np.maximum(current_rect[0], rects[j][0])
+            yy1 = np.maximum(current_rect[1], rects[j][1])
+            xx2 = np.minimum(current_rect[2], rects[j][2])
+            yy2 = np.minimum(current_rect[3], rects[j][3])
+
+            w = np.maximum(0, xx2 - xx1)
+            h = np.maximum(0, yy2 - yy1)
+            
+            intersection = w * h
+            union = areas[i] + areas[j] - intersection
+            iou = intersection / union if union > 0 else 0
+            
+            # 如果 IoU 超过阈值，则合并这两个框
+            if iou > iou_threshold:
+                # 合并框：取两个框的最大外接矩形
+                current_rect[0] = min(current_rect[0], rects[j][0])
+                current_rect[1] = min(current_rect[1], rects[j][1])
+                current_rect[2] = max(current_rect[2], rects[j][2])
+                current_rect[3] = max(current_rect[3], rects[j][3])
+                current_area += areas[j]  # 累加合并的面积
+                
+                # 标记此框，以便后续删除
+                suppress.append(pos)
+        
+        # 从索引中删除已被合并的框
+        indices = np.delete(indices, [s for s in suppress if s != last])
+        
+        # 将合并后的大框 (x1, y1, x2, y2) 转换回 (x, y, w, h)
+        merged_w = current_rect[2] - current_rect[0]
+        merged_h = current_rect[3] - current_rect[1]
+        merged_boxes.append((int(current_rect[0]), int(current_rect[1]), int(merged_w), int(merged_h), int(current_area)))
+
+    return merged_boxes
+
+
+def batched_merge_nms(boxes: List[Box], iou_threshold: float = 0.6) -> List[Box]:
+    """ 合并式NMS的向量化实现, 结果与greedy_merge_nms完全一致
+
+    逐对实现按顺序扫描剩余的框, 合并框随着合并不断扩大, 后面的框与扩大后的框比较。
+    两次合并之间合并框不变, 因此每次用numpy一次计算合并框与其后全部剩余框的IoU,
+    取第一个超过阈值的框合并, 再从它之后继续, 直到没有框可以合并。
+    Python层的循环次数为 框数 + 合并次数, 而不是框数的平方。
+
+    Args:
+        boxes (List[Box]): 框列表 (x, y, w, h, ...)
+        iou_threshold (float): IoU阈值
+
+    Returns:
+        List[Box]: 合并后的框 (x, y, w, h, area), area为组内各框外接矩形面积之和
+    """
+    if not boxes:
+        return []
+
+    rects = np.array([[b[0], b[1], b[0] + b[2], b[1] + b[3]] for b in boxes])
+    areas = (rects[:, 2] - rects[:, 0]) * (rects[:, 3] - rects[:, 1])
+    indices = np.argsort(rects[:, 1])
+
+    merged_boxes = []
+    while len(indices) > 0:
+        i = indices[-1]
+        indices = indices[:-1]
+        current_rect = rects[i].copy()
+        current_area = areas[i]
+
+        candidates, candidate_areas = rects[indices], areas[indices]
+        taken = np.zeros(len(indices), dtype=bool)
+        pos = 0
+        while pos < len(indices):
+            tail = candidates[pos:]
+            w = np.maximum(0, np.minimum(current_rect[2], tail[:, 2]) - np.maximum(current_rect[0], tail[:, 0]))
+            h = np.maximum(0, np.minimum(current_rect[3], tail[:, 3]) - np.maximum(current_rect[1], tail[:, 1]))
+            intersection = w * h
+            # 与逐对实现相同, 并集使用起点框的原始面积
+            union = areas[i] + candidate_areas[pos:] - intersection
+            with np.errstate(divide="ignore", invalid="ignore"):
+                iou = np.where(union > 0, intersection / union, 0)
+            hits = np.flatnonzero(iou > iou_threshold)
+            if len(hits) == 0:
+                break
+
+            j = pos + int(hits[0])
+            current_rect[:2] = np.minimum(current_rect[:2], candidates[j, :2])
+            current_rect[2:] = np.maximum(current_rect[2:], candidates[j, 2:])
+            current_area += candidate_areas[j]
+            taken[j] = True
+            pos = j + 1
+
+        indices = indices[~taken]
+        merged_w = current_rect[2] - current_rect[0]
+        merged_h = current_rect[3] - current_rect[1]
+        merged_boxes.append((int(current_rect[0]), int(current_rect[1]), int(merged_w), int(merged_h), int(current_area)))
+
+    return merged_boxes
+
+
+def merge_overlapping_boxes(boxes: List[Box], iou_threshold: float = 0.6) -> List[Box]:
+    """ 合并高度重叠的框
+
+    与传统NMS不同, 重叠的框不删除, 而是合并为外接矩形, 以应对同一个框被分割检测的情况。
+    重叠关系是传递的: A与B重叠, B与C重叠时, A, B, C合并为一个框。
+
+    Args:
+        boxes (List[Box]): 框列表 (x, y, w, h, area)
+        iou_threshold (float): IoU阈值, 超过此值的框将被合并
+
+    Returns:
+        List[Box]: 合并后的框, area为组内各框area之和, 顺序与每组第一个框在输入中的顺序一致
+    """
+    if not boxes:
+        return []
+
+    data = np.array([b[:4] for b in boxes], dtype=np.float64)
+    x1, y1 = data[:, 0], data[:, 1]
+    x2, y2 = x1 + data[:, 2], y1 + data[:, 3]
+    rect_areas = data[:, 2] * data[:, 3]
+
+    order = np.argsort(x1, kind="stable")
+    sx1, sy1, sx2, sy2, sa = x1[order], y1[order], x2[order], y2[order], rect_areas[order]
+    # 第i个框之后, x1小于其x2的框才可能与它相交
+    ends = np.searchsorted(sx1, sx2, side="left")
+
+    def overlaps():
+        for i in range(len(boxes)):
+            lo, hi = i + 1, ends[i]
+            if hi <= lo:
+                continue
+            iw = np.clip(np.minimum(sx2[i], sx2[lo:hi]) - np.maximum(sx1[i], sx1[lo:hi]), 0, None)
+            ih = np.clip(np.minimum(sy2[i], sy2[lo:hi]) - np.maximum(sy1[i], sy1[lo:hi]), 0, None)
+            inter = iw * ih
+            union = sa[i] + sa[lo:hi] - inter
+            iou = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+            hits = np.nonzero(iou > iou_threshold)[0]
+            yield np.full(len(hits), order[i]), order[lo + hits]
+
+    merged = []
+    for members in _union_groups(len(boxes), overlaps()):
+        idx = np.array(members)
+        gx1, gy1 = int(x1[idx].min()), int(y1[idx].min())
+        gx2, gy2 = int(x2[idx].max()), int(y2[idx].max())
+        area = sum(boxes[i][4] for i in members)
+        merged.append((gx1, gy1, gx2 - gx1, gy2 - gy1, area))
+    return merged
+
+
+def reading_order(boxes: List[Box]) -> List[Box]:
+    """ 按阅读顺序排列框: 从上到下分行, 行内从左到右
+
+    框按顶边排序后依次扫描, 顶边位于当前行垂直范围中线以上的框归入当前行, 否则另起一行。
+
+    Args:
+        boxes (List[Box]): 框列表 (x, y, w, h, area)
+
+    Returns:
+        List[Box]: 排序后的框
+    """
+    rows, row, row_top, row_bottom = [], [], 0, 0
+    for box in sorted(boxes, key=lambda b: (b[1], b[0])):
+        x, y, w, h = box[:4]
+        if row and y < (row_top + row_bottom) / 2:
+            row.append(box)
+            row_bottom = max(row_bottom, y + h)
+        else:
+            if row:
+                rows.append(row)
+            row, row_top, row_bottom = [box], y, y + h
+    if row:
+        rows.append(row)
+    return [box for r in rows for box in sorted(r, key=lambda b: b[0])]
@@ -0,0 +1,234 @@
+"""
+font_store.py
+
+紧凑的中文笔画字体存储模块
+
+原始字体是一个完整的pickle文件 (字符 -> 笔画列表 -> {"x": .., "y": ..}), 启动时需要全部
+反序列化并常驻内存, 而且反序列化pickle并不安全。本模块定义了一种带索引的二进制字体格式,
+通过内存映射打开, 只解码任务中实际用到的字形。
+
+文件格式 (小端):
+    文件头      magic(8B) | 字形数 u4 | 笔画数 u4 | 点数 u4 | 坐标缩放 f4
+    字形索引    [码位 u4, 首笔画下标 u4, 笔画数 u4] * 字形数 (按码位升序)
+    笔画表      [首点下标 u4, 点数 u4] * 笔画数
+    点数据      [x i2, y i2] * 点数, 原始坐标 = 存储值 / 坐标缩放
+
+Author: Zhu Jiahao
+Date: 2025-07-28
+"""
+
+import os
+import pickle
+import struct
+import numpy as np
+from typing import Iterator, List, Tuple
+from src.utils.logger import __logger__
+
+__all__ = ['ChineseFontStore', 'convert_pickle_font', 'open_chinese_font']
+
+font_logger = __logger__.get_module_logger("Font")
+
+FONT_MAGIC = b"P340FNT1"
+HEADER = struct.Struct("<8sIIIf")
+INDEX_DTYPE = np.dtype([("codepoint", "<u4"), ("stroke_start", "<u4"), ("stroke_count", "<u4")])
+STROKE_DTYPE = np.dtype([("point_start", "<u4"), ("point_count", "<u4")])
+POINT_DTYPE = np.dtype("<i2")
+
+
+class ChineseFontStore:
+    """ 基于内存映射的中文笔画字体
+
+    提供与原pickle字典一致的查询方式 (ch in font, font[ch]),
+    font[ch]返回笔画列表, 每个笔画为 (n, 2) 的 [x, y] 数组 (原始字体坐标)。
+    """
+    def __init__(self, path: str):
+        """
+        初始化
+
+        Args:
+            path (str): 字体文件路径
+
+        Raises:
+            ValueError: 文件不是有效的字体文件
+        """
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"不是有效的字体文件: {path}")
+        magic, glyph_count, stroke_count, point_count, scale = HEADER.unpack(header)
+        if magic != FONT_MAGIC:
+            raise ValueError(f"不是有效的字体文件: {path}")
+
+        self.path = path
+        self.scale = scale
+        offset = HEADER.size
+        self._index = np.memmap(path, dtype=INDEX_DTYPE, mode="r", offset=offset, shape=(glyph_count,))
+        offset += INDEX_DTYPE.itemsize * glyph_count
+        self._strokes = np.memmap(path, dtype=STROKE_DTYPE, mode="r", offset=offset, shape=(stroke_count,))
+        offset += STROKE_DTYPE.itemsize * stroke_count
+        self._points = np.memmap(path, dtype=POINT_DTYPE, mode="r", offset=offset, shape=(point_count, 2))
+        self._codepoints = self._index["codepoint"]
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, ch) -> bool:
+        return self.__find(ch) >= 0
+
+    def __getitem__(self, ch: str) -> List[np.ndarray]:
+        i = self.__find(ch)
+        if i < 0:
+            raise KeyError(ch)
+        return self.__decode(i)
+
+    def __iter__(self) -> Iterator[str]:
+        for cp in self._codepoints:
+            yield chr(int(cp))
+
+    def keys(self) -> Iterator[str]:
+        return iter(self)
+
+    def items(self) -> Iterator[Tuple[str, List[np.ndarray]]]:
+        for i, cp in enumerate(self._codepoints):
+            yield chr(int(cp)), self.__decode(i)
+
+    def get(self, ch: str, default=None):
+        i = self.__find(ch)
+        return self.__decode(i) if i >= 0 else default
+
+    def __find(self, ch) -> int:
+        """ 二分查找字符在索引中的位置, 不存在时返回-1
+        """
+        if not isinstance(ch, str) or len(ch) != 1:
+            return -1
+        cp = ord(ch)
+        i = int(np.searchsorted(self._codepoints, cp))
+        if i < len(self._codepoints) and self._codepoints[i] == cp:
+            return i
+        return -1
+
+    def __decode(self, i: int) -> List[np.ndarray]:
+        """ 解码第i个字形的全部笔画
+        """
+        entry = self._index[i]
+        start, count = int(entry["stroke_start"]), int(entry["stroke_count"])
+        strokes = []
+        for point_start, point_count in self._strokes[start:start + count].tolist():
+            pts = self._points[point_start:point_start + point_count].astype(np.float64)
+            strokes.append(pts / self.scale if self.scale != 1 else pts)
+        return strokes
+
+
+def convert_pickle_font(pickle_path: str, output_path: str) -> None:
+    """ 将原pickle字体转换为紧凑字体格式
+
+    Args:
+        pickle_path (str): 原pickle字体路径
+        output_path (str): 输出文件路径
+
+    Raises:
+        ValueError: 坐标超出int16可表示的范围
+    """
+    with open(pickle_path, "rb") as f:
+        font = pickle.load(f)
+
+    glyphs = sorted((ord(ch), strokes) for ch, strokes in font.items() if isinstance(ch, str) and len(ch) == 1)
+    coords = np.array([(pt["x"], pt["y"]) for _, strokes in glyphs for stroke in strokes for pt in stroke],
+                      dtype=np.float64).reshape(-1, 2)
+
+    # 整数坐标原样保存, 否则在int16范围内保留尽可能多的小数位
+    max_abs = float(np.abs(coords).max()) if len(coords) else 0.0
+    if max_abs > np.iinfo(np.int16).max:
+        raise ValueError(f"字体坐标超出int16范围: {max_abs}")
+    scale = 1.0
+    if not np.all(coords == np.round(coords)):
+        while scale < 100 and max_abs * scale * 10 <= np.iinfo(np.int16).max:
+            scale *= 10
+
+    index = np.empty(len(glyphs), dtype=INDEX_DTYPE)
+    stroke_table = []
+    point_start = 0
+    for i, (cp, strokes) in enumerate(glyphs):
+        index[i] = (cp, len(stroke_table), len(strokes))
+        for stroke in strokes:
+            stroke_table.append((point_start, len(stroke)))
+            point_start += len(stroke)
+    strokes_arr = np.array(stroke_table, dtype=STROKE_DTYPE)
+    points_arr = np.round(coords * scale).astype(POINT_DTYPE)
+
+    with open(output_path, "wb") as f:
+        f.write(HEADER.pack(FONT_MAGIC, len(index), len(strokes_arr), len(points_arr), scale))
+        f.write(index.tobytes())
+        f.write(strokes_arr.tobytes())
+        f.write(points_arr.tobytes())
+
+    font_logger.info(f"字体转换完成: {len(index)} 个字, {len(strokes_arr)} 笔, {len(points_arr)} 个点, "
+                     f"{os.path.getsize(pickle_path)} -> {os.path.getsize(output_path)} 字节")
+
+
+def open_chinese_font(path: str):
+    """ 打开中文笔画字体, 自动识别紧凑格式和原pickle格式
+
+    Args:
+        path (str): 字体文件路径
+
+    Returns:
+        ChineseFontStore | dict: 字体对象
+    """
+    with open(path, "rb") as f:
+        magic = f.read(len(FONT_MAGIC))
+    if magic == FONT_MAGIC:
+        return ChineseFontStore(path)
+
+    font_logger.warning(f"正在加载pickle格式字体, 建议使用 python -m src.core.font_store convert 转换: {path}")
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def _measure_load(path: str, chars: str) -> None:
+    """ 在独立进程中测量字体加载耗时与内存, 是bench命令的子函数
+    """
+    import time
+    import tracemalloc
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    font = open_chinese_font(path)
+    loaded = time.perf_counter() - start
+    for ch in chars:
+        if ch in font:
+            font[ch]
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+
+    rss = ""
+    try:
+        import resource
+        rss = f", 最大RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB"
+    except ImportError:
+        pass
+    print(f"{path}: 打开 {loaded * 1000:.1f} ms, 查询 {len(chars)} 字共 {total * 1000:.1f} ms, "
+          f"Python堆峰值 {peak / 1024 / 1024:.1f} MB{rss}")
+
+
+if __name__ == "__main__":
+    import subprocess
+    import sys
+
+    usage = (
+        "用法:\n"
+        "  python -m src.core.font_store convert <pickle字体> <输出文件>\n"
+        "  python -m src.core.font_store bench <字体文件> [<字体文件> ...]\n"
+    )
+    if len(sys.argv) < 3:
+        print(usage)
+    elif sys.argv[1] == "convert" and len(sys.argv) == 4:
+        convert_pickle_font(sys.argv[2], sys.argv[3])
+    elif sys.argv[1] == "bench":
+        sample = "春眠不觉晓处处闻啼鸟夜来风雨声花落知多少"
+        for font_path in sys.argv[2:]:
+            # 每种格式在独立进程中测量, 避免相互影响
+            subprocess.run([sys.executable, "-c",
+                            f"from src.core.font_store import _measure_load; _measure_load({font_path!r}, {sample!r})"])
+    else:
+        print(usage)
@@ -0,0 +1,184 @@
+"""
+glyph_cache.py
+
+Hershey字体字形缓存模块
+
+字体对象只加载一次, 每个ASCII字符的线段在第一次使用时归一化并拼接为连续路径,
+结果缓存在内存中, 也可以在启动时预热并保存到磁盘, 下次启动直接读取。
+
+Author: Zhu Jiahao
+Date: 2025-07-25
+"""
+
+import json
+import os
+import string
+from collections import defaultdict
+from typing import Dict, List, Tuple, Iterable, Optional
+from HersheyFonts import HersheyFonts
+from src.utils.logger import __logger__
+
+__all__ = ['HersheyGlyphCache', 'merge_segments_to_paths']
+
+glyph_logger = __logger__.get_module_logger("Glyph")
+
+Point = Tuple[float, float]
+
+
+def merge_segments_to_paths(segments) -> List[List[Point]]:
+    """将一堆线段首尾拼接成连续的路径
+
+        使用端点哈希表查找相邻线段, 复杂度为O(n)。
+        拼接顺序与逐一扫描的实现一致: 每次取剩余线段中下标最小的相邻线段。
+
+    Examples:
+        Input:
+            segments = [
+                ((1, 1), (2, 2)),
+                ((2, 2), (3, 3)),
+                ((4, 4), (5, 5)),
+            ]
+        Output:
+            [
+                [(1, 1), (2, 2), (3, 3)],
+                [(4, 4), (5, 5)]
+            ]
+    """
+    segs = [((x1, y1), (x2, y2)) for ((x1, y1), (x2, y2)) in segments]
+    # 端点 -> 包含该端点的线段下标 (按下标升序)
+    adjacency = defaultdict(list)
+    for idx, (p1, p2) in enumerate(segs):
+        adjacency[p1].append(idx)
+        if p2 != p1:
+            adjacency[p2].append(idx)
+    used = [False] * len(segs)
+
+    def take_next(point):
+        """取出与point相连且未使用的下标最小的线段, 返回其另一端点"""
+        candidates = adjacency.get(point)
+        while candidates:
+            idx = candidates[0]
+            if used[idx]:
+                candidates.pop(0)
+                continue
+            used[idx] = True
+            p1, p2 = segs[idx]
+            return p2 if p1 == point else p1
+        return None
+
+    paths = []
+    for idx, (start, end) in enumerate(segs):
+        if used[idx]:
+            continue
+        used[idx] = True
+        forward = [start, end]
+        # 1. 向后拓展路径
+        while (point := take_next(forward[-1])) is not None:
+            forward.append(point)
+        # 2. 向前拓展路径
+        backward = []
+        while (point := take_next(backward[-1] if backward else forward[0])) is not None:
+            backward.append(point)
+        paths.append(backward[::-1] + forward)
+    return paths
+
+
+class HersheyGlyphCache:
+    """ Hershey字体字形缓存
+    """
+    def __init__(self, font_name: str = "futural", unit_height: float = 100.0):
+        """
+        初始化
+
+        Args:
+            font_name (str): Hershey默认字体名称
+            unit_height (float): 归一化后的字体高度
+        """
+        self.font_name = font_name
+        self.unit_height = unit_height
+        self._font: Optional[HersheyFonts] = None
+        self._glyphs: Dict[str, Tuple[List[List[Point]], float]] = {}
+
+    def get(self, ch: str) -> Tuple[List[List[Point]], float]:
+        """ 获取一个字符的连续路径
+
+        Args:
+            ch (str): ASCII字符
+
+        Returns:
+            Tuple: (路径列表, 水平中心偏移量), 字符没有线段时路径列表为空
+        """
+        glyph = self._glyphs.get(ch)
+        if glyph is None:
+            glyph = self.__build(ch)
+            self._glyphs[ch] = glyph
+        return glyph
+
+    def warm(self, chars: Iterable[str] = string.printable) -> None:
+        """ 预先计算一批字符的路径
+
+        Args:
+            chars (Iterable[str]): 字符集合, 默认为全部可打印ASCII字符
+        """
+        for ch in chars:
+            self.get(ch)
+
+    def save(self, path: str) -> None:
+        """ 将已缓存的字形保存到磁盘
+
+        Args:
+            path (str): 缓存文件路径 (.json)
+        """
+        data = {
+            "font": self.font_name,
+            "unit_height": self.unit_height,
+            "glyphs": {ch: {"paths": paths, "center_x": center_x} for ch, (paths, center_x) in self._glyphs.items()},
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        glyph_logger.info(f"字形缓存已保存至: {path}, 共 {len(self._glyphs)} 个字符")
+
+    def load(self, path: str) -> bool:
+        """ 从磁盘读取字形缓存, 字体或字高不一致时忽略
+
+        Args:
+            path (str): 缓存文件路径 (.json)
+
+        Returns:
+            bool: 是否读取成功
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+
+        if data.get("font") != self.font_name or data.get("unit_height") != self.unit_height:
+            return False
+
+        for ch, glyph in data.get("glyphs", {}).items():
+            paths = [[tuple(pt) for pt in path] for path in glyph["paths"]]
+            self._glyphs[ch] = (paths, glyph["center_x"])
+        return True
+
+    def __build(self, ch: str) -> Tuple[List[List[Point]], float]:
+        """ 计算一个字符的连续路径与水平中心偏移量
+
+        Args:
+            ch (str): ASCII字符
+
+        Returns:
+            Tuple: (路径列表, 水平中心偏移量)
+        """
+        if self._font is None:
+            self._font = HersheyFonts()
+            self._font.load_default_font(self.font_name)
+            self._font.normalize_rendering(self.unit_height)
+
+        raw_segments = list(self._font.lines_for_text(ch))
+        paths = merge_segments_to_paths(raw_segments) if raw_segments else []
+        all_x_raw = [pt[0] for path in paths for pt in path]
+        if not all_x_raw:
+            return [], 0.0
+        return paths, (min(all_x_raw) + max(all_x_raw)) / 2.0
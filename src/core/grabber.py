@@ -0,0 +1,254 @@
+"""
+grabber.py
+
+后台取帧模块
+
+原捕获流程在UI线程中调用cap.read()并对每一帧做缩放预览, 4K画面下预览卡顿, 按下空格时取到的
+往往是正在运动、模糊的那一帧。本模块把取帧放到后台线程:
+1. 取帧线程持续读取画面, 放入有界环形缓冲区 (只保留最近的若干帧), 同时生成低分辨率预览
+2. UI线程只显示预览, 不做任何全分辨率运算
+3. 拍照时在最近的若干帧中按拉普拉斯方差 (清晰度) 选出最清晰的一帧
+
+画面来源可以是摄像头索引, 视频文件, 或图片目录 (ImageSequenceSource), 便于离线测试。
+
+Author: Zhu Jiahao
+Date: 2025-08-03
+"""
+
+import glob
+import os
+import threading
+import time
+import cv2
+import numpy as np
+from collections import deque
+from typing import List, Optional, Tuple, Union
+from src.utils.logger import __logger__
+
+__all__ = ['FrameGrabber', 'ImageSequenceSource', 'open_frame_source', 'sharpness']
+
+grabber_logger = __logger__.get_module_logger("FrameGrabber")
+
+
+def sharpness(frame: np.ndarray, max_side: int = 960) -> float:
+    """ 画面清晰度: 灰度图拉普拉斯响应的方差, 越大越清晰
+
+    Args:
+        frame (np.ndarray): BGR图像
+        max_side (int): 计算前将长边缩小到不超过该值, 减少运算量
+
+    Returns:
+        float: 清晰度
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    scale = max_side / max(gray.shape[:2])
+    if scale < 1:
+        gray = cv2.resize(gray, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+class ImageSequenceSource:
+    """ 以图片序列代替摄像头的画面来源, 接口与cv2.VideoCapture的read/isOpened/set/release一致
+    """
+    def __init__(self, files: List[str], fps: float = 0.0, loop: bool = False):
+        """
+        初始化
+
+        Args:
+            files (List[str]): 图片文件列表, 按顺序输出
+            fps (float): 输出帧率, 大于0时按该帧率限速, 模拟摄像头
+            loop (bool): 读完后是否从头循环
+        """
+        self.files = list(files)
+        self.fps = fps
+        self.loop = loop
+        self.index = 0
+        self._next_time = 0.0
+        self._opened = len(self.files) > 0
+
+    @classmethod
+    def from_directory(cls, directory: str, fps: float = 0.0, loop: bool = False) -> "ImageSequenceSource":
+        """ 读取目录下的全部.jpg/.png图片 (按文件名排序)
+        """
+        files = sorted(glob.glob(os.path.join(directory, "*.jpg")) + glob.glob(os.path.join(directory, "*.png")))
+        return cls(files, fps, loop)
+
+    def isOpened(self) -> bool:
+        return self._opened
+
+    def set(self, prop_id: int, value: float) -> bool:
+        # 图片序列的分辨率由文件决定, 忽略分辨率等设置
+        return False
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if not self._opened:
+            return False, None
+        if self.index >= len(self.files):
+            if not self.loop:
+                return False, None
+            self.index = 0
+
+        if self.fps > 0:
+            delay = self._next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self._next_time = max(self._next_time, time.perf_counter()) + 1.0 / self.fps
+
+        frame = cv2.imread(self.files[self.index])
+        self.index += 1
+        return frame is not None, frame
+
+    def release(self) -> None:
+        self._opened = False
+
+
+def open_frame_source(source: Union[int, str], width: int = 3840, height: int = 2160, fps: float = 0.0):
+    """ 打开画面来源
+
+    Args:
+        source (int | str): 摄像头索引, 视频文件路径, 或图片目录
+        width (int): 摄像头分辨率宽度
+        height (int): 摄像头分辨率高度
+        fps (float): 图片目录的输出帧率, 0表示不限速
+
+    Returns:
+        cv2.VideoCapture | ImageSequenceSource: 画面来源
+    """
+    if isinstance(source, str) and os.path.isdir(source):
+        return ImageSequenceSource.from_directory(source, fps)
+
+    cap = cv2.VideoCapture(source)
+    if isinstance(source, int):
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    return cap
+
+
+class FrameGrabber:
+    """ 后台取帧线程 + 环形缓冲区
+    """
+    def __init__(self, source, buffer_size: int = 8, preview_scale: float = 0.25):
+        """
+        初始化
+
+        Args:
+            source: 已打开的画面来源 (cv2.VideoCapture 或 ImageSequenceSource)
+            buffer_size (int): 环形缓冲区保留的最近帧数
+            preview_scale (float): 预览画面的缩放比例
+        """
+        self.source = source
+        self.preview_scale = preview_scale
+        self.frames_read = 0
+        self._buffer: deque = deque(maxlen=max(buffer_size, 1))     # (序号, 时间戳, 帧)
+        self._scores = {}                                           # 序号 -> 清晰度, 只缓存缓冲区内的帧
+        self._preview: Optional[np.ndarray] = None
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "FrameGrabber":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    @property
+    def alive(self) -> bool:
+        """ 取帧线程是否仍在运行 (画面来源读完或读取失败后为False)
+        """
+        return self._running
+
+    def start(self) -> "FrameGrabber":
+        """ 启动取帧线程
+        """
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self.__grab_loop, name="frame-grabber", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """ 停止取帧线程并释放画面来源
+        """
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.source.release()
+
+    def wait_for_frame(self, timeout: float = 5.0) -> bool:
+        """ 等待缓冲区中出现第一帧
+
+        Returns:
+            bool: 超时前是否已有画面
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._buffer or not self._running, timeout) and bool(self._buffer)
+
+    def preview(self) -> Optional[np.ndarray]:
+        """ 最新一帧的低分辨率预览, 尚无画面时返回None
+        """
+        with self._cond:
+            return self._preview
+
+    def latest(self) -> Optional[np.ndarray]:
+        """ 最新一帧的全分辨率画面, 尚无画面时返回None
+        """
+        with self._cond:
+            return self._buffer[-1][2] if self._buffer else None
+
+    def sharpest(self, window_s: Optional[float] = None) -> Optional[np.ndarray]:
+        """ 缓冲区中最清晰的一帧
+
+        Args:
+            window_s (float): 只在最近window_s秒内的帧中挑选, 默认使用整个缓冲区
+
+        Returns:
+            np.ndarray: 全分辨率画面, 尚无画面时返回None
+        """
+        with self._cond:
+            entries = list(self._buffer)
+        if not entries:
+            return None
+        if window_s is not None:
+            newest = entries[-1][1]
+            entries = [e for e in entries if newest - e[1] <= window_s]
+
+        best_frame, best_score = None, -1.0
+        for seq, _, frame in entries:
+            score = self._scores.get(seq)
+            if score is None:
+                score = sharpness(frame)
+                self._scores[seq] = score
+            if score > best_score:
+                best_frame, best_score = frame, score
+
+        with self._cond:
+            kept = {seq for seq, _, _ in self._buffer}
+            for seq in [s for s in self._scores if s not in kept]:
+                del self._scores[seq]
+
+        grabber_logger.info(f"在最近 {len(entries)} 帧中选取最清晰的一帧, 清晰度 {best_score:.1f}")
+        return best_frame
+
+    def __grab_loop(self) -> None:
+        """ 取帧线程: 读取画面, 放入环形缓冲区并更新预览
+        """
+        while self._running:
+            ret, frame = self.source.read()
+            if not ret:
+                grabber_logger.info(f"画面来源已结束或读取失败, 共读取 {self.frames_read} 帧")
+                break
+            preview = cv2.resize(frame, (0, 0), fx=self.preview_scale, fy=self.preview_scale,
+                                 interpolation=cv2.INTER_NEAREST)
+            with self._cond:
+                self.frames_read += 1
+                self._buffer.append((self.frames_read, time.perf_counter(), frame))
+                self._preview = preview
+                self._cond.notify_all()
+
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
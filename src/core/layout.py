@@ -0,0 +1,266 @@
+"""
+layout.py
+
+增量排版模块
+
+答案以流式分片的形式到达, 排版器逐字符换行, 每当一行排满 (或遇到结尾) 就立即输出
+该行的书写任务 (文本与A4坐标), 使机械臂可以在答案生成完毕之前开始书写。
+
+与OpenCVImageClient.generate_writing_task的区别: 由于事先不知道答案总长度,
+文字区域左对齐于答题框内文字区的左上角, 而不是按最终行宽和总行数居中。
+
+换行时使用缓存的单字步进宽度 (GlyphMetrics) 累加行宽, 每个字符只测量一次,
+不再对不断增长的行前缀反复调用textbbox, 换行耗时与文本长度成线性关系。
+字号自适应 (fit_font_size) 在此基础上对字号做二分查找, 每种字号的字体和字符宽度只加载一次。
+
+Author: Zhu Jiahao
+Date: 2025-07-31
+"""
+
+import json
+import cv2
+from functools import lru_cache
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from PIL import Image, ImageDraw, ImageFont
+from src.utils.logger import __logger__
+
+__all__ = ['GlyphMetrics', 'StreamingLayout', 'fit_font_size', 'get_glyph_metrics', 'wrap_text']
+
+layout_logger = __logger__.get_module_logger("Layout")
+
+
+class GlyphMetrics:
+    """ 缓存字体中每个字符的步进宽度
+    """
+    def __init__(self, font: ImageFont.FreeTypeFont):
+        """
+        初始化
+
+        Args:
+            font (ImageFont.FreeTypeFont): 字体 (字号已确定)
+        """
+        self.font = font
+        bbox = font.getbbox("汉")
+        self.line_height = bbox[3] - bbox[1]
+        self._advances: Dict[str, float] = {}
+
+    def advance(self, ch: str) -> float:
+        """ 单个字符的步进宽度 (像素)
+        """
+        width = self._advances.get(ch)
+        if width is None:
+            width = self.font.getlength(ch)
+            self._advances[ch] = width
+        return width
+
+    def measure(self, text: str) -> float:
+        """ 一行文本的宽度 (像素), 为各字符步进宽度之和
+        """
+        return sum(self.advance(ch) for ch in text)
+
+
+def wrap_text(text: str, metrics: GlyphMetrics, max_width: float) -> List[str]:
+    """ 将文本在指定宽度内自动换行, 换行符处强制换行 (多道题的答案以换行符分隔), 空行忽略
+
+    Args:
+        text (str): 要书写的文本
+        metrics (GlyphMetrics): 字符宽度缓存
+        max_width (float): 最大行宽 (像素)
+
+    Returns:
+        List[str]: 换行后的各行文本
+    """
+    lines, current, width = [], "", 0.0
+    for ch in text:
+        if ch in "\r\n":
+            if current:
+                lines.append(current)
+            current, width = "", 0.0
+            continue
+        w = metrics.advance(ch)
+        if current and width + w > max_width:
+            lines.append(current)
+            current, width = ch, w
+        else:
+            current += ch
+            width += w
+    if current:
+        lines.append(current)
+    return lines
+
+
+@lru_cache(maxsize=64)
+def get_glyph_metrics(font_path: str, size: int) -> GlyphMetrics:
+    """ 获取指定字体和字号的字符宽度缓存, 同一字体字号只加载一次
+
+    Args:
+        font_path (str): 字体文件路径
+        size (int): 字号 (像素)
+
+    Returns:
+        GlyphMetrics: 字符宽度缓存
+    """
+    return GlyphMetrics(ImageFont.truetype(font_path, size))
+
+
+def fit_font_size(text: str,
+                  font_path: str,
+                  min_size: int,
+                  max_size: int,
+                  max_width: float,
+                  max_height: float) -> Tuple[GlyphMetrics, List[str], bool]:
+    """ 二分查找能将文本完整放入指定区域的最大字号
+
+    字号越大, 行数和行高都不减少, 因此"是否放得下"关于字号单调, 可以二分查找。
+
+    Args:
+        text (str): 要书写的文本
+        font_path (str): 字体文件路径
+        min_size (int): 最小字号 (像素)
+        max_size (int): 最大字号 (像素)
+        max_width (float): 文字区宽度 (像素)
+        max_height (float): 文字区高度 (像素)
+
+    Returns:
+        Tuple:
+            - metrics (GlyphMetrics): 选定字号的字符宽度缓存
+            - lines (List[str]): 换行结果
+            - fitted (bool): 是否放得下, 最小字号也放不下时为False (此时使用最小字号)
+    """
+    max_size = max(max_size, min_size)
+    best: Optional[Tuple[GlyphMetrics, List[str]]] = None
+    lo, hi = min_size, max_size
+    while lo <= hi:
+        size = (lo + hi) // 2
+        metrics = get_glyph_metrics(font_path, size)
+        lines = wrap_text(text, metrics, max_width)
+        if metrics.line_height * len(lines) <= max_height:
+            best = (metrics, lines)
+            lo = size + 1
+        else:
+            hi = size - 1
+
+    if best is None:
+        metrics = get_glyph_metrics(font_path, min_size)
+        return metrics, wrap_text(text, metrics, max_width), False
+    return best[0], best[1], True
+
+
+class StreamingLayout:
+    """ 增量排版器
+    """
+    def __init__(self,
+                font: ImageFont.FreeTypeFont,
+                box: Tuple[int, int, int, int],
+                mm_per_pixel_x: float,
+                mm_per_pixel_y: float,
+                px_per_mm_y: float,
+                char_spacing_ratio: float = 1.2):
+        """
+        初始化
+
+        Args:
+            font (ImageFont.FreeTypeFont): 排版字体 (字号已确定)
+            box (Tuple[int, int, int, int]): 答题框的(x, y, w, h)矩形框坐标
+            mm_per_pixel_x (float): 水平方向每像素对应的毫米数
+            mm_per_pixel_y (float): 垂直方向每像素对应的毫米数
+            px_per_mm_y (float): 垂直方向每毫米对应的像素数
+            char_spacing_ratio (float): 字符间水平间隔比例
+        """
+        x, y, w, h = box
+        self.font = font
+        self.mm_per_pixel_x = mm_per_pixel_x
+        self.mm_per_pixel_y = mm_per_pixel_y
+        self.char_spacing_ratio = char_spacing_ratio
+        self.metrics = GlyphMetrics(font)
+        self.max_width = int(w * 0.8)
+        self.line_height = self.metrics.line_height
+        self.char_height_mm = (font.size / px_per_mm_y) * 0.8
+        # 文字区为答题框中央80% x 95%的区域
+        self.x_start = x + (w - self.max_width) / 2
+        self.y_start = y + (h - int(h * 0.95)) / 2
+        self.y_end = y + h
+
+        self._current = ""
+        self._current_width = 0.0
+        self.lines: List[str] = []
+        self.tasks: List[dict] = []
+
+    def feed(self, chunk: str) -> List[dict]:
+        """ 输入一段流式文本, 返回新排满的行 (遇到换行符时当前行立即结束)
+
+        Args:
+            chunk (str): 文本分片
+
+        Returns:
+            List[dict]: 新产生的书写任务 (与task.json格式一致)
+        """
+        finished = []
+        for ch in chunk:
+            if ch in "\r\n":
+                if self._current:
+                    finished.append(self.__emit(self._current))
+                self._current, self._current_width = "", 0.0
+                continue
+            w = self.metrics.advance(ch)
+            if self._current and self._current_width + w > self.max_width:
+                finished.append(self.__emit(self._current))
+                self._current, self._current_width = ch, w
+            else:
+                self._current += ch
+                self._current_width += w
+        return finished
+
+    def finish(self) -> List[dict]:
+        """ 结束输入, 返回最后一行 (如有)
+
+        Returns:
+            List[dict]: 书写任务
+        """
+        if not self._current:
+            return []
+        task = self.__emit(self._current)
+        self._current, self._current_width = "", 0.0
+        return [task]
+
+    def save_tasks(self, task_path: str) -> None:
+        """ 保存已输出的全部书写任务
+
+        Args:
+            task_path (str): 任务文件路径
+        """
+        with open(task_path, "w", encoding="utf-8") as f:
+            json.dump(self.tasks, f, ensure_ascii=False, indent=2)
+        layout_logger.info(f"写字任务已保存至: {task_path}")
+
+    def render_preview(self, img: np.ndarray, preview_path: str) -> None:
+        """ 在试卷图像上绘制已排版的文字, 保存为预览图
+
+        Args:
+            img (np.ndarray): BGR图像
+            preview_path (str): 预览图路径
+        """
+        pil_img = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+        draw = ImageDraw.Draw(pil_img)
+        for i, line in enumerate(self.lines):
+            draw.text((self.x_start, self.y_start + i * self.line_height), line, font=self.font, fill=(0, 0, 0))
+        cv2.imwrite(preview_path, cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR))
+        layout_logger.info(f"预览图已保存至: {preview_path}")
+
+    def __emit(self, line: str) -> dict:
+        """ 生成一行的书写任务
+        """
+        y_line = self.y_start + len(self.lines) * self.line_height
+        if y_line + self.line_height > self.y_end:
+            layout_logger.warning(f"答案超出答题框范围: 第{len(self.lines) + 1}行")
+        task = {
+            "text": line,
+            "a4_x_mm": self.x_start * self.mm_per_pixel_x,
+            "a4_y_mm": y_line * self.mm_per_pixel_y,
+            "char_height_mm": self.char_height_mm,
+            "char_spacing_ratio": self.char_spacing_ratio
+        }
+        self.lines.append(line)
+        self.tasks.append(task)
+        return task
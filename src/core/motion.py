@@ -0,0 +1,140 @@
+"""
+motion.py
+
+流水线式运动指令下发模块
+
+同步模式下, 每个书写点都需要 "下发指令 -> 轮询坐标直到误差小于0.1mm" 的完整往返。
+流式模式下, 指令先进入一个容量有限的前瞻队列, 只有在队列已满或者到达笔画边界时才轮询坐标:
+- 队列中间点的到位判定使用较宽松的衔接容差 (blend tolerance)
+- 笔画边界使用严格的最终容差, 保证笔画终点精度
+- 与同步模式一致, 到位判定只比较X/Y坐标; 队列无进展超时时抛出MotionError, 不再继续下发后续指令
+
+Author: Zhu Jiahao
+Date: 2025-07-23
+"""
+
+import time
+from collections import deque
+from typing import Tuple
+from src.utils.logger import __logger__
+
+__all__ = ['MotionError', 'MotionStreamer']
+
+motion_logger = __logger__.get_module_logger("Motion")
+
+
+class MotionError(Exception):
+    """ 机械臂在超时时间内没有到达目标点
+    """
+
+
+class MotionStreamer:
+    """ 带前瞻队列的运动指令下发器
+    """
+    def __init__(self,
+                ua,
+                lookahead: int = 4,
+                blend_tolerance: float = 1.0,
+                final_tolerance: float = 0.1,
+                poll_interval: float = 0.02,
+                timeout: float = 5.0):
+        """
+        初始化
+
+        Args:
+            ua: 机械臂对象, 需要提供set_coords和get_coords_info
+            lookahead (int): 同时在途的最大指令数
+            blend_tolerance (float): 中间点的到位容差 (mm)
+            final_tolerance (float): 笔画边界的到位容差 (mm)
+            poll_interval (float): 轮询间隔 (s)
+            timeout (float): 队列无进展时的超时时间 (s)
+        """
+        self.ua = ua
+        self.lookahead = max(int(lookahead), 1)
+        self.blend_tolerance = blend_tolerance
+        self.final_tolerance = final_tolerance
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.pending = deque()
+        self.commands_sent = 0
+        self.polls = 0
+
+    def send(self, x: float, y: float, z: float, speed: int) -> None:
+        """ 下发一个中间点, 队列已满时等待最早的指令完成
+
+        Args:
+            x (float): 目标坐标X (机械臂坐标)
+            y (float): 目标坐标Y (机械臂坐标)
+            z (float): 目标坐标Z (机械臂坐标)
+            speed (int): 运动速度
+
+        Raises:
+            MotionError: 等待队列腾出空间时超时
+        """
+        if len(self.pending) >= self.lookahead:
+            self.__wait(lambda: len(self.pending) < self.lookahead, self.blend_tolerance)
+
+        self.ua.set_coords([x, y, z], speed)
+        self.pending.append((x, y, z))
+        self.commands_sent += 1
+
+    def finish(self) -> None:
+        """ 笔画边界: 等待队列中所有指令完成, 且机械臂停在最后一个目标点的最终容差内
+
+        Raises:
+            MotionError: 等待超时
+        """
+        if not self.pending:
+            return
+        self.__wait(lambda: not self.pending, self.final_tolerance)
+
+    def __wait(self, done, tolerance: float) -> None:
+        """ 轮询机械臂坐标, 移除已经到达的指令, 直到满足条件或超时
+
+        Args:
+            done (Callable[[], bool]): 结束条件
+            tolerance (float): 到位容差 (mm)
+
+        Raises:
+            MotionError: 超过timeout秒没有任何指令完成, 此时清空队列
+        """
+        last_progress = time.time()
+        while True:
+            coords = self.ua.get_coords_info()
+            self.polls += 1
+            if self.__drop_reached(coords, tolerance):
+                last_progress = time.time()
+            if done():
+                return
+            if time.time() - last_progress > self.timeout:
+                target = self.pending[0]
+                self.pending.clear()
+                motion_logger.error("机械臂运动存在误差, 请检查...")
+                raise MotionError(f"机械臂 {self.timeout}s 内未到达目标点 ({target[0]:.2f}, {target[1]:.2f}), "
+                                  f"当前坐标 {coords}")
+            time.sleep(self.poll_interval)
+
+    def __drop_reached(self, coords: Tuple, tolerance: float) -> bool:
+        """ 按顺序移除已经到达的指令
+
+        指令按顺序执行, 只有队首的目标点到达后才检查下一个, 不会越过尚未到达的指令。
+        最后一个目标点始终使用最终容差判定, 以保证笔画终点精度。
+
+        Args:
+            coords (Tuple): 机械臂当前坐标
+            tolerance (float): 中间点的到位容差 (mm)
+
+        Returns:
+            bool: 是否移除了指令
+        """
+        if not coords or len(coords) < 2:
+            return False
+        dropped = False
+        while self.pending:
+            x, y, _ = self.pending[0]
+            tol = self.final_tolerance if len(self.pending) == 1 else tolerance
+            if abs(coords[0] - x) > tol or abs(coords[1] - y) > tol:
+                break
+            self.pending.popleft()
+            dropped = True
+        return dropped
@@ -0,0 +1,137 @@
+"""
+ocr_router.py
+
+OCR后端选择
+
+OCRRouter与QwenClient.ocr_image接口一致, 可以直接替换qwen_client.ocr_image, 按策略在两个后端之间选择:
+- remote: 只使用远程OCR (QwenClient), 与原流程相同
+- local: 只使用本地OCR (LocalOCRClient), 不需要网络
+- remote_first: 先用远程OCR, 请求失败 (网络不可用, 超时等) 时改用本地OCR
+- local_first: 先用本地OCR, 置信度低于min_confidence或没有识别出文字时改用远程OCR;
+  远程也失败时, 只要本地结果不为空就使用本地结果
+
+后端只需要提供ocr_image(image_path, log_path) -> str; 本地后端还需要提供recognize(image_path) -> dict
+(包含text和confidence), 只有确定采用本地结果时才输出到终端和日志文件。
+
+Author: Zhu Jiahao
+Date: 2025-08-11
+"""
+
+import time
+from typing import Optional
+from src.api.llm_transport import LLMError
+from src.api.local_ocr_api import OCRError
+from src.core.stream_sink import ConsoleSubscriber, FileSubscriber, StreamSink
+from src.utils.logger import __logger__
+
+__all__ = ['OCRRouter', 'OCR_POLICIES']
+
+ocr_logger = __logger__.get_module_logger("OCRRouter")
+
+OCR_POLICIES = ("remote", "local", "remote_first", "local_first")
+
+
+class OCRRouter:
+    """ 按策略选择远程或本地OCR
+    """
+    def __init__(self, remote, local=None, policy: str = "remote", min_confidence: float = 0.6):
+        """
+        初始化
+
+        Args:
+            remote (QwenClient): 远程OCR后端, 为None时只能使用本地OCR
+            local (LocalOCRClient): 本地OCR后端, 为None时只能使用远程OCR
+            policy (str): 选择策略, 见OCR_POLICIES
+            min_confidence (float): local_first策略下采用本地结果的最低置信度 (0~1)
+        """
+        if policy not in OCR_POLICIES:
+            raise ValueError(f"未知的OCR策略: {policy}, 可选: {', '.join(OCR_POLICIES)}")
+        if remote is None and local is None:
+            raise ValueError("至少需要一个OCR后端")
+        if local is None and policy != "remote":
+            ocr_logger.warning(f"本地OCR不可用, OCR策略 {policy} 改为 remote")
+            policy = "remote"
+        if remote is None and policy != "local":
+            ocr_logger.warning(f"远程OCR不可用, OCR策略 {policy} 改为 local")
+            policy = "local"
+
+        self.remote = remote
+        self.local = local
+        self.policy = policy
+        self.min_confidence = min_confidence
+        self.ocr_metrics = []           # 每次OCR使用的后端, 本地置信度, 改用另一后端的原因和耗时
+
+    def ocr_image(self, image_path: str, log_path: Optional[str], prompt: str = None) -> str:
+        """ 识别一张图片, 参数与QwenClient.ocr_image一致
+
+        Returns:
+            str: 识别出的文本
+
+        Raises:
+            LLMError: 只使用远程OCR (或本地也失败) 时, 远程请求失败
+            OCRError: 只使用本地OCR (或远程也失败) 时, 本地识别失败
+        """
+        start = time.perf_counter()
+        record = {"image": image_path, "policy": self.policy, "backend": None, "confidence": None, "fallback": None}
+        try:
+            if self.policy == "remote":
+                text = self.__remote(image_path, log_path, prompt, record)
+            elif self.policy == "local":
+                text = self.__accept_local(self.__local(image_path, record), log_path, record)
+            elif self.policy == "remote_first":
+                text = self.__remote_first(image_path, log_path, prompt, record)
+            else:
+                text = self.__local_first(image_path, log_path, prompt, record)
+        finally:
+            record["ocr_s"] = time.perf_counter() - start
+            self.ocr_metrics.append(record)
+        return text
+
+    def __remote_first(self, image_path: str, log_path: Optional[str], prompt: str, record: dict) -> str:
+        try:
+            return self.__remote(image_path, log_path, prompt, record)
+        except LLMError as e:
+            record["fallback"] = f"远程OCR失败: {e}"
+            ocr_logger.warning(f"远程OCR失败, 改用本地OCR: {e}")
+        result = self.__local(image_path, record)
+        if result["confidence"] < self.min_confidence:
+            ocr_logger.warning(f"本地OCR置信度 {result['confidence']:.2f} 低于 {self.min_confidence}, 识别结果可能不准确")
+        return self.__accept_local(result, log_path, record)
+
+    def __local_first(self, image_path: str, log_path: Optional[str], prompt: str, record: dict) -> str:
+        result = None
+        try:
+            result = self.__local(image_path, record)
+            if result["text"] and result["confidence"] >= self.min_confidence:
+                return self.__accept_local(result, log_path, record)
+            record["fallback"] = f"本地OCR置信度 {result['confidence']:.2f} 低于 {self.min_confidence}"
+        except OCRError as e:
+            record["fallback"] = f"本地OCR失败: {e}"
+        ocr_logger.info(f"{record['fallback']}, 改用远程OCR")
+
+        try:
+            return self.__remote(image_path, log_path, prompt, record)
+        except LLMError:
+            if not result or not result["text"]:
+                raise
+            ocr_logger.warning("远程OCR也失败, 使用置信度较低的本地OCR结果")
+            return self.__accept_local(result, log_path, record)
+
+    def __remote(self, image_path: str, log_path: Optional[str], prompt: str, record: dict) -> str:
+        text = self.remote.ocr_image(image_path, log_path, prompt)
+        record["backend"] = "remote"
+        return text
+
+    def __local(self, image_path: str, record: dict) -> dict:
+        result = self.local.recognize(image_path)
+        record["confidence"] = result["confidence"]
+        return result
+
+    @staticmethod
+    def __accept_local(result: dict, log_path: Optional[str], record: dict) -> str:
+        """ 采用本地结果: 输出到终端并追加到日志文件
+        """
+        record["backend"] = "local"
+        with StreamSink(ConsoleSubscriber(), FileSubscriber(log_path, "a") if log_path else None) as sink:
+            sink(result["text"])
+        return result["text"]
@@ -0,0 +1,107 @@
+"""
+ocr_upload.py
+
+OCR上传图片的预处理
+
+原流程把cv2.imwrite以默认质量保存的全分辨率试卷图片直接base64上传, OCR并不需要这么多像素。
+上传前依次进行:
+1. (可选) 裁剪到文字区域: 二值化后膨胀, 取全部文字连通域的外接矩形, 四周留出边距
+2. 转为灰度图, 或自适应阈值二值化
+3. 按A4宽度把分辨率限制在指定DPI以内 (只缩小, 不放大)
+4. 以指定质量重新编码为JPEG或WebP
+
+Author: Zhu Jiahao
+Date: 2025-08-06
+"""
+
+import cv2
+import numpy as np
+from typing import Optional, Tuple
+from src.utils.utils import A4_WIDTH_MM
+
+__all__ = ['prepare_ocr_image', 'text_region']
+
+_ENCODINGS = {
+    "jpeg": (".jpg", "image/jpeg", cv2.IMWRITE_JPEG_QUALITY),
+    "webp": (".webp", "image/webp", cv2.IMWRITE_WEBP_QUALITY),
+}
+
+
+def text_region(gray: np.ndarray, margin: int = 20, min_area: int = 50) -> Tuple[int, int, int, int]:
+    """ 文字区域的外接矩形
+
+    Args:
+        gray (np.ndarray): 灰度图
+        margin (int): 四周留出的边距 (像素)
+        min_area (int): 忽略面积小于该值的连通域 (噪点)
+
+    Returns:
+        Tuple: (x, y, w, h), 没有文字时返回整幅图像
+    """
+    h, w = gray.shape[:2]
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    binary = cv2.dilate(binary, cv2.getStructuringElement(cv2.MORPH_RECT, (15, 5)))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary)
+    keep = stats[1:][stats[1:, cv2.CC_STAT_AREA] >= min_area]
+    if count <= 1 or len(keep) == 0:
+        return 0, 0, w, h
+
+    x0 = max(int(keep[:, cv2.CC_STAT_LEFT].min()) - margin, 0)
+    y0 = max(int(keep[:, cv2.CC_STAT_TOP].min()) - margin, 0)
+    x1 = min(int((keep[:, cv2.CC_STAT_LEFT] + keep[:, cv2.CC_STAT_WIDTH]).max()) + margin, w)
+    y1 = min(int((keep[:, cv2.CC_STAT_TOP] + keep[:, cv2.CC_STAT_HEIGHT]).max()) + margin, h)
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def prepare_ocr_image(image: np.ndarray,
+                      mode: str = "gray",
+                      max_dpi: Optional[float] = 150,
+                      fmt: str = "jpeg",
+                      quality: int = 80,
+                      crop_to_text: bool = False) -> Tuple[bytes, str, dict]:
+    """ 生成上传给OCR模型的图片
+
+    Args:
+        image (np.ndarray): A4试卷图像 (BGR), 宽度对应纸张的210mm
+        mode (str): "color" 保留彩色, "gray" 灰度, "binary" 自适应阈值二值化
+        max_dpi (float): 分辨率上限, 为None或0时不缩放
+        fmt (str): 编码格式, "jpeg" 或 "webp"
+        quality (int): 编码质量, 1~100
+        crop_to_text (bool): 是否裁剪到文字区域
+
+    Returns:
+        Tuple: (编码后的字节, MIME类型, 信息 {width, height, dpi, crop})
+    """
+    if fmt not in _ENCODINGS:
+        raise ValueError(f"不支持的编码格式: {fmt}")
+    ext, mime, quality_flag = _ENCODINGS[fmt]
+
+    # 纸张宽度按缩放前的整页计算, 裁剪不改变DPI
+    dpi = image.shape[1] / (A4_WIDTH_MM / 25.4)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+
+    crop = (0, 0, image.shape[1], image.shape[0])
+    if crop_to_text:
+        crop = text_region(gray)
+        x, y, w, h = crop
+        image, gray = image[y:y + h, x:x + w], gray[y:y + h, x:x + w]
+
+    if mode == "color":
+        out = image
+    elif mode == "gray":
+        out = gray
+    elif mode == "binary":
+        out = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15)
+    else:
+        raise ValueError(f"不支持的图像模式: {mode}")
+
+    if max_dpi and dpi > max_dpi:
+        scale = max_dpi / dpi
+        out = cv2.resize(out, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        dpi = max_dpi
+
+    ok, buffer = cv2.imencode(ext, out, [quality_flag, int(quality)])
+    if not ok:
+        raise ValueError(f"图片编码失败: {fmt}")
+    info = {"width": out.shape[1], "height": out.shape[0], "dpi": round(dpi, 1), "crop": list(crop)}
+    return buffer.tobytes(), mime, info
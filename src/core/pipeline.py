@@ -0,0 +1,146 @@
+"""
+pipeline.py
+
+流式答题书写管线
+
+原流程是严格串行的: 等待DeepSeek完整输出答案 -> 排版 -> 书写。本模块用asyncio把三个阶段
+连成生产者-消费者管线, 通过两个队列衔接:
+1. 答案生成: 在线程中调用阻塞的流式接口, 每段增量通过call_soon_threadsafe放入文本队列
+2. 增量排版: 从文本队列取出分片, 每排满一行就放入书写队列
+3. 机械臂书写: 从书写队列逐行取出任务并书写 (同样在线程中执行, 不阻塞事件循环)
+
+第一行排满后机械臂即可开始书写, 不必等待答案生成结束。
+
+Author: Zhu Jiahao
+Date: 2025-07-31
+"""
+
+import asyncio
+import time
+from typing import Callable, Optional
+from src.core.layout import StreamingLayout
+from src.utils.logger import __logger__
+
+__all__ = ['StreamingAnswerPipeline']
+
+pipeline_logger = __logger__.get_module_logger("StreamPipeline")
+
+# 队列结束标记
+_DONE = object()
+
+
+class StreamingAnswerPipeline:
+    """ 答案生成 - 排版 - 书写 流式管线
+    """
+    def __init__(self, robot_writer, layout: StreamingLayout, optimize: bool = True):
+        """
+        初始化
+
+        Args:
+            robot_writer (RobotWritingClient): 机械臂书写服务
+            layout (StreamingLayout): 增量排版器
+            optimize (bool): 是否对每行的笔画顺序做路径优化
+        """
+        self.robot_writer = robot_writer
+        self.layout = layout
+        self.optimize = optimize
+
+        # 统计数据 (相对管线启动时刻, s)
+        self.first_token_s: Optional[float] = None
+        self.first_line_s: Optional[float] = None
+        self.first_stroke_s: Optional[float] = None
+        self.answer_done_s: Optional[float] = None
+        self.total_s: Optional[float] = None
+        self.lines_written = 0
+
+    def run(self, answer_fn: Callable[[Callable[[str], None]], None]) -> dict:
+        """ 运行管线, 阻塞直到全部书写完毕
+
+        Args:
+            answer_fn (Callable): 答案生成函数, 接收on_delta回调, 例如
+                lambda on_delta: deepseek_client.answer_math_question(q_path, a_path, on_delta)
+
+        Returns:
+            dict: 统计数据, 见stats()
+        """
+        asyncio.run(self.run_async(answer_fn))
+        return self.stats()
+
+    async def run_async(self, answer_fn: Callable[[Callable[[str], None]], None]) -> None:
+        """ run()的协程版本
+        """
+        loop = asyncio.get_running_loop()
+        text_queue: asyncio.Queue = asyncio.Queue()
+        line_queue: asyncio.Queue = asyncio.Queue()
+        self._start = time.perf_counter()
+
+        def on_delta(content: str) -> None:
+            # 在生成线程中被调用
+            loop.call_soon_threadsafe(text_queue.put_nowait, content)
+
+        async def produce() -> None:
+            try:
+                await asyncio.to_thread(answer_fn, on_delta)
+            finally:
+                self.answer_done_s = self.__elapsed()
+                await text_queue.put(_DONE)
+
+        async def layout() -> None:
+            while True:
+                chunk = await text_queue.get()
+                if chunk is _DONE:
+                    break
+                if self.first_token_s is None:
+                    self.first_token_s = self.__elapsed()
+                for task in self.layout.feed(chunk):
+                    await self.__put_line(line_queue, task)
+            for task in self.layout.finish():
+                await self.__put_line(line_queue, task)
+            await line_queue.put(_DONE)
+
+        async def write() -> None:
+            while True:
+                task = await line_queue.get()
+                if task is _DONE:
+                    break
+                if self.first_stroke_s is None:
+                    self.first_stroke_s = self.__elapsed()
+                await asyncio.to_thread(self.robot_writer.write_tasks, [task], self.optimize)
+                self.lines_written += 1
+
+        await asyncio.gather(produce(), layout(), write())
+        self.total_s = self.__elapsed()
+
+        pipeline_logger.info(f"流式书写完成: 共 {self.lines_written} 行, 首个token {self.__fmt(self.first_token_s)}, "
+                             f"开始书写 {self.__fmt(self.first_stroke_s)}, 答案生成结束 {self.__fmt(self.answer_done_s)}, "
+                             f"总耗时 {self.__fmt(self.total_s)}")
+
+    def stats(self) -> dict:
+        """ 统计数据
+
+        Returns:
+            dict: lines, first_token_s, first_line_s, first_stroke_s, answer_done_s, total_s
+        """
+        return {
+            "lines": self.lines_written,
+            "first_token_s": self.first_token_s,
+            "first_line_s": self.first_line_s,
+            "first_stroke_s": self.first_stroke_s,
+            "answer_done_s": self.answer_done_s,
+            "total_s": self.total_s,
+        }
+
+    async def __put_line(self, line_queue: asyncio.Queue, task: dict) -> None:
+        """ 将排好的一行放入书写队列
+        """
+        if self.first_line_s is None:
+            self.first_line_s = self.__elapsed()
+        pipeline_logger.info(f"排版完成一行: {task['text']}")
+        await line_queue.put(task)
+
+    def __elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+    @staticmethod
+    def __fmt(seconds: Optional[float]) -> str:
+        return "-" if seconds is None else f"{seconds:.2f}s"
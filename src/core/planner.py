@@ -0,0 +1,151 @@
+"""
+planner.py
+
+书写路径规划模块
+
+规划流程:
+1. 以笔画为单位, 在一行内使用最近邻算法确定初始书写顺序 (允许笔画反向书写)
+2. 使用2-opt算法对行内顺序进一步优化
+3. 将每一行视为一条整体路径, 在行与行之间重复上述两步
+4. 输出完整的书写路径, 并统计优化前后的抬笔移动距离
+
+Author: Zhu Jiahao
+Date: 2025-07-21
+"""
+
+import math
+import numpy as np
+from typing import List, Tuple, Optional
+
+__all__ = ['plan_toolpath', 'pen_up_distance']
+
+Point = Tuple[float, float]
+Stroke = List[Point]
+
+
+def pen_up_distance(strokes: List[Stroke], origin: Optional[Point] = None) -> float:
+    """ 计算按给定顺序书写所有笔画时的抬笔移动总距离
+
+    Args:
+        strokes (List[Stroke]): 笔画列表, 每个笔画为机械臂坐标点列表
+        origin (Point): 可选, 书写开始前笔尖所在位置
+
+    Returns:
+        float: 抬笔移动总距离 (mm)
+    """
+    total = 0.0
+    current = origin
+    for stroke in strokes:
+        if not stroke:
+            continue
+        if current is not None:
+            total += math.dist(current, stroke[0])
+        current = stroke[-1]
+    return total
+
+
+def plan_toolpath(lines: List[List[Stroke]],
+                  origin: Optional[Point] = None,
+                  max_passes: int = 10) -> List[Stroke]:
+    """ 将按行组织的笔画规划成一条完整的书写路径
+
+    Args:
+        lines (List[List[Stroke]]): 每一行的笔画列表
+        origin (Point): 可选, 书写开始前笔尖所在位置
+        max_passes (int): 2-opt优化的最大迭代轮数
+
+    Returns:
+        List[Stroke]: 规划后的笔画序列 (部分笔画可能被反向)
+    """
+    # 1. 行内规划
+    planned_lines = []
+    for strokes in lines:
+        strokes = [s for s in strokes if s]
+        if not strokes:
+            continue
+        starts = np.array([s[0] for s in strokes], dtype=float)
+        ends = np.array([s[-1] for s in strokes], dtype=float)
+        # 行内规划时以该行第一个笔画的起点作为参考点, 行的整体方向留给行间规划决定
+        order, flipped = _order_paths(starts, ends, starts[0], max_passes)
+        planned_lines.append([strokes[i][::-1] if f else strokes[i] for i, f in zip(order, flipped)])
+
+    if not planned_lines:
+        return []
+
+    # 2. 行间规划: 每一行作为一条可整体反向的路径
+    starts = np.array([line[0][0] for line in planned_lines], dtype=float)
+    ends = np.array([line[-1][-1] for line in planned_lines], dtype=float)
+    start_point = np.asarray(origin, dtype=float) if origin is not None else starts[0]
+    order, flipped = _order_paths(starts, ends, start_point, max_passes)
+
+    toolpath = []
+    for i, f in zip(order, flipped):
+        line = planned_lines[i]
+        if f:
+            toolpath.extend(stroke[::-1] for stroke in reversed(line))
+        else:
+            toolpath.extend(line)
+    return toolpath
+
+
+def _order_paths(starts: np.ndarray,
+                 ends: np.ndarray,
+                 origin: np.ndarray,
+                 max_passes: int) -> Tuple[List[int], List[bool]]:
+    """ 对一组可反向的路径排序, 使路径之间的空行程最短, 是plan_toolpath的子函数
+
+    Args:
+        starts (np.ndarray): 每条路径的起点, 形状为 (n, 2)
+        ends (np.ndarray): 每条路径的终点, 形状为 (n, 2)
+        origin (np.ndarray): 起始位置
+        max_passes (int): 2-opt优化的最大迭代轮数
+
+    Returns:
+        Tuple[List[int], List[bool]]: 路径顺序, 以及每条路径是否反向
+    """
+    n = len(starts)
+    # 1. 最近邻: 每一步选择离当前位置最近的路径端点, 若终点更近则反向书写
+    remaining = np.ones(n, dtype=bool)
+    current = np.asarray(origin, dtype=float)
+    order, flipped = [], []
+    for _ in range(n):
+        d_start = np.linalg.norm(starts - current, axis=1)
+        d_end = np.linalg.norm(ends - current, axis=1)
+        d_start[~remaining] = np.inf
+        d_end[~remaining] = np.inf
+        i_start, i_end = int(np.argmin(d_start)), int(np.argmin(d_end))
+        if d_end[i_end] < d_start[i_start]:
+            idx, flip = i_end, True
+        else:
+            idx, flip = i_start, False
+        remaining[idx] = False
+        order.append(idx)
+        flipped.append(flip)
+        current = starts[idx] if flip else ends[idx]
+
+    # 2. 2-opt: 反转区间[i, j]后, 区间内路径顺序与方向同时翻转
+    entry = np.array([ends[k] if f else starts[k] for k, f in zip(order, flipped)])
+    exit_ = np.array([starts[k] if f else ends[k] for k, f in zip(order, flipped)])
+    for _ in range(max_passes):
+        improved = False
+        for i in range(n):
+            prev = exit_[i - 1] if i > 0 else origin
+            js = np.arange(i, n)
+            # 新旧连接代价之差, 最后一段路径之后没有连接
+            delta = (np.linalg.norm(exit_[js] - prev, axis=1)
+                     - np.linalg.norm(entry[i] - prev))
+            nxt = js + 1 < n
+            j_in = js[nxt]
+            delta[nxt] += (np.linalg.norm(entry[i] - entry[j_in + 1], axis=1)
+                           - np.linalg.norm(exit_[j_in] - entry[j_in + 1], axis=1))
+            best = int(np.argmin(delta))
+            if delta[best] < -1e-9:
+                j = i + best
+                order[i:j + 1] = order[i:j + 1][::-1]
+                flipped[i:j + 1] = [not f for f in flipped[i:j + 1][::-1]]
+                entry[i:j + 1], exit_[i:j + 1] = exit_[i:j + 1][::-1].copy(), entry[i:j + 1][::-1].copy()
+                improved = True
+        if not improved:
+            break
+
+    return order, flipped
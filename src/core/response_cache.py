@@ -0,0 +1,180 @@
+"""
+response_cache.py
+
+OCR与大模型回答的磁盘缓存
+
+同一张试卷重复运行时 (例如书写失败后重试), 不必再次上传图片和请求答案。缓存按内容寻址:
+键为 (模型, 提示词, 图片字节或问题文本) 的SHA-256哈希, 值为模型输出的完整文本。
+- 每个条目是一个JSON文件, 按哈希前两位分目录存放, 写入时先写临时文件再替换, 中断不会留下半个条目
+- 超过有效期 (ttl) 的条目视为未命中并删除
+- 缓存总大小超过上限时, 按最近使用时间 (文件修改时间, 命中时更新) 从旧到新淘汰
+- 记录命中, 未命中和淘汰次数
+
+Author: Zhu Jiahao
+Date: 2025-08-05
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Optional, Union
+from src.utils.logger import __logger__
+
+__all__ = ['ResponseCache']
+
+cache_logger = __logger__.get_module_logger("ResponseCache")
+
+
+class ResponseCache:
+    """ 按内容寻址的模型输出缓存
+    """
+    def __init__(self, cache_dir: str, max_size_mb: float = 200.0, ttl_hours: Optional[float] = 168.0):
+        """
+        初始化
+
+        Args:
+            cache_dir (str): 缓存目录
+            max_size_mb (float): 缓存总大小上限 (MB)
+            ttl_hours (float): 条目有效期 (小时), 为None或0时不过期
+        """
+        self.cache_dir = cache_dir
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.ttl_s = ttl_hours * 3600 if ttl_hours else None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._size_bytes: Optional[int] = None          # 首次写入时再统计, 避免启动时扫描目录
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(*parts: Union[str, bytes, None]) -> str:
+        """ 计算缓存键, 每一部分带长度前缀, 避免不同切分方式拼接出相同的内容
+
+        Args:
+            *parts: 模型名, 提示词, 图片字节, 问题文本等
+
+        Returns:
+            str: 十六进制哈希字符串
+        """
+        digest = hashlib.sha256()
+        for part in parts:
+            data = b"" if part is None else part if isinstance(part, bytes) else str(part).encode("utf-8")
+            digest.update(len(data).to_bytes(8, "little"))
+            digest.update(data)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """ 读取缓存
+
+        Args:
+            key (str): 缓存键
+
+        Returns:
+            str: 缓存的文本, 未命中或已过期时返回None
+        """
+        path = self.__path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if self.ttl_s and time.time() - entry.get("created", 0) > self.ttl_s:
+            self.__remove(path)
+            with self._lock:
+                self.misses += 1
+                self.evictions += 1
+            return None
+
+        try:
+            os.utime(path)          # 更新最近使用时间
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return entry.get("value")
+
+    def put(self, key: str, value: str, **meta) -> None:
+        """ 写入缓存, 总大小超过上限时淘汰最久未使用的条目
+
+        Args:
+            key (str): 缓存键
+            value (str): 文本
+            **meta: 额外记录的信息 (模型名等), 只用于排查
+        """
+        path = self.__path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "value": value, **meta}, f, ensure_ascii=False)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._size_bytes is None:
+                self._size_bytes = self.__scan_size()
+            else:
+                self._size_bytes += os.path.getsize(path) - old_size
+            if self._size_bytes > self.max_size_bytes:
+                self.__evict()
+
+    def stats(self) -> dict:
+        """ 缓存统计
+
+        Returns:
+            dict: hits, misses, evictions, hit_rate
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def __evict(self) -> None:
+        """ 删除过期条目, 再按最近使用时间从旧到新删除, 直到总大小不超过上限的90%
+        """
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    st = os.stat(path)
+                    entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+
+        size = sum(e[1] for e in entries)
+        target = self.max_size_bytes * 0.9
+        now = time.time()
+        for mtime, file_size, path in entries:
+            expired = self.ttl_s and now - mtime > self.ttl_s
+            if size <= target and not expired:
+                break
+            self.__remove(path)
+            size -= file_size
+            self.evictions += 1
+        self._size_bytes = size
+        cache_logger.info(f"缓存淘汰完成, 当前大小 {size / 1024 / 1024:.1f}MB, 累计淘汰 {self.evictions} 条")
+
+    def __scan_size(self) -> int:
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            total += sum(os.path.getsize(os.path.join(root, f)) for f in files if f.endswith(".json"))
+        return total
+
+    def __path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    @staticmethod
+    def __remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,170 @@
+"""
+simplify.py
+
+中文笔画点抽稀模块
+
+中文笔画字体中每个笔画的点非常密集, 在5~8mm的书写尺寸下, 大部分相邻点的间距
+已经小于机械臂的分辨率。本模块使用Ramer-Douglas-Peucker算法, 根据目标字高把
+书写尺寸下的容差(mm)换算为字体坐标下的容差, 对笔画进行抽稀, 并按(字符, 字高, 容差)缓存结果。
+
+Author: Zhu Jiahao
+Date: 2025-07-24
+"""
+
+import numpy as np
+from typing import Dict, List, Tuple, Iterable
+
+__all__ = ['rdp_simplify', 'tolerance_to_font_units', 'StrokeSimplifier', 'font_decimation_report']
+
+# 字体坐标 -> 毫米: raw / 10 / 70 * height (见RobotWritingClient.write_chinese_char)
+FONT_UNITS_PER_CHAR = 700.0
+
+
+def rdp_simplify(points: np.ndarray, epsilon: float) -> np.ndarray:
+    """ Ramer-Douglas-Peucker折线抽稀 (非递归实现)
+
+    Args:
+        points (np.ndarray): 折线点, 形状为 (n, 2)
+        epsilon (float): 最大允许偏差, 与points单位相同
+
+    Returns:
+        np.ndarray: 抽稀后的折线点, 保留首尾点
+    """
+    n = len(points)
+    if n <= 2 or epsilon <= 0:
+        return points
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        seg = points[end] - points[start]
+        rel = points[start + 1:end] - points[start]
+        seg_len = np.hypot(seg[0], seg[1])
+        if seg_len == 0:
+            dist = np.hypot(rel[:, 0], rel[:, 1])
+        else:
+            dist = np.abs(seg[0] * rel[:, 1] - seg[1] * rel[:, 0]) / seg_len
+        idx = int(np.argmax(dist))
+        if dist[idx] > epsilon:
+            mid = start + 1 + idx
+            keep[mid] = True
+            stack.append((start, mid))
+            stack.append((mid, end))
+
+    return points[keep]
+
+
+class StrokeSimplifier:
+    """ 中文笔画抽稀与缓存
+    """
+    def __init__(self, font, tolerance_mm: float):
+        """
+        初始化
+
+        Args:
+            font: 中文笔画字体 (pickle字典或ChineseFontStore)
+            tolerance_mm (float): 书写尺寸下的最大允许偏差 (mm), 小于等于0时不抽稀
+        """
+        self.font = font
+        self.tolerance_mm = tolerance_mm
+        self._cache: Dict[Tuple[str, float, float], List[np.ndarray]] = {}
+
+    def get_strokes(self, ch: str, height: float) -> List[np.ndarray]:
+        """ 获取抽稀后的笔画
+
+        Args:
+            ch (str): 汉字
+            height (float): 字体高度 (mm)
+
+        Returns:
+            List[np.ndarray]: 笔画列表, 每个笔画为字体坐标下 (n, 2) 的 [x, y] 数组
+        """
+        key = (ch, round(height, 3), self.tolerance_mm)
+        strokes = self._cache.get(key)
+        if strokes is None:
+            epsilon = tolerance_to_font_units(self.tolerance_mm, height)
+            strokes = [rdp_simplify(pts, epsilon) for pts in _font_strokes(self.font[ch])]
+            self._cache[key] = strokes
+        return strokes
+
+
+def tolerance_to_font_units(tolerance_mm: float, height: float) -> float:
+    """ 将书写尺寸下的容差换算为字体坐标下的容差
+
+    Args:
+        tolerance_mm (float): 容差 (mm)
+        height (float): 字体高度 (mm)
+
+    Returns:
+        float: 字体坐标下的容差
+    """
+    if tolerance_mm <= 0 or height <= 0:
+        return 0.0
+    # 水平方向缩放比例更大 (x_ratio = 1.0, y_ratio = 0.8), 以其为准保证两个方向的偏差都不超过容差
+    return tolerance_mm * FONT_UNITS_PER_CHAR / height
+
+
+def font_decimation_report(font, heights: Iterable[float], tolerance_mm: float) -> List[Dict[str, float]]:
+    """ 统计整套字体在不同字高下抽稀前后的点数
+
+    Args:
+        font: 中文笔画字体
+        heights (Iterable[float]): 字体高度列表 (mm)
+        tolerance_mm (float): 容差 (mm)
+
+    Returns:
+        List[dict]: 每个字高的统计结果
+    """
+    glyphs = {ch: _font_strokes(strokes) for ch, strokes in font.items()}
+    before = sum(len(pts) for strokes in glyphs.values() for pts in strokes)
+
+    report = []
+    for height in heights:
+        epsilon = tolerance_to_font_units(tolerance_mm, height)
+        after = sum(len(rdp_simplify(pts, epsilon)) for strokes in glyphs.values() for pts in strokes)
+        report.append({
+            "height_mm": height,
+            "tolerance_mm": tolerance_mm,
+            "chars": len(glyphs),
+            "points_before": before,
+            "points_after": after,
+            "ratio": after / before if before else 1.0,
+        })
+    return report
+
+
+def _font_strokes(strokes) -> List[np.ndarray]:
+    """ 将字体中的笔画转换为 (n, 2) 的 [x, y] 数组
+
+    Args:
+        strokes: 笔画列表, 每个点为 {"x": .., "y": ..}; 紧凑字体 (ChineseFontStore) 中已经是数组
+
+    Returns:
+        List[np.ndarray]: 笔画数组列表
+    """
+    result = []
+    for stroke in strokes:
+        if isinstance(stroke, np.ndarray):
+            pts = stroke
+        else:
+            pts = np.array([(pt["x"], pt["y"]) for pt in stroke], dtype=np.float64).reshape(-1, 2)
+        if len(pts):
+            result.append(pts)
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+    from src.core.font_store import open_chinese_font
+
+    font_path = sys.argv[1] if len(sys.argv) > 1 else "./assets/Chinese_strokes"
+    tolerance = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+    chinese_font = open_chinese_font(font_path)
+
+    for row in font_decimation_report(chinese_font, [5.0, 6.0, 8.0, 10.0], tolerance):
+        print(f"字高 {row['height_mm']:.1f}mm, 容差 {row['tolerance_mm']}mm: "
+              f"{row['points_before']} -> {row['points_after']} 个点 ({row['ratio']:.1%})")
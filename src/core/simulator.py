@@ -0,0 +1,272 @@
+"""
+simulator.py
+
+离线机械臂模拟器
+
+模拟RobotWritingClient用到的ultraArmP340接口 (set_coords, set_coord, set_angles,
+get_coords_info, get_angles_info, go_zero, set_speed_mode), 用于在没有硬件的情况下
+测试书写流程和评估运动性能:
+1. 每次串口调用都有固定的通信延迟
+2. 运动指令按顺序进入固件队列, 以梯形速度曲线 (匀加速 - 匀速 - 匀减速) 计算运动时间
+3. 落笔状态下的轨迹被记录下来, 可以导出为图片
+
+关节空间做了简化: 底座角度 j1 = atan2(y, x), 其余两个关节角度视为0。
+
+Author: Zhu Jiahao
+Date: 2025-07-29
+"""
+
+import math
+import threading
+import time
+import cv2
+import numpy as np
+from collections import deque
+from typing import List, Optional
+
+__all__ = ['SimulatedUltraArmP340']
+
+# 关节角为[0, 0, 0]时的末端位置 (机械臂坐标)
+HOME_COORDS = (235.55, 0.0, 130.0)
+
+
+class SimulatedUltraArmP340:
+    """ 模拟的ultraArm P340机械臂
+    """
+    def __init__(self,
+                time_scale: float = 1.0,
+                serial_latency: float = 0.004,
+                acceleration: float = 400.0,
+                joint_speed_factor: float = 1.0,
+                home_time: float = 3.0,
+                pen_contact_z: Optional[float] = None):
+        """
+        初始化
+
+        Args:
+            time_scale (float): 时间加速倍数, 大于1时模拟比真实时间更快
+            serial_latency (float): 每次串口调用的通信延迟 (s)
+            acceleration (float): 直线运动加速度 (mm/s^2)
+            joint_speed_factor (float): 关节运动时, 速度值与角速度 (°/s) 的换算系数
+            home_time (float): 回零耗时 (s)
+            pen_contact_z (float): 笔尖接触纸面的Z坐标, Z不高于该值时记录书写轨迹, 默认不记录
+        """
+        self.time_scale = max(time_scale, 1e-6)
+        self.serial_latency = serial_latency
+        self.acceleration = acceleration
+        self.joint_speed_factor = joint_speed_factor
+        self.home_time = home_time
+        self.pen_contact_z = pen_contact_z
+        self.speed_mode = 0
+
+        self._lock = threading.Lock()
+        self._pose = list(HOME_COORDS)
+        self._queue = deque()                       # (start_time, duration, start, end)
+        self._queue_end = time.monotonic()
+
+        # 统计数据
+        self.commands = 0
+        self.queries = 0
+        self.motion_time = 0.0                      # 按真实时间计算的运动总时长 (s)
+        self.drawn_segments: List[tuple] = []
+
+    def go_zero(self) -> None:
+        """ 回零, 阻塞直到完成
+        """
+        self.__serial()
+        with self._lock:
+            self.__advance(time.monotonic())
+            self._queue.clear()
+            self._pose = list(HOME_COORDS)
+            self._queue_end = time.monotonic()
+        time.sleep(self.home_time / self.time_scale)
+        self.motion_time += self.home_time
+
+    def set_speed_mode(self, mode: int) -> None:
+        self.__serial()
+        self.speed_mode = mode
+
+    def set_coords(self, degrees: List[float], speed: int = 50) -> None:
+        """ 直线运动到指定坐标
+
+        Args:
+            degrees (List[float]): [x, y, z] 或 [x, y, z, θ]
+            speed (int): 速度 (mm/s)
+        """
+        self.__serial()
+        target = [float(v) for v in degrees[:3]]
+        self.__enqueue(target, self.__linear_duration(target, speed))
+
+    def set_coord(self, id, coord: float, speed: int = 50) -> None:
+        """ 单轴运动
+
+        Args:
+            id (str | int): 'x' / 'y' / 'z' 或 1 / 2 / 3
+            coord (float): 目标坐标
+            speed (int): 速度 (mm/s)
+        """
+        self.__serial()
+        axis = {"x": 0, "y": 1, "z": 2}.get(str(id).lower(), None)
+        if axis is None:
+            axis = int(id) - 1
+        target = list(self.__queued_end_pose())
+        target[axis] = float(coord)
+        self.__enqueue(target, self.__linear_duration(target, speed))
+
+    def set_angles(self, degrees: List[float], speed: int = 50) -> None:
+        """ 关节运动到指定角度
+
+        Args:
+            degrees (List[float]): [j1, j2, j3]
+            speed (int): 速度
+        """
+        self.__serial()
+        start = self.__queued_end_pose()
+        start_j1 = math.degrees(math.atan2(start[1], start[0]))
+        j1 = float(degrees[0])
+        radius = math.hypot(HOME_COORDS[0], HOME_COORDS[1])
+        target = [radius * math.cos(math.radians(j1)), radius * math.sin(math.radians(j1)), HOME_COORDS[2]]
+        joint_time = abs(j1 - start_j1) / max(speed * self.joint_speed_factor, 1e-6)
+        linear_time = math.dist(start, target) / max(speed, 1e-6)
+        duration = max(joint_time, linear_time)
+        self.__enqueue(target, duration, record=False)
+
+    def get_coords_info(self) -> List[float]:
+        """ 查询当前坐标
+
+        Returns:
+            List[float]: [x, y, z]
+        """
+        self.__serial()
+        self.queries += 1
+        with self._lock:
+            return [round(v, 2) for v in self.__current_pose(time.monotonic())]
+
+    def get_angles_info(self) -> List[float]:
+        """ 查询当前关节角度
+
+        Returns:
+            List[float]: [j1, j2, j3]
+        """
+        self.__serial()
+        self.queries += 1
+        with self._lock:
+            x, y, _ = self.__current_pose(time.monotonic())
+        return [round(math.degrees(math.atan2(y, x)), 2), 0.0, 0.0]
+
+    def is_idle(self) -> bool:
+        """ 固件运动队列是否已全部执行完毕
+        """
+        with self._lock:
+            self.__advance(time.monotonic())
+            return not self._queue
+
+    def stats(self) -> dict:
+        """ 统计串口指令数和运动时间
+
+        Returns:
+            dict: commands (运动指令数), queries (查询次数), motion_time_s (真实时间下的运动总时长)
+        """
+        return {
+            "commands": self.commands,
+            "queries": self.queries,
+            "motion_time_s": self.motion_time,
+            "drawn_segments": len(self.drawn_segments),
+        }
+
+    def save_drawing(self, path: str, px_per_mm: float = 10.0, margin_mm: float = 5.0) -> None:
+        """ 将书写轨迹保存为图片, 图片方向与A4纸一致 (机械臂Y轴向右, X轴向上)
+
+        Args:
+            path (str): 图片路径
+            px_per_mm (float): 每毫米像素数
+            margin_mm (float): 边距 (mm)
+        """
+        if not self.drawn_segments:
+            img = np.full((10, 10, 3), 255, dtype=np.uint8)
+            cv2.imwrite(path, img)
+            return
+
+        segs = np.array(self.drawn_segments, dtype=np.float64)   # (n, 2, 2) [[x0, y0], [x1, y1]]
+        min_y, max_y = segs[:, :, 1].min() - margin_mm, segs[:, :, 1].max() + margin_mm
+        min_x, max_x = segs[:, :, 0].min() - margin_mm, segs[:, :, 0].max() + margin_mm
+        width = int(math.ceil((max_y - min_y) * px_per_mm)) + 1
+        height = int(math.ceil((max_x - min_x) * px_per_mm)) + 1
+        img = np.full((height, width, 3), 255, dtype=np.uint8)
+
+        cols = np.round((segs[:, :, 1] - min_y) * px_per_mm).astype(np.int32)
+        rows = np.round((max_x - segs[:, :, 0]) * px_per_mm).astype(np.int32)
+        lines = np.stack([cols, rows], axis=2)
+        cv2.polylines(img, list(lines), False, (0, 0, 0), max(int(px_per_mm * 0.3), 1), cv2.LINE_AA)
+        cv2.imwrite(path, img)
+
+    def __serial(self) -> None:
+        """ 模拟一次串口往返的通信延迟
+        """
+        if self.serial_latency > 0:
+            time.sleep(self.serial_latency / self.time_scale)
+
+    def __linear_duration(self, target: List[float], speed: float) -> float:
+        """ 梯形速度曲线下的直线运动时间 (真实时间, s)
+        """
+        distance = math.dist(self.__queued_end_pose(), target)
+        v = max(float(speed), 1e-6)
+        a = max(self.acceleration, 1e-6)
+        if distance >= v * v / a:
+            return distance / v + v / a
+        return 2.0 * math.sqrt(distance / a)
+
+    def __queued_end_pose(self) -> List[float]:
+        """ 固件队列全部执行完后的位置
+        """
+        with self._lock:
+            self.__advance(time.monotonic())
+            return list(self._queue[-1][3]) if self._queue else list(self._pose)
+
+    def __enqueue(self, target: List[float], duration: float, record: bool = True) -> None:
+        """ 将一条运动指令加入固件队列
+        """
+        self.commands += 1
+        self.motion_time += duration
+        with self._lock:
+            now = time.monotonic()
+            self.__advance(now)
+            start = list(self._queue[-1][3]) if self._queue else list(self._pose)
+            start_time = max(now, self._queue_end)
+            scaled = duration / self.time_scale
+            self._queue.append((start_time, scaled, start, target))
+            self._queue_end = start_time + scaled
+
+        if record and self.pen_contact_z is not None \
+                and start[2] <= self.pen_contact_z and target[2] <= self.pen_contact_z \
+                and (start[0], start[1]) != (target[0], target[1]):
+            self.drawn_segments.append(((start[0], start[1]), (target[0], target[1])))
+
+    def __advance(self, now: float) -> None:
+        """ 移除已经执行完毕的运动指令 (调用方需持有锁)
+        """
+        while self._queue:
+            start_time, duration, _, end = self._queue[0]
+            if now < start_time + duration:
+                break
+            self._pose = list(end)
+            self._queue.popleft()
+
+    def __current_pose(self, now: float) -> List[float]:
+        """ 计算当前位置 (调用方需持有锁)
+        """
+        self.__advance(now)
+        if not self._queue:
+            return list(self._pose)
+        start_time, duration, start, end = self._queue[0]
+        if now <= start_time or duration <= 0:
+            return list(start)
+        ratio = self.__profile((now - start_time) / duration)
+        return [s + (e - s) * ratio for s, e in zip(start, end)]
+
+    @staticmethod
+    def __profile(t: float) -> float:
+        """ 归一化时间 -> 归一化位移, 用平滑曲线近似梯形速度曲线的加减速段
+        """
+        t = min(max(t, 0.0), 1.0)
+        return t * t * (3.0 - 2.0 * t)
@@ -0,0 +1,195 @@
+"""
+stream_sink.py
+
+流式输出分发模块
+
+模型的流式输出原先在每个分片上都执行 print(..., flush=True) 和文件写入, 答案写入文件后再由main.py读回。
+StreamSink把每个分片原样 (不复制, 不拼接) 分发给多个订阅者:
+- ConsoleSubscriber: 输出到终端, 按时间间隔或换行批量刷新
+- FileSubscriber: 写入文件, 使用较大的写缓冲
+- ChunkCollector: 收集分片列表, 结束时只拼接一次
+- LayoutSubscriber: 把分片送入增量排版器 (StreamingLayout), 每排满一行回调一次
+- 任意可调用对象 (例如StreamingAnswerPipeline的on_delta)
+
+StreamSink同时记录首个分片延迟 (TTFT) 和输出速度 (token/s), 每次调用结束后可通过stats()获取。
+
+Author: Zhu Jiahao
+Date: 2025-08-10
+"""
+
+import sys
+import time
+from typing import Callable, List, Optional, TextIO
+from src.core.layout import StreamingLayout
+
+__all__ = ['StreamSink', 'ConsoleSubscriber', 'FileSubscriber', 'ChunkCollector', 'LayoutSubscriber']
+
+
+class ConsoleSubscriber:
+    """ 输出到终端, 批量刷新
+    """
+    def __init__(self, stream: Optional[TextIO] = None, flush_interval: float = 0.1):
+        """
+        初始化
+
+        Args:
+            stream (TextIO): 输出流, 默认为sys.stdout
+            flush_interval (float): 两次刷新的最小间隔 (s), 遇到换行时立即刷新
+        """
+        self.stream = stream or sys.stdout
+        self.flush_interval = flush_interval
+        self._last_flush = time.perf_counter()
+
+    def write(self, chunk: str) -> None:
+        self.stream.write(chunk)
+        now = time.perf_counter()
+        if "\n" in chunk or now - self._last_flush >= self.flush_interval:
+            self.stream.flush()
+            self._last_flush = now
+
+    def close(self) -> None:
+        self.stream.write("\n")
+        self.stream.flush()
+
+
+class FileSubscriber:
+    """ 写入文件, 使用较大的写缓冲, 关闭时落盘
+    """
+    def __init__(self, path: str, mode: str = "w", buffer_size: int = 64 * 1024):
+        """
+        初始化
+
+        Args:
+            path (str): 文件路径
+            mode (str): 打开方式, "w" 覆盖或 "a" 追加
+            buffer_size (int): 写缓冲大小 (字节)
+        """
+        self.path = path
+        self._file = open(path, mode, encoding="utf-8", buffering=buffer_size)
+
+    def write(self, chunk: str) -> None:
+        self._file.write(chunk)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ChunkCollector:
+    """ 收集分片, 需要完整文本时只拼接一次
+    """
+    def __init__(self):
+        self.chunks: List[str] = []
+
+    def write(self, chunk: str) -> None:
+        self.chunks.append(chunk)
+
+    def close(self) -> None:
+        pass
+
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+
+class LayoutSubscriber:
+    """ 把分片送入增量排版器, 每排满一行就回调
+    """
+    def __init__(self, layout: StreamingLayout, on_line: Optional[Callable[[dict], None]] = None):
+        """
+        初始化
+
+        Args:
+            layout (StreamingLayout): 增量排版器
+            on_line (Callable[[dict], None]): 可选, 每排满一行时的回调, 参数为该行的书写任务
+        """
+        self.layout = layout
+        self.on_line = on_line
+
+    def write(self, chunk: str) -> None:
+        self.__emit(self.layout.feed(chunk))
+
+    def close(self) -> None:
+        self.__emit(self.layout.finish())
+
+    def __emit(self, tasks: List[dict]) -> None:
+        if self.on_line:
+            for task in tasks:
+                self.on_line(task)
+
+
+class _CallbackSubscriber:
+    """ 把普通回调函数包装为订阅者
+    """
+    def __init__(self, callback: Callable[[str], None]):
+        self.write = callback
+
+    def close(self) -> None:
+        pass
+
+
+class StreamSink:
+    """ 把流式分片分发给全部订阅者, 并统计首个分片延迟和输出速度
+
+    StreamSink本身是可调用对象, 可以直接作为LLMTransport.chat的on_delta回调。
+    订阅者需要提供write(chunk)和close()方法, 也可以直接传入回调函数。
+    """
+    def __init__(self, *subscribers):
+        """
+        初始化, 开始计时
+
+        Args:
+            *subscribers: 订阅者或回调函数, 为None的项被忽略
+        """
+        self.subscribers = [s if hasattr(s, "write") else _CallbackSubscriber(s) for s in subscribers if s is not None]
+        self.chunks = 0
+        self.chars = 0
+        self._start = time.perf_counter()
+        self._first: Optional[float] = None
+        self._last: Optional[float] = None
+        self._closed = False
+
+    def __call__(self, chunk: str) -> None:
+        now = time.perf_counter()
+        if self._first is None:
+            self._first = now
+        self._last = now
+        self.chunks += 1
+        self.chars += len(chunk)
+        for subscriber in self.subscribers:
+            subscriber.write(chunk)
+
+    def close(self) -> None:
+        """ 结束输出, 依次关闭全部订阅者 (刷新终端, 关闭文件, 排版最后一行); 可以重复调用
+        """
+        if self._closed:
+            return
+        self._closed = True
+        for subscriber in self.subscribers:
+            subscriber.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def stats(self, completion_tokens: Optional[int] = None) -> dict:
+        """ 本次输出的统计
+
+        Args:
+            completion_tokens (int): 可选, 服务返回的输出token数; 未提供时按分片数估计 (流式接口通常每个分片一个token)
+
+        Returns:
+            dict: ttft_s (首个分片延迟, 没有收到分片时为None), total_s, chunks, chars, tokens,
+                tokens_per_s (首个分片之后的输出速度)
+        """
+        ttft = None if self._first is None else self._first - self._start
+        streaming_s = 0.0 if self._first is None else self._last - self._first
+        tokens = self.chunks if completion_tokens is None else completion_tokens
+        return {
+            "ttft_s": ttft,
+            "total_s": (self._last or time.perf_counter()) - self._start,
+            "chunks": self.chunks,
+            "chars": self.chars,
+            "tokens": tokens,
+            "tokens_per_s": max(tokens - 1, 0) / streaming_s if streaming_s > 0 else 0.0,
+        }
@@ -0,0 +1,179 @@
+"""
+toolpath.py
+
+预编译书写轨迹模块
+
+将规划好的笔画编译成紧凑的二进制运动程序 (numpy结构化数组, 以.npy格式保存),
+每条记录包含目标坐标 x/y/z, 运动速度和笔状态。文件支持内存映射读取,
+可以重复回放, 也可以离线进行比较和性能评估。
+
+Author: Zhu Jiahao
+Date: 2025-07-22
+"""
+
+import hashlib
+import json
+import numpy as np
+from typing import List, Tuple, Dict, Any
+
+__all__ = [
+    'TOOLPATH_DTYPE', 'PEN_UP', 'PEN_DOWN',
+    'compile_toolpath', 'save_toolpath', 'load_toolpath',
+    'toolpath_key', 'summarize_toolpath', 'diff_toolpaths'
+]
+
+# 笔状态
+PEN_UP = 0
+PEN_DOWN = 1
+
+# 单条运动指令的记录格式 (紧凑排列, 每条15字节)
+TOOLPATH_DTYPE = np.dtype([
+    ("x", "<f4"),
+    ("y", "<f4"),
+    ("z", "<f4"),
+    ("speed", "<u2"),
+    ("pen", "u1"),
+])
+
+
+def compile_toolpath(strokes: List[List[Tuple[float, float]]],
+                     z_up: float,
+                     z_down: float,
+                     speed_move: int,
+                     speed_write: int) -> np.ndarray:
+    """ 将笔画序列编译为运动程序
+
+        每一笔编译为: 抬笔移动到起点 -> 落笔 -> 逐点书写 -> 原地抬笔
+
+    Args:
+        strokes (List[List[Tuple[float, float]]]): 笔画序列 (机械臂坐标)
+        z_up (float): 抬笔高度
+        z_down (float): 落笔高度
+        speed_move (int): 移动画笔的速度
+        speed_write (int): 写字的速度
+
+    Returns:
+        np.ndarray: TOOLPATH_DTYPE格式的运动程序
+    """
+    strokes = [s for s in strokes if len(s) > 0]
+    total = sum(len(s) + 2 for s in strokes)
+    program = np.empty(total, dtype=TOOLPATH_DTYPE)
+
+    i = 0
+    for stroke in strokes:
+        points = np.asarray(stroke, dtype=np.float32)
+        n = len(points)
+        # 抬笔移动到起点
+        program[i] = (points[0, 0], points[0, 1], z_up, speed_move, PEN_UP)
+        # 落笔并逐点书写
+        block = program[i + 1:i + 1 + n]
+        block["x"] = points[:, 0]
+        block["y"] = points[:, 1]
+        block["z"] = z_down
+        block["speed"] = speed_write
+        block["pen"] = PEN_DOWN
+        # 原地抬笔
+        program[i + 1 + n] = (points[-1, 0], points[-1, 1], z_up, speed_move, PEN_UP)
+        i += n + 2
+
+    return program
+
+
+def save_toolpath(program: np.ndarray, path: str) -> None:
+    """ 保存运动程序
+
+    Args:
+        program (np.ndarray): 运动程序
+        path (str): 文件路径 (.npy)
+    """
+    np.save(path, np.ascontiguousarray(program, dtype=TOOLPATH_DTYPE), allow_pickle=False)
+
+
+def load_toolpath(path: str, mmap: bool = True) -> np.ndarray:
+    """ 读取运动程序
+
+    Args:
+        path (str): 文件路径 (.npy)
+        mmap (bool): 是否以只读内存映射方式打开
+
+    Returns:
+        np.ndarray: 运动程序
+
+    Raises:
+        ValueError: 文件格式不是运动程序
+    """
+    program = np.load(path, mmap_mode="r" if mmap else None, allow_pickle=False)
+    if program.dtype != TOOLPATH_DTYPE:
+        raise ValueError(f"不是有效的运动程序文件: {path}")
+    return program
+
+
+def toolpath_key(tasks: List[Dict[str, Any]], **params: Any) -> str:
+    """ 根据写字任务和编译参数计算运动程序的缓存键
+
+    Args:
+        tasks (List[dict]): 写字任务列表
+        **params: 影响编译结果的其他参数 (抬笔/落笔高度, 速度, 原点, 字体, 笔画抽稀容差等)
+
+    Returns:
+        str: 十六进制哈希字符串
+    """
+    payload = json.dumps({"tasks": tasks, "params": params}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def summarize_toolpath(program: np.ndarray) -> Dict[str, float]:
+    """ 统计运动程序的指令数与运动距离, 并估算书写时间
+
+    Args:
+        program (np.ndarray): 运动程序
+
+    Returns:
+        dict: 统计结果
+    """
+    if len(program) == 0:
+        return {"commands": 0, "strokes": 0, "pen_up_mm": 0.0, "pen_down_mm": 0.0, "estimated_s": 0.0}
+
+    xyz = np.stack([program["x"], program["y"], program["z"]], axis=1).astype(np.float64)
+    seg = np.linalg.norm(np.diff(xyz, axis=0), axis=1)
+    pen = np.asarray(program["pen"])
+    speed = np.asarray(program["speed"], dtype=np.float64)[1:]
+    # 每段运动的笔状态以目标点为准
+    down = pen[1:] == PEN_DOWN
+    estimated = float(np.sum(seg / np.maximum(speed, 1)))
+
+    return {
+        "commands": int(len(program)),
+        "strokes": int(np.count_nonzero((pen[1:] == PEN_DOWN) & (pen[:-1] == PEN_UP))),
+        "pen_up_mm": float(seg[~down].sum()),
+        "pen_down_mm": float(seg[down].sum()),
+        "estimated_s": estimated,
+    }
+
+
+def diff_toolpaths(a: np.ndarray, b: np.ndarray, tolerance: float = 0.01) -> Dict[str, float]:
+    """ 比较两个运动程序
+
+    Args:
+        a (np.ndarray): 运动程序A
+        b (np.ndarray): 运动程序B
+        tolerance (float): 坐标差异容差 (mm)
+
+    Returns:
+        dict: 指令数量差异, 逐条比较时的不同指令数和最大坐标偏差
+    """
+    n = min(len(a), len(b))
+    if n == 0:
+        return {"length_diff": len(a) - len(b), "changed": 0, "max_deviation_mm": 0.0}
+
+    deviation = np.sqrt(
+        (a["x"][:n] - b["x"][:n]).astype(np.float64) ** 2
+        + (a["y"][:n] - b["y"][:n]).astype(np.float64) ** 2
+        + (a["z"][:n] - b["z"][:n]).astype(np.float64) ** 2
+    )
+    changed = (deviation > tolerance) | (a["pen"][:n] != b["pen"][:n]) | (a["speed"][:n] != b["speed"][:n])
+    return {
+        "length_diff": len(a) - len(b),
+        "changed": int(np.count_nonzero(changed)),
+        "max_deviation_mm": float(deviation.max()),
+    }
@@ -33,8 +33,9 @@ class ConfigManager:
 
             # @TODO: 处理环境变量
 
-            # 创建路径
-            self.create_dict()
+            # 只创建缺少的路径, 不清空. 导入本模块时清空目录是不安全的: 进程池的子进程 (spawn方式) 会重新导入本模块,
+            # 此时parent_process()仍为None, 无法区分主进程与子进程. 清空目录由main()显式调用create_dict()完成
+            self.ensure_dirs()
 
 
         except FileNotFoundError as e:
@@ -57,6 +58,20 @@ class ConfigManager:
 
         print("所有目录都已经创建完毕!")
 
+    def ensure_dirs(self) -> None:
+        """创建配置中缺少的路径, 已有内容保持不变
+        """
+        for path_str in self.__path_values():
+            Path(path_str).mkdir(parents=True, exist_ok=True)
+
+    def __path_values(self):
+        paths = self._config.get('paths', {})
+        for path_config in paths.values():
+            if isinstance(path_config, dict):
+                yield from path_config.values()
+            elif isinstance(path_config, str):
+                yield path_config
+
     def ensure_empty_dir(self, path_str: str) -> None:
         """确保每个路径都为空
 
@@ -121,5 +136,30 @@ class ConfigManager:
         """
         return self.get('camera', {})
 
+    def get_batch_config(self) -> Dict[str, Any]:
+        """ 获取批量处理配置
+        """
+        return self.get('batch', {})
+
+    def get_llm_config(self) -> Dict[str, Any]:
+        """ 获取大模型传输层配置
+        """
+        return self.get('llm', {})
+
+    def get_ocr_config(self) -> Dict[str, Any]:
+        """ 获取OCR配置
+        """
+        return self.get('ocr', {})
+
+    def get_cache_config(self) -> Dict[str, Any]:
+        """ 获取OCR与答案缓存配置
+        """
+        return self.get('cache', {})
+
+    def get_answer_config(self) -> Dict[str, Any]:
+        """ 获取答题配置
+        """
+        return self.get('answer', {})
+
 # Global instance of config manager
 __config__ = ConfigManager()
\ No newline at end of file
@@ -50,7 +50,8 @@ class Logger:
                 when='midnight',
                 interval=1,
                 backupCount=log_config.get('max_files', 7),
-                encoding='utf-8'
+                encoding='utf-8',
+                delay=True          # 第一条日志时才打开文件, main()清空日志目录时文件尚未被占用
             )
             file_handler.setLevel(log_level)
             file_handler.setFormatter(formatter)
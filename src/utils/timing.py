@@ -0,0 +1,101 @@
+"""
+timing.py
+
+流程各阶段耗时统计工具
+
+Author: Zhu Jiahao
+Date: 2025-07-30
+"""
+
+import json
+import math
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List
+
+__all__ = ['StageTimer', 'percentile']
+
+
+def percentile(values: List[float], q: float) -> float:
+    """ 计算百分位数 (线性插值)
+
+    Args:
+        values (List[float]): 样本
+        q (float): 百分位, 0~100
+
+    Returns:
+        float: 百分位数, 样本为空时返回0
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100.0
+    lower, upper = math.floor(pos), math.ceil(pos)
+    if lower == upper:
+        return ordered[lower]
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (pos - lower)
+
+
+class StageTimer:
+    """ 按阶段名称记录耗时
+    """
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    @contextmanager
+    def stage(self, name: str):
+        """ 记录with代码块的耗时
+
+        Args:
+            name (str): 阶段名称
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[name].append(time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float) -> None:
+        """ 手动记录一次耗时
+
+        Args:
+            name (str): 阶段名称
+            seconds (float): 耗时 (s)
+        """
+        self.samples[name].append(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """ 汇总每个阶段的耗时
+
+        Returns:
+            dict: 阶段名称 -> {count, mean_s, p50_s, p95_s, max_s}
+        """
+        result = {}
+        for name, values in self.samples.items():
+            result[name] = {
+                "count": len(values),
+                "mean_s": sum(values) / len(values),
+                "p50_s": percentile(values, 50),
+                "p95_s": percentile(values, 95),
+                "max_s": max(values),
+            }
+        return result
+
+    def format_summary(self) -> str:
+        """ 以表格形式输出汇总结果
+        """
+        lines = [f"{'stage':<20}{'count':>6}{'p50(s)':>10}{'p95(s)':>10}{'max(s)':>10}"]
+        for name, row in self.summary().items():
+            lines.append(f"{name:<20}{row['count']:>6}{row['p50_s']:>10.3f}{row['p95_s']:>10.3f}{row['max_s']:>10.3f}")
+        return "\n".join(lines)
+
+    def save(self, path: str, **extra) -> None:
+        """ 将汇总结果保存为JSON文件
+
+        Args:
+            path (str): 文件路径
+            **extra: 额外写入的字段
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"stages": self.summary(), **extra}, f, ensure_ascii=False, indent=2)